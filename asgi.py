@@ -0,0 +1,3 @@
+from project.api import create_api
+
+app = create_api()
@@ -0,0 +1,225 @@
+from contextlib import asynccontextmanager
+from dataclasses import asdict
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional
+
+from fastapi import Depends, FastAPI, Header, Query, Request
+from fastapi.responses import JSONResponse, Response
+from pydantic import BaseModel
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from project.api import services
+from project.app.billing import tariffs
+from project.app.idempotency import (
+    HEADER,
+    IN_FLIGHT,
+    INVALID_KEY,
+    KeyInUse,
+    PendingKey,
+    StoredResponse,
+    fingerprint_of,
+    idempotency,
+    rejection,
+    valid_key,
+)
+from project.app.occupancy import occupancy
+from project.app.services import (
+    ClientNotFound,
+    CreditCardRequired,
+    ParkingError,
+    ParkingNotFound,
+    SessionNotFound,
+)
+from project.app.versions import shared_versions
+from project.config import Config
+from project.database import prepare_schema
+from project.database.tuning import apply_pragmas
+
+
+class EnterRequest(BaseModel):
+    client_id: int
+    parking_id: int
+
+
+class ExitRequest(BaseModel):
+    client_id: int
+    parking_id: int
+    credit_card: Optional[str] = None
+
+
+def async_database_uri(uri: str) -> str:
+    return uri.replace("sqlite://", "sqlite+aiosqlite://", 1)
+
+
+async def get_session(request: Request) -> AsyncIterator[AsyncSession]:
+    async with request.app.state.sessionmaker() as session:
+        yield session
+
+
+def _error(error: ParkingError, status_code: int) -> JSONResponse:
+    return JSONResponse({"error": str(error)}, status_code=status_code)
+
+
+Handler = Callable[[Optional[PendingKey]], Awaitable[JSONResponse]]
+
+
+async def _idempotent(
+    request: Request,
+    session: AsyncSession,
+    scope: str,
+    header: Optional[str],
+    handle: Handler,
+) -> Response:
+    if header is None:
+        return await handle(None)
+    if not valid_key(header):
+        return JSONResponse({"error": INVALID_KEY}, status_code=400)
+
+    key = (scope, header)
+    fingerprint = fingerprint_of(await request.body())
+    if not idempotency.acquire(key):
+        return JSONResponse({"error": IN_FLIGHT}, status_code=409)
+    try:
+        stored = await services.stored_response(session, key)
+        if stored is None:
+            try:
+                response = await handle(PendingKey(key, fingerprint))
+            except KeyInUse:
+                return JSONResponse({"error": IN_FLIGHT}, status_code=409)
+            # Server errors are transient, the client may retry them.
+            if response.status_code < 500:
+                created_at = datetime.now(timezone.utc).replace(tzinfo=None)
+                body = bytes(response.body).decode()
+                await services.store_response(
+                    session,
+                    key,
+                    StoredResponse(fingerprint, response.status_code, body, created_at),
+                )
+            return response
+    finally:
+        idempotency.release(key)
+
+    rejected = rejection(stored, fingerprint)
+    if rejected is not None:
+        message, status = rejected
+        return JSONResponse({"error": message}, status_code=status)
+    return Response(
+        stored.body,
+        stored.status,
+        media_type="application/json",
+        headers={"Idempotent-Replayed": "true"},
+    )
+
+
+def create_api(config_class: Any = Config) -> FastAPI:
+    engine = create_async_engine(
+        async_database_uri(config_class.SQLALCHEMY_DATABASE_URI)
+    )
+    apply_pragmas(engine.sync_engine, config_class.SQLITE_PRAGMAS)
+    sessionmaker = async_sessionmaker(engine, expire_on_commit=False)
+
+    @asynccontextmanager
+    async def lifespan(api: FastAPI) -> AsyncIterator[None]:
+        prepare_schema(
+            config_class.SQLALCHEMY_DATABASE_URI, config_class.SQLITE_PRAGMAS
+        )
+        shared_versions.configure(config_class.SHARED_VERSIONS_POLL_SECONDS)
+        tariffs.configure(config_class.TARIFF_TIMEZONE)
+        idempotency.configure(
+            config_class.IDEMPOTENCY_CACHE_SIZE, config_class.IDEMPOTENCY_TTL_SECONDS
+        )
+        async with sessionmaker() as session:
+            await services.rebuild_occupancy(session)
+            await services.shared_changes(session)
+            await services.load_tariffs(session)
+        yield
+        await engine.dispose()
+
+    api = FastAPI(title="Parking gate API", lifespan=lifespan)
+    api.state.sessionmaker = sessionmaker
+
+    @api.post("/api/client_parkings/enter", status_code=201, response_model=None)
+    async def enter(
+        request: Request,
+        payload: EnterRequest,
+        session: AsyncSession = Depends(get_session),
+        idempotency_key: Optional[str] = Header(None, alias=HEADER),
+    ) -> Response:
+        async def handle(pending: Optional[PendingKey]) -> JSONResponse:
+            try:
+                session_id = await services.reserve_place(
+                    session, payload.client_id, payload.parking_id, pending
+                )
+            except (ClientNotFound, ParkingNotFound) as e:
+                return _error(e, 404)
+            except ParkingError as e:
+                return _error(e, 409)
+            return JSONResponse(
+                {"success": "Автомобиль успешно припаркован", "session_id": session_id},
+                status_code=201,
+            )
+
+        return await _idempotent(request, session, "api.enter", idempotency_key, handle)
+
+    @api.delete("/api/client_parkings/exit", response_model=None)
+    async def exit_(
+        request: Request,
+        payload: ExitRequest,
+        session: AsyncSession = Depends(get_session),
+        idempotency_key: Optional[str] = Header(None, alias=HEADER),
+    ) -> Response:
+        async def handle(pending: Optional[PendingKey]) -> JSONResponse:
+            await services.refresh_shared(session)
+            try:
+                result = await services.release_place(
+                    session,
+                    payload.client_id,
+                    payload.parking_id,
+                    payload.credit_card,
+                    pending,
+                )
+            except CreditCardRequired as e:
+                return JSONResponse(
+                    {
+                        "require_credit_card": True,
+                        "client_name": e.client_name,
+                        "car_number": e.car_number,
+                        "client_id": e.client_id,
+                        "parking_id": e.parking_id,
+                    }
+                )
+            except SessionNotFound as e:
+                return _error(e, 404)
+            amount = result.amount
+            return JSONResponse(
+                {"success": f"Автомобиль покинул парковку. Снята плата - {amount} руб."}
+            )
+
+        return await _idempotent(request, session, "api.exit", idempotency_key, handle)
+
+    @api.get("/api/client_parkings/active")
+    async def active(
+        after: Optional[int] = None,
+        limit: int = Query(Config.PAGE_SIZE, ge=1, le=Config.MAX_PAGE_SIZE),
+        session: AsyncSession = Depends(get_session),
+    ) -> Dict[str, Any]:
+        sessions = await services.active_sessions(session, after, limit)
+        next_after = sessions[-1]["id"] if len(sessions) == limit else None
+        return {"active_sessions": sessions, "next_after": next_after}
+
+    @api.get("/api/occupancy")
+    async def occupancy_snapshot(
+        session: AsyncSession = Depends(get_session),
+    ) -> Dict[str, Any]:
+        await services.refresh_shared(session)
+        if not occupancy.is_loaded():
+            await services.rebuild_occupancy(session)
+        totals = occupancy.totals()
+        return {
+            "parkings_count": totals.parkings_count,
+            "active_sessions_count": totals.active_sessions_count,
+            "parkings": [asdict(parking) for parking in occupancy.parkings()],
+            "cache": occupancy.stats(),
+        }
+
+    return api
@@ -0,0 +1,212 @@
+import logging
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import insert, select, update
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from project.app.billing import tariff_statement, tariffs, tariffs_from_rows
+from project.app.idempotency import (
+    KeyInUse,
+    PendingKey,
+    StoredResponse,
+    idempotency,
+    lookup_statement,
+    pending_statement,
+    record_statement,
+)
+from project.app.models import Client, ClientParking, Parking
+from project.app.occupancy import occupancy, occupancy_entries, occupancy_statement
+from project.app.services import (
+    ClientAlreadyParked,
+    ExitResult,
+    calculate_fee,
+    claim_place_statement,
+    close_session_statement,
+    free_place_statement,
+    place_released,
+    place_reserved,
+    release_error,
+    release_state_statement,
+    reservation_error,
+    reservation_state_statement,
+    store_card_statement,
+)
+from project.app.versions import (
+    CLIENTS,
+    PARKINGS,
+    SESSIONS,
+    TARIFFS,
+    shared_bump_statement,
+    shared_version_statement,
+    shared_versions,
+)
+
+logger = logging.getLogger(__name__)
+
+
+async def _claim(session: AsyncSession, pending: Optional[PendingKey]) -> None:
+    if pending is None:
+        return
+    claimed = await session.execute(pending_statement(pending, idempotency.ttl))
+    if claimed.rowcount != 1:
+        await session.rollback()
+        raise KeyInUse()
+
+
+async def reserve_place(
+    session: AsyncSession,
+    client_id: int,
+    parking_id: int,
+    pending: Optional[PendingKey] = None,
+) -> int:
+    reserved = await session.execute(claim_place_statement(client_id, parking_id))
+    if reserved.rowcount != 1:
+        state = (
+            await session.execute(reservation_state_statement(client_id, parking_id))
+        ).one()
+        await session.rollback()
+        raise reservation_error(state)
+
+    await _claim(session, pending)
+    try:
+        inserted = await session.execute(
+            insert(ClientParking.__table__).values(
+                client_id=client_id,
+                parking_id=parking_id,
+                time_in=datetime.now(timezone.utc),
+            )
+        )
+        # The Flask servers follow the gate through the shared stamp.
+        await session.execute(shared_bump_statement(PARKINGS, SESSIONS))
+        await session.commit()
+    except IntegrityError as e:
+        await session.rollback()
+        raise ClientAlreadyParked() from e
+
+    place_reserved(client_id, parking_id)
+    return int(inserted.inserted_primary_key[0])
+
+
+async def _close_session(
+    session: AsyncSession, client_id: int, parking_id: int
+) -> Optional[Tuple[datetime, datetime]]:
+    time_out = datetime.now(timezone.utc).replace(tzinfo=None)
+    close = close_session_statement(client_id, parking_id, time_out)
+
+    if session.get_bind().dialect.update_returning:
+        row = (await session.execute(close.returning(ClientParking.time_in))).first()
+        return None if row is None else (row.time_in, time_out)
+
+    found = (
+        await session.execute(
+            select(ClientParking.id, ClientParking.time_in).where(close.whereclause)
+        )
+    ).first()
+    if found is None:
+        return None
+    await session.execute(
+        update(ClientParking)
+        .where(ClientParking.id == found.id)
+        .values(time_out=time_out)
+        .execution_options(synchronize_session=False)
+    )
+    return found.time_in, time_out
+
+
+async def release_place(
+    session: AsyncSession,
+    client_id: int,
+    parking_id: int,
+    credit_card: Optional[str] = None,
+    pending: Optional[PendingKey] = None,
+) -> ExitResult:
+    if credit_card:
+        await session.execute(store_card_statement(client_id, parking_id, credit_card))
+
+    closed = await _close_session(session, client_id, parking_id)
+    if closed is None:
+        state = (
+            await session.execute(release_state_statement(client_id, parking_id))
+        ).first()
+        await session.rollback()
+        raise release_error(state)
+
+    await session.execute(free_place_statement(parking_id))
+    await _claim(session, pending)
+    await session.execute(shared_bump_statement(CLIENTS, PARKINGS, SESSIONS))
+    await session.commit()
+    place_released(client_id, parking_id)
+
+    time_in, time_out = closed
+    return ExitResult(time_in, time_out, calculate_fee(parking_id, time_in, time_out))
+
+
+async def active_sessions(
+    session: AsyncSession, after: Optional[int], limit: int
+) -> List[Dict[str, Any]]:
+    statement = (
+        select(
+            ClientParking.id,
+            ClientParking.client_id,
+            ClientParking.parking_id,
+            ClientParking.time_in,
+            Client.name,
+            Client.car_number,
+            Parking.address,
+        )
+        .join(Client, Client.id == ClientParking.client_id)
+        .join(Parking, Parking.id == ClientParking.parking_id)
+        .where(ClientParking.time_out.is_(None))
+        .order_by(ClientParking.id)
+        .limit(limit)
+    )
+    if after is not None:
+        statement = statement.where(ClientParking.id > after)
+    return [dict(row._mapping) for row in await session.execute(statement)]
+
+
+async def load_tariffs(session: AsyncSession) -> None:
+    tariffs.load(tariffs_from_rows(await session.execute(tariff_statement())))
+
+
+async def stored_response(
+    session: AsyncSession, key: Tuple[str, str]
+) -> Optional[StoredResponse]:
+    cutoff = datetime.now(timezone.utc).replace(tzinfo=None) - idempotency.ttl
+    record = (await session.execute(lookup_statement(key, cutoff))).first()
+    return None if record is None else StoredResponse(*record)
+
+
+async def store_response(
+    session: AsyncSession, key: Tuple[str, str], stored: StoredResponse
+) -> None:
+    try:
+        await session.execute(record_statement(key, stored))
+        await session.commit()
+    except SQLAlchemyError:
+        # The pending record committed with the write still blocks a rerun.
+        await session.rollback()
+        logger.exception("Could not persist idempotency key %s", key[1])
+
+
+async def shared_changes(session: AsyncSession) -> List[str]:
+    rows = (await session.execute(shared_version_statement())).tuples().all()
+    return shared_versions.changed(rows)
+
+
+async def refresh_shared(session: AsyncSession) -> None:
+    if not shared_versions.due():
+        return
+    changed = await shared_changes(session)
+    if TARIFFS in changed:
+        await load_tariffs(session)
+    if PARKINGS in changed or SESSIONS in changed:
+        await rebuild_occupancy(session)
+    # End the read transaction before the write that follows.
+    await session.rollback()
+
+
+async def rebuild_occupancy(session: AsyncSession) -> None:
+    occupancy.load(occupancy_entries(await session.execute(occupancy_statement())))
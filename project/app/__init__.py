@@ -3,7 +3,18 @@ from typing import Any, Optional
 
 from flask import Flask
 
+from project.app.admission import admission, admission_metrics, gate_limiter
+from project.app.archive import init_archive
+from project.app.billing import tariffs
+from project.app.cli import register_cli
+from project.app.fragments import fragment_metrics, fragments
+from project.app.history import client_totals
+from project.app.idempotency import idempotency, idempotency_metrics
+from project.app.metrics import init_metrics, metrics
+from project.app.occupancy import occupancy, occupancy_metrics
 from project.app.routes import bp
+from project.app.versions import PARKINGS, SESSIONS, TARIFFS, shared_versions
+from project.app.writer import init_writer
 from project.config import Config
 from project.database import init_db
 
@@ -21,5 +32,36 @@ def create_app(config_class: Any = Config) -> Flask:
         return value.strftime(format)
 
     init_db(app)
+    # Registered before the metrics hook so the poll is not billed to a view.
+    app.before_request(shared_versions.poll)
+    init_metrics(app)
+    metrics.register_collector(occupancy_metrics)
+    metrics.register_collector(fragment_metrics)
+    metrics.register_collector(idempotency_metrics)
+    metrics.register_collector(admission_metrics)
+    fragments.configure(app.config["FRAGMENT_CACHE_BYTES"])
+    admission.configure(
+        app.config["ADMISSION_MAX_CONCURRENT"],
+        app.config["ADMISSION_QUEUE_SIZE"],
+        app.config["ADMISSION_MAX_WAIT_SECONDS"],
+    )
+    gate_limiter.configure(app.config["GATE_RATE_PER_SECOND"], app.config["GATE_BURST"])
+    idempotency.configure(
+        app.config["IDEMPOTENCY_CACHE_SIZE"], app.config["IDEMPOTENCY_TTL_SECONDS"]
+    )
+    shared_versions.configure(app.config["SHARED_VERSIONS_POLL_SECONDS"])
+    tariffs.configure(app.config["TARIFF_TIMEZONE"])
+    shared_versions.on_change(TARIFFS, tariffs.rebuild)
+    shared_versions.on_change(TARIFFS, client_totals.clear)
+    # Entries, exits and imports made by other processes move occupancy.
+    shared_versions.on_change(PARKINGS, occupancy.rebuild)
+    shared_versions.on_change(SESSIONS, occupancy.rebuild)
+    with app.app_context():
+        shared_versions.sync()
+        occupancy.rebuild()
+        tariffs.rebuild()
     app.register_blueprint(bp)
+    register_cli(app)
+    init_archive(app)
+    init_writer(app)
     return app
@@ -0,0 +1,191 @@
+import math
+import threading
+import time
+from collections import Counter, OrderedDict
+from functools import wraps
+from typing import Any, Callable, Dict, List, Optional, Tuple, TypeVar, cast
+
+from flask import jsonify, request
+
+View = TypeVar("View", bound=Callable[..., Any])
+
+WRITE_METHODS = frozenset({"POST", "PUT", "PATCH", "DELETE"})
+GATE_HEADER = "X-Gate-Id"
+REJECTION_REASONS = ("queue_full", "timeout", "rate_limited")
+
+
+class AdmissionController:
+    def __init__(
+        self, limit: int = 8, queue_size: int = 64, max_wait: float = 2.0
+    ) -> None:
+        self._condition = threading.Condition()
+        self.limit = limit
+        self.queue_size = queue_size
+        self.max_wait = max_wait
+        self.active = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.rejected: Counter[str] = Counter()
+
+    def configure(self, limit: int, queue_size: int, max_wait: float) -> None:
+        with self._condition:
+            self.limit = limit
+            self.queue_size = queue_size
+            self.max_wait = max_wait
+            self._condition.notify_all()
+
+    def acquire(self) -> Optional[str]:
+        with self._condition:
+            # Newcomers do not overtake requests that are already queued.
+            if self.active < self.limit and not self.waiting:
+                self.active += 1
+                self.admitted += 1
+                return None
+            if self.waiting >= self.queue_size:
+                self.rejected["queue_full"] += 1
+                return "queue_full"
+
+            deadline = time.monotonic() + self.max_wait
+            self.waiting += 1
+            try:
+                while self.active >= self.limit:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self.rejected["timeout"] += 1
+                        return "timeout"
+                    self._condition.wait(remaining)
+            finally:
+                self.waiting -= 1
+            self.active += 1
+            self.admitted += 1
+            return None
+
+    def release(self) -> None:
+        with self._condition:
+            self.active -= 1
+            self._condition.notify()
+
+    def reject(self, reason: str) -> None:
+        with self._condition:
+            self.rejected[reason] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._condition:
+            return {
+                "active": self.active,
+                "waiting": self.waiting,
+                "admitted": self.admitted,
+                "rejected": dict(self.rejected),
+            }
+
+
+class GateLimiter:
+    def __init__(
+        self, rate: Optional[float] = None, burst: int = 20, max_gates: int = 10_000
+    ) -> None:
+        self._lock = threading.Lock()
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+        self.rate = rate
+        self.burst = burst
+        self.max_gates = max_gates
+
+    def configure(self, rate: Optional[float], burst: int) -> None:
+        with self._lock:
+            self.rate = rate
+            self.burst = burst
+            self._buckets.clear()
+
+    def take(self, gate: str) -> float:
+        now = time.monotonic()
+        with self._lock:
+            rate = self.rate
+            if rate is None:
+                return 0.0
+            tokens, updated = self._buckets.pop(gate, (float(self.burst), now))
+            tokens = min(float(self.burst), tokens + (now - updated) * rate)
+            if tokens >= 1:
+                tokens -= 1
+                wait = 0.0
+            else:
+                wait = (1 - tokens) / rate if rate > 0 else math.inf
+            self._buckets[gate] = (tokens, now)
+            # Least recently seen gates start over with a full bucket.
+            while len(self._buckets) > self.max_gates:
+                self._buckets.popitem(last=False)
+        return wait
+
+
+admission = AdmissionController()
+gate_limiter = GateLimiter()
+
+
+def _retry_after(seconds: float) -> str:
+    return str(max(1, math.ceil(min(seconds, 3600))))
+
+
+def _rejected(message: str, status: int, retry_after: float) -> Any:
+    response = jsonify({"error": message})
+    response.status_code = status
+    response.headers["Retry-After"] = _retry_after(retry_after)
+    return response
+
+
+def admitted(view: View) -> View:
+    @wraps(view)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        if request.method not in WRITE_METHODS:
+            return view(*args, **kwargs)
+
+        gate = request.headers.get(GATE_HEADER) or request.remote_addr or ""
+        wait = gate_limiter.take(gate)
+        if wait > 0:
+            admission.reject("rate_limited")
+            return _rejected("Слишком много запросов от шлагбаума", 429, wait)
+
+        if admission.acquire() is not None:
+            return _rejected(
+                "Сервис перегружен, повторите попытку позже", 503, admission.max_wait
+            )
+        try:
+            return view(*args, **kwargs)
+        finally:
+            admission.release()
+
+    return cast(View, wrapper)
+
+
+def admission_metrics() -> List[Tuple[str, str, str, List[Any]]]:
+    stats = admission.stats()
+    return [
+        (
+            "admission_in_flight",
+            "gauge",
+            "Write requests currently executing.",
+            [("admission_in_flight", {}, stats["active"])],
+        ),
+        (
+            "admission_queue_depth",
+            "gauge",
+            "Write requests waiting for a slot.",
+            [("admission_queue_depth", {}, stats["waiting"])],
+        ),
+        (
+            "admission_admitted_total",
+            "counter",
+            "Write requests let through.",
+            [("admission_admitted_total", {}, stats["admitted"])],
+        ),
+        (
+            "admission_rejected_total",
+            "counter",
+            "Write requests shed before reaching the database.",
+            [
+                (
+                    "admission_rejected_total",
+                    {"reason": reason},
+                    stats["rejected"].get(reason, 0),
+                )
+                for reason in REJECTION_REASONS
+            ],
+        ),
+    ]
@@ -0,0 +1,212 @@
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import numpy.typing as npt
+from sqlalchemy import and_, delete, func, insert, select
+
+from project.app.archive import all_sessions
+from project.app.billing import SECONDS_PER_DAY, IntArray, epoch_seconds
+from project.app.models import OccupancyRollup, RollupWatermark
+from project.config import Config
+from project.database import db
+
+SECONDS_PER_HOUR = 3600
+GRANULARITIES = ("hour", "day")
+WATERMARK = "occupancy"
+UNIX_EPOCH = datetime(1970, 1, 1)
+
+
+@dataclass(frozen=True)
+class RollupReport:
+    sessions: int
+    parkings: int
+    hours: int
+    watermark: datetime
+
+
+def occupancy_curve(
+    time_in: npt.ArrayLike,
+    time_out: npt.ArrayLike,
+    start: int,
+    buckets: int,
+    width: int = SECONDS_PER_HOUR,
+) -> Tuple[IntArray, IntArray]:
+    end = start + buckets * width
+    arrivals = np.maximum(np.asarray(time_in, dtype=np.float64), start)
+    departures = np.minimum(np.asarray(time_out, dtype=np.float64), end)
+    inside = departures > arrivals
+    arrivals, departures = arrivals[inside], departures[inside]
+
+    # Bucket boundaries are zero-delta events, so no segment spans two buckets.
+    # At equal instants departures sort first: a car leaving at 10:00 and one
+    # arriving at 10:00 never overlap.
+    times = np.concatenate(
+        [
+            arrivals,
+            departures,
+            start + width * np.arange(buckets, dtype=np.float64),
+        ]
+    )
+    deltas = np.concatenate(
+        [
+            np.ones(len(arrivals), dtype=np.int64),
+            np.full(len(departures), -1, dtype=np.int64),
+            np.zeros(buckets, dtype=np.int64),
+        ]
+    )
+    order = np.lexsort((deltas, times))
+    times, deltas = times[order], deltas[order]
+    level = np.cumsum(deltas)
+    bucket = np.minimum(((times - start) // width).astype(np.int64), buckets - 1)
+
+    peaks = np.zeros(buckets, dtype=np.int64)
+    np.maximum.at(peaks, bucket, level)
+    durations = np.diff(times, append=float(end))
+    occupied = np.bincount(bucket, weights=level * durations, minlength=buckets)
+    return peaks, np.rint(occupied).astype(np.int64)
+
+
+def _moment(seconds: int) -> datetime:
+    return UNIX_EPOCH + timedelta(seconds=seconds)
+
+
+def refresh_rollups(full: bool = False) -> RollupReport:
+    # Sessions closed in the last few seconds may still be committing with an
+    # earlier time_out; they are picked up by the next run instead.
+    upto = datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(
+        seconds=Config.ROLLUP_SETTLE_SECONDS
+    )
+    mark = db.session.get(RollupWatermark, WATERMARK)
+    since = None if full or mark is None else mark.time_out
+
+    sessions = all_sessions()
+    closed = and_(sessions.c.time_out.is_not(None), sessions.c.time_out <= upto)
+    changed = closed if since is None else and_(closed, sessions.c.time_out > since)
+    groups = db.session.execute(
+        select(
+            sessions.c.parking_id,
+            func.count(),
+            func.min(epoch_seconds(sessions.c.time_in)),
+            func.max(epoch_seconds(sessions.c.time_out)),
+        )
+        .where(changed)
+        .group_by(sessions.c.parking_id)
+    ).all()
+
+    hours = 0
+    if full:
+        db.session.execute(delete(OccupancyRollup))
+    if groups:
+        parking_ids = [group[0] for group in groups]
+        # Peaks are not additive, so every hour the new sessions touch is
+        # recomputed from all closed sessions overlapping it.
+        start = int(min(group[2] for group in groups)) // SECONDS_PER_HOUR
+        start *= SECONDS_PER_HOUR
+        end = int(max(group[3] for group in groups)) // SECONDS_PER_HOUR + 1
+        end *= SECONDS_PER_HOUR
+        window_start, window_end = _moment(start), _moment(end)
+
+        rows = db.session.execute(
+            select(
+                sessions.c.parking_id,
+                epoch_seconds(sessions.c.time_in),
+                epoch_seconds(sessions.c.time_out),
+            ).where(
+                closed,
+                sessions.c.parking_id.in_(parking_ids),
+                sessions.c.time_out > window_start,
+                sessions.c.time_in < window_end,
+            )
+        ).all()
+        columns = np.array(rows, dtype=np.float64).reshape(-1, 3).T
+        owners = columns[0].astype(np.int64)
+        order = np.argsort(owners, kind="stable")
+        keys, first = np.unique(owners[order], return_index=True)
+        buckets = (end - start) // SECONDS_PER_HOUR
+
+        rollups: List[Dict[str, Any]] = []
+        for parking_id, chunk in zip(keys.tolist(), np.split(order, first[1:])):
+            peaks, occupied = occupancy_curve(
+                columns[1][chunk], columns[2][chunk], start, buckets
+            )
+            for index in np.flatnonzero(peaks).tolist():
+                rollups.append(
+                    {
+                        "parking_id": parking_id,
+                        "hour": _moment(start + index * SECONDS_PER_HOUR),
+                        "peak": int(peaks[index]),
+                        "occupied_seconds": int(occupied[index]),
+                    }
+                )
+
+        db.session.execute(
+            delete(OccupancyRollup).where(
+                OccupancyRollup.parking_id.in_(parking_ids),
+                OccupancyRollup.hour >= window_start,
+                OccupancyRollup.hour < window_end,
+            )
+        )
+        if rollups:
+            db.session.execute(insert(OccupancyRollup), rollups)
+        hours = len(rollups)
+
+    if mark is None:
+        db.session.add(RollupWatermark(name=WATERMARK, time_out=upto))
+    else:
+        mark.time_out = upto
+    db.session.commit()
+    return RollupReport(
+        sessions=sum(group[1] for group in groups),
+        parkings=len(groups),
+        hours=hours,
+        watermark=upto,
+    )
+
+
+def occupancy_series(
+    granularity: str = "hour",
+    parking_id: Optional[int] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+) -> List[Dict[str, Any]]:
+    if granularity not in GRANULARITIES:
+        raise ValueError(
+            f"granularity должен быть одним из: {', '.join(GRANULARITIES)}"
+        )
+
+    conditions = []
+    if parking_id is not None:
+        conditions.append(OccupancyRollup.parking_id == parking_id)
+    if date_from is not None:
+        conditions.append(OccupancyRollup.hour >= datetime.combine(date_from, time()))
+    if date_to is not None:
+        conditions.append(OccupancyRollup.hour < datetime.combine(date_to, time()))
+
+    if granularity == "hour":
+        bucket: Any = OccupancyRollup.hour
+        width = SECONDS_PER_HOUR
+    else:
+        bucket = func.date(OccupancyRollup.hour)
+        width = SECONDS_PER_DAY
+    statement = (
+        select(
+            OccupancyRollup.parking_id,
+            bucket.label("start"),
+            func.max(OccupancyRollup.peak),
+            func.sum(OccupancyRollup.occupied_seconds),
+        )
+        .where(*conditions)
+        .group_by(OccupancyRollup.parking_id, bucket)
+        .order_by(OccupancyRollup.parking_id, bucket)
+    )
+    return [
+        {
+            "parking_id": row[0],
+            "start": row[1] if isinstance(row[1], str) else row[1].isoformat(),
+            "peak": row[2],
+            "average": round(row[3] / width, 3),
+        }
+        for row in db.session.execute(statement)
+    ]
@@ -0,0 +1,115 @@
+import logging
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Any, Optional
+
+from flask import Flask
+from sqlalchemy import delete, func, insert, literal, select, union_all
+
+from project.app.models import ClientParking, ClientParkingHistory
+from project.config import Config
+from project.database import db
+
+logger = logging.getLogger(__name__)
+
+SESSION_COLUMNS = ("id", "client_id", "parking_id", "time_in", "time_out")
+
+
+def archive_batch(batch_size: int, closed_before: datetime) -> int:
+    # The newest row always stays in the hot table: SQLite hands out
+    # max(rowid) + 1 for new sessions, so keeping it prevents a new session
+    # from reusing the id of an archived one.
+    newest = select(func.max(ClientParking.id)).scalar_subquery()
+    ids = list(
+        db.session.scalars(
+            select(ClientParking.id)
+            .where(
+                ClientParking.time_out.is_not(None),
+                ClientParking.time_out < closed_before,
+                ClientParking.id < newest,
+            )
+            .order_by(ClientParking.id)
+            .limit(batch_size)
+        )
+    )
+    if not ids:
+        return 0
+
+    hot = ClientParking.__table__
+    db.session.execute(
+        insert(ClientParkingHistory.__table__).from_select(
+            SESSION_COLUMNS,
+            select(*(hot.c[name] for name in SESSION_COLUMNS)).where(hot.c.id.in_(ids)),
+        )
+    )
+    db.session.execute(delete(hot).where(hot.c.id.in_(ids)))
+    db.session.commit()
+    return len(ids)
+
+
+def archive_closed_sessions(
+    batch_size: Optional[int] = None,
+    older_than: Optional[timedelta] = None,
+    max_batches: Optional[int] = None,
+) -> int:
+    batch_size = batch_size or Config.ARCHIVE_BATCH_SIZE
+    if older_than is None:
+        older_than = timedelta(hours=Config.ARCHIVE_AFTER_HOURS)
+    closed_before = datetime.now(timezone.utc).replace(tzinfo=None) - older_than
+
+    moved = batches = 0
+    while max_batches is None or batches < max_batches:
+        count = archive_batch(batch_size, closed_before)
+        if not count:
+            break
+        moved += count
+        batches += 1
+    return moved
+
+
+def all_sessions() -> Any:
+    hot = select(
+        *(ClientParking.__table__.c[name] for name in SESSION_COLUMNS),
+        literal(False).label("archived"),
+    )
+    cold = select(
+        *(ClientParkingHistory.__table__.c[name] for name in SESSION_COLUMNS),
+        literal(True).label("archived"),
+    )
+    return union_all(hot, cold).subquery("all_sessions")
+
+
+class ArchiveWorker(threading.Thread):
+    def __init__(self, app: Flask, interval: float) -> None:
+        super().__init__(name="session-archiver", daemon=True)
+        self.app = app
+        self.interval = interval
+        self.stopped = threading.Event()
+
+    def run(self) -> None:
+        while not self.stopped.wait(self.interval):
+            with self.app.app_context():
+                try:
+                    moved = archive_closed_sessions(
+                        max_batches=self.app.config["ARCHIVE_MAX_BATCHES"]
+                    )
+                    if moved:
+                        logger.info("Archived %d closed parking sessions", moved)
+                except Exception:
+                    db.session.rollback()
+                    logger.exception("Archiving closed parking sessions failed")
+                finally:
+                    db.session.remove()
+
+    def stop(self) -> None:
+        self.stopped.set()
+
+
+def init_archive(app: Flask) -> Optional[ArchiveWorker]:
+    interval = app.config.get("ARCHIVE_INTERVAL_SECONDS")
+    if not interval:
+        return None
+    worker = ArchiveWorker(app, interval)
+    app.extensions["archive_worker"] = worker
+    worker.start()
+    return worker
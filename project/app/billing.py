@@ -0,0 +1,291 @@
+import threading
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+from zoneinfo import ZoneInfo
+
+import numpy as np
+import numpy.typing as npt
+from sqlalchemy import and_, func, select
+
+from project.app.archive import all_sessions
+from project.app.models import ParkingTariff, TariffPeriod
+from project.app.versions import TARIFFS, bump_shared
+from project.config import Config
+from project.database import db
+
+MINUTES_PER_DAY = 1440
+SECONDS_PER_HOUR = 3600
+SECONDS_PER_DAY = 86400
+UNIX_EPOCH_JULIAN_DAY = 2440587.5
+GROUPINGS = ("parking", "client", "day")
+
+IntArray = npt.NDArray[np.int64]
+
+
+@dataclass(frozen=True)
+class Tariff:
+    # Cumulative price from midnight to the start of each minute of the day.
+    cumulative: IntArray
+    daily_cap: Optional[int] = None
+
+    @classmethod
+    def flat(cls, rate: int, daily_cap: Optional[int] = None) -> "Tariff":
+        return cls.from_periods(rate, (), daily_cap)
+
+    @classmethod
+    def from_periods(
+        cls,
+        rate: int,
+        periods: Iterable[Tuple[int, int, int]],
+        daily_cap: Optional[int] = None,
+    ) -> "Tariff":
+        rates = np.full(MINUTES_PER_DAY, rate, dtype=np.int64)
+        for start, end, period_rate in periods:
+            if start <= end:
+                rates[start:end] = period_rate
+            else:
+                rates[start:] = period_rate
+                rates[:end] = period_rate
+        cumulative = np.concatenate(([0], np.cumsum(rates))).astype(np.int64)
+        return cls(cumulative=cumulative, daily_cap=daily_cap)
+
+    @property
+    def day_total(self) -> int:
+        return int(self.cumulative[-1])
+
+    @property
+    def flat_rate(self) -> Optional[int]:
+        # A linear tariff prices a whole group from its summed minutes.
+        rates = np.diff(self.cumulative)
+        if self.daily_cap is not None or np.any(rates != rates[0]):
+            return None
+        return int(rates[0])
+
+    def price(self, start: IntArray, end: IntArray) -> IntArray:
+        # start/end are absolute minute numbers since the Unix epoch.
+        start_day, start_minute = np.divmod(start, MINUTES_PER_DAY)
+        end_day, end_minute = np.divmod(end, MINUTES_PER_DAY)
+        head = self.cumulative[start_minute]
+        tail = self.cumulative[end_minute]
+
+        if self.daily_cap is None:
+            return (end_day - start_day) * self.day_total + tail - head
+
+        cap = self.daily_cap
+        same_day = np.minimum(tail - head, cap)
+        first_day = np.minimum(self.day_total - head, cap)
+        middle = np.maximum(end_day - start_day - 1, 0) * min(self.day_total, cap)
+        last_day = np.minimum(tail, cap)
+        amounts: IntArray = np.where(
+            start_day == end_day, same_day, first_day + middle + last_day
+        )
+        return amounts
+
+
+class TariffBook:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._tariffs: Dict[int, Tariff] = {}
+        self._default = Tariff.flat(Config.PARKING_RATE_PER_MINUTE)
+        self._zone: Optional[ZoneInfo] = None
+
+    def configure(self, zone: str) -> None:
+        with self._lock:
+            self._zone = None if zone == "UTC" else ZoneInfo(zone)
+
+    def local(self, start: IntArray, end: IntArray) -> Tuple[IntArray, IntArray]:
+        # Periods and daily caps are set in the tariff zone's wall clock.
+        with self._lock:
+            zone = self._zone
+        if zone is None:
+            return start, end
+        hours, index = np.unique(start // 60, return_inverse=True)
+        offsets = np.array(
+            [_offset_minutes(zone, hour) for hour in hours.tolist()], dtype=np.int64
+        )
+        shift = offsets[index.reshape(start.shape)]
+        return start + shift, end + shift
+
+    def get(self, parking_id: int) -> Tariff:
+        with self._lock:
+            return self._tariffs.get(parking_id) or self._default
+
+    def load(self, tariffs: Dict[int, Tariff]) -> None:
+        with self._lock:
+            self._tariffs = dict(tariffs)
+
+    def rebuild(self) -> None:
+        self.load(tariffs_from_rows(db.session.execute(tariff_statement())))
+
+    def set(self, parking_id: int, tariff: Tariff) -> None:
+        with self._lock:
+            self._tariffs[parking_id] = tariff
+
+    def price(self, parking_ids: IntArray, start: IntArray, end: IntArray) -> IntArray:
+        start, end = self.local(start, end)
+        amounts = np.zeros(len(parking_ids), dtype=np.int64)
+        present = set(np.unique(parking_ids).tolist())
+        with self._lock:
+            custom = {pid: t for pid, t in self._tariffs.items() if pid in present}
+            default = self._default
+        priced = np.zeros(len(parking_ids), dtype=bool)
+        for parking_id, tariff in custom.items():
+            mask = parking_ids == parking_id
+            amounts[mask] = tariff.price(start[mask], end[mask])
+            priced |= mask
+        rest = ~priced
+        amounts[rest] = default.price(start[rest], end[rest])
+        return amounts
+
+
+def _offset_minutes(zone: ZoneInfo, hour: int) -> int:
+    moment = datetime.fromtimestamp(hour * SECONDS_PER_HOUR, zone)
+    return int((moment.utcoffset() or timedelta()).total_seconds()) // 60
+
+
+tariffs = TariffBook()
+
+
+def tariff_statement() -> Any:
+    return select(
+        ParkingTariff.parking_id,
+        ParkingTariff.rate_per_minute,
+        ParkingTariff.daily_cap,
+        TariffPeriod.start_minute,
+        TariffPeriod.end_minute,
+        TariffPeriod.rate_per_minute,
+    ).outerjoin(TariffPeriod, TariffPeriod.parking_id == ParkingTariff.parking_id)
+
+
+def tariffs_from_rows(rows: Iterable[Any]) -> Dict[int, Tariff]:
+    schedules: Dict[int, Tuple[int, Optional[int], List[Tuple[int, int, int]]]] = {}
+    for parking_id, rate, cap, start, end, period_rate in rows:
+        _, _, periods = schedules.setdefault(parking_id, (rate, cap, []))
+        if start is not None:
+            periods.append((start, end, period_rate))
+    return {
+        parking_id: Tariff.from_periods(rate, periods, cap)
+        for parking_id, (rate, cap, periods) in schedules.items()
+    }
+
+
+def save_tariff(
+    parking_id: int,
+    rate_per_minute: int,
+    periods: Sequence[Tuple[int, int, int]] = (),
+    daily_cap: Optional[int] = None,
+) -> Tariff:
+    tariff = db.session.get(ParkingTariff, parking_id) or ParkingTariff(
+        parking_id=parking_id
+    )
+    tariff.rate_per_minute = rate_per_minute
+    tariff.daily_cap = daily_cap
+    tariff.periods = [
+        TariffPeriod(start_minute=start, end_minute=end, rate_per_minute=rate)
+        for start, end, rate in periods
+    ]
+    db.session.add(tariff)
+    bump_shared(TARIFFS)
+    db.session.commit()
+
+    priced = Tariff.from_periods(rate_per_minute, periods, daily_cap)
+    tariffs.set(parking_id, priced)
+    return priced
+
+
+def billable_span(seconds_in: npt.ArrayLike, seconds_out: npt.ArrayLike) -> Any:
+    seconds_in = np.asarray(seconds_in, dtype=np.float64)
+    seconds_out = np.asarray(seconds_out, dtype=np.float64)
+    start = np.floor(seconds_in / 60).astype(np.int64)
+    minutes = np.floor((seconds_out - seconds_in) / 60).astype(np.int64)
+    return start, start + np.maximum(minutes, 0)
+
+
+def _epoch_seconds(moment: datetime) -> float:
+    return (moment.replace(tzinfo=None) - datetime(1970, 1, 1)).total_seconds()
+
+
+def price_session(parking_id: int, time_in: datetime, time_out: datetime) -> int:
+    start, end = billable_span([_epoch_seconds(time_in)], [_epoch_seconds(time_out)])
+    start, end = tariffs.local(start, end)
+    return int(tariffs.get(parking_id).price(start, end)[0])
+
+
+def epoch_seconds(column: Any) -> Any:
+    # julianday() is a double with ~10µs resolution; rounding to milliseconds
+    # keeps whole-minute durations from flooring one minute short.
+    seconds = (func.julianday(column) - UNIX_EPOCH_JULIAN_DAY) * SECONDS_PER_DAY
+    return func.round(seconds, 3)
+
+
+def _day_bounds(value: Optional[date]) -> Optional[datetime]:
+    return None if value is None else datetime(value.year, value.month, value.day)
+
+
+def revenue_report(
+    group_by: str = "parking",
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    chunk_size: Optional[int] = None,
+) -> List[Dict[str, Any]]:
+    if group_by not in GROUPINGS:
+        raise ValueError(f"group_by должен быть одним из: {', '.join(GROUPINGS)}")
+
+    sessions = all_sessions()
+    conditions = [sessions.c.time_out.is_not(None)]
+    if date_from is not None:
+        conditions.append(sessions.c.time_out >= _day_bounds(date_from))
+    if date_to is not None:
+        conditions.append(sessions.c.time_out < _day_bounds(date_to))
+    statement = select(
+        sessions.c.parking_id,
+        sessions.c.client_id,
+        epoch_seconds(sessions.c.time_in),
+        epoch_seconds(sessions.c.time_out),
+    ).where(and_(*conditions))
+
+    totals: Dict[int, np.ndarray] = {}
+    result = db.session.execute(
+        statement.execution_options(yield_per=chunk_size or Config.STREAM_BATCH_SIZE)
+    )
+    for chunk in result.partitions():
+        columns = np.array(chunk, dtype=np.float64).T
+        parking_ids = columns[0].astype(np.int64)
+        start, end = billable_span(columns[2], columns[3])
+        amounts = tariffs.price(parking_ids, start, end)
+
+        if group_by == "parking":
+            keys = parking_ids
+        elif group_by == "client":
+            keys = columns[1].astype(np.int64)
+        else:
+            keys = np.floor(columns[3] / SECONDS_PER_DAY).astype(np.int64)
+
+        unique, inverse = np.unique(keys, return_inverse=True)
+        sums = np.stack(
+            [
+                np.bincount(inverse, minlength=len(unique)),
+                np.bincount(inverse, weights=end - start, minlength=len(unique)),
+                np.bincount(inverse, weights=amounts, minlength=len(unique)),
+            ],
+            axis=1,
+        ).astype(np.int64)
+        for key, row in zip(unique.tolist(), sums):
+            totals[key] = totals[key] + row if key in totals else row
+
+    rows = []
+    for key in sorted(totals):
+        sessions_count, minutes, amount = (int(v) for v in totals[key])
+        label: Any = key
+        if group_by == "day":
+            label = np.datetime64(key, "D").astype(str)
+        rows.append(
+            {
+                group_by: label,
+                "sessions": sessions_count,
+                "minutes": minutes,
+                "amount": amount,
+            }
+        )
+    return rows
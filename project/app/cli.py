@@ -0,0 +1,155 @@
+import csv
+import sys
+from datetime import datetime, timedelta
+from typing import IO, Any, Dict, Optional, Tuple
+
+import click
+from flask import Flask
+
+from project.app.analytics import refresh_rollups
+from project.app.archive import archive_closed_sessions
+from project.app.billing import GROUPINGS, revenue_report, save_tariff
+from project.app.stats import check_stats
+from project.app.transfer import (
+    EXPORTS,
+    FORMATS,
+    IMPORTS,
+    export_records,
+    import_records,
+    read_records,
+)
+
+
+@click.command("archive-sessions")
+@click.option("--batch-size", type=int, help="Sessions moved per transaction.")
+@click.option("--older-than-hours", type=float, help="Only sessions closed earlier.")
+@click.option("--max-batches", type=int, help="Stop after this many batches.")
+def archive_sessions_command(
+    batch_size: Optional[int],
+    older_than_hours: Optional[float],
+    max_batches: Optional[int],
+) -> None:
+    """Move closed parking sessions into client_parking_history."""
+    older_than = None if older_than_hours is None else timedelta(hours=older_than_hours)
+    moved = archive_closed_sessions(batch_size, older_than, max_batches)
+    click.echo(f"Archived {moved} sessions")
+
+
+def _parse_period(value: str) -> Tuple[int, int, int]:
+    try:
+        span, rate = value.split("=")
+        start, end = (datetime.strptime(t, "%H:%M") for t in span.split("-"))
+        return start.hour * 60 + start.minute, end.hour * 60 + end.minute, int(rate)
+    except ValueError as e:
+        raise click.BadParameter(f"{value!r} is not HH:MM-HH:MM=RATE") from e
+
+
+@click.command("set-tariff")
+@click.argument("parking_id", type=int)
+@click.option("--rate", type=int, required=True, help="Base rate per minute.")
+@click.option("--period", "periods", multiple=True, help="HH:MM-HH:MM=RATE")
+@click.option("--daily-cap", type=int, help="Maximum charge per calendar day.")
+def set_tariff_command(
+    parking_id: int, rate: int, periods: Tuple[str, ...], daily_cap: Optional[int]
+) -> None:
+    """Set the tariff schedule of a parking.
+
+    Running servers reload tariffs within SHARED_VERSIONS_POLL_SECONDS.
+    """
+    save_tariff(parking_id, rate, [_parse_period(p) for p in periods], daily_cap)
+    click.echo(f"Tariff saved for parking {parking_id}")
+
+
+@click.command("revenue-report")
+@click.option("--group-by", type=click.Choice(GROUPINGS), default="parking")
+@click.option("--from", "date_from", type=click.DateTime(["%Y-%m-%d"]))
+@click.option("--to", "date_to", type=click.DateTime(["%Y-%m-%d"]))
+def revenue_report_command(
+    group_by: str, date_from: Optional[datetime], date_to: Optional[datetime]
+) -> None:
+    """Price closed sessions and print revenue totals as CSV."""
+    rows = revenue_report(
+        group_by,
+        date_from.date() if date_from else None,
+        date_to.date() if date_to else None,
+    )
+    writer = csv.writer(sys.stdout)
+    writer.writerow([group_by, "sessions", "minutes", "amount"])
+    for row in rows:
+        writer.writerow(row.values())
+
+
+def _format(fmt: Optional[str], name: str) -> str:
+    if fmt:
+        return fmt
+    return "jsonl" if name.endswith((".jsonl", ".ndjson")) else "csv"
+
+
+@click.command("import-data")
+@click.argument("entity", type=click.Choice(sorted(IMPORTS)))
+@click.argument("source", type=click.File("r", encoding="utf-8"))
+@click.option("--format", "fmt", type=click.Choice(FORMATS), help="Default: by name.")
+@click.option("--chunk-size", type=int, help="Rows inserted per transaction.")
+def import_data_command(
+    entity: str, source: IO[str], fmt: Optional[str], chunk_size: Optional[int]
+) -> None:
+    """Stream clients or parkings from CSV/JSONL into the database."""
+
+    def rejected(line_num: int, record: Dict[str, Any], error: str) -> None:
+        click.echo(f"line {line_num}: {error}", err=True)
+
+    records = read_records(source, _format(fmt, source.name))
+    report = import_records(entity, records, rejected, chunk_size)
+    click.echo(f"Imported {report.imported} {entity}, rejected {report.rejected}")
+
+
+@click.command("export-data")
+@click.argument("entity", type=click.Choice(sorted(EXPORTS)))
+@click.argument("target", type=click.File("w", encoding="utf-8"), default="-")
+@click.option("--format", "fmt", type=click.Choice(FORMATS), help="Default: by name.")
+@click.option("--batch-size", type=int, help="Rows fetched per round trip.")
+def export_data_command(
+    entity: str, target: IO[str], fmt: Optional[str], batch_size: Optional[int]
+) -> None:
+    """Stream clients, parkings or the full session history as CSV/JSONL."""
+    exported = export_records(entity, target, _format(fmt, target.name), batch_size)
+    click.echo(f"Exported {exported} {entity}", err=True)
+
+
+@click.command("occupancy-rollup")
+@click.option("--full", is_flag=True, help="Rebuild from every closed session.")
+def occupancy_rollup_command(full: bool) -> None:
+    """Extend hourly occupancy rollups with sessions closed since the last run."""
+    report = refresh_rollups(full)
+    click.echo(
+        f"Rolled up {report.sessions} sessions over {report.parkings} parkings "
+        f"into {report.hours} hours up to {report.watermark:%Y-%m-%d %H:%M:%S}"
+    )
+
+
+@click.command("check-stats")
+@click.option("--repair", is_flag=True, help="Rebuild parking_stats on mismatch.")
+def check_stats_command(repair: bool) -> None:
+    """Compare parking_stats with the live tables and optionally rebuild it."""
+    mismatches = check_stats(repair)
+    for mismatch in mismatches:
+        click.echo(
+            f"parking {mismatch.parking_id}: stored {mismatch.stored}, "
+            f"expected {mismatch.expected}"
+        )
+    if not mismatches:
+        click.echo("parking_stats is consistent")
+    elif repair:
+        click.echo(f"Rebuilt parking_stats after {len(mismatches)} mismatches")
+    else:
+        raise click.exceptions.Exit(1)
+
+
+def register_cli(app: Flask) -> None:
+    app.cli.add_command(archive_sessions_command)
+    app.cli.add_command(set_tariff_command)
+    app.cli.add_command(revenue_report_command)
+    app.cli.add_command(import_data_command)
+    app.cli.add_command(export_data_command)
+    app.cli.add_command(occupancy_rollup_command)
+    app.cli.add_command(check_stats_command)
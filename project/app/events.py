@@ -0,0 +1,96 @@
+import json
+import queue
+import threading
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, Generator, Optional, Set
+
+from project.app.occupancy import occupancy
+
+
+@dataclass(frozen=True)
+class Event:
+    kind: str
+    data: Dict[str, Any]
+
+    def to_sse(self) -> str:
+        payload = json.dumps(self.data, ensure_ascii=False, default=str)
+        return f"event: {self.kind}\ndata: {payload}\n\n"
+
+
+class EventBus:
+    def __init__(self, queue_size: int = 256) -> None:
+        self._lock = threading.Lock()
+        self._subscribers: Set["queue.Queue[Event]"] = set()
+        self.queue_size = queue_size
+
+    def has_subscribers(self) -> bool:
+        with self._lock:
+            return bool(self._subscribers)
+
+    def subscribe(self) -> "queue.Queue[Event]":
+        subscription: "queue.Queue[Event]" = queue.Queue(self.queue_size)
+        with self._lock:
+            self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: "queue.Queue[Event]") -> None:
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def publish(self, kind: str, data: Dict[str, Any]) -> None:
+        event = Event(kind, data)
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscription in subscribers:
+            try:
+                subscription.put_nowait(event)
+            except queue.Full:
+                # A stalled dashboard loses its oldest delta, not the newest.
+                try:
+                    subscription.get_nowait()
+                except queue.Empty:
+                    pass
+                try:
+                    subscription.put_nowait(event)
+                except queue.Full:
+                    # Another publisher took the freed slot first.
+                    pass
+
+    def listen(
+        self, subscription: "queue.Queue[Event]", heartbeat: float
+    ) -> Generator[Optional[Event], None, None]:
+        try:
+            while True:
+                try:
+                    yield subscription.get(timeout=heartbeat)
+                except queue.Empty:
+                    yield None
+        finally:
+            self.unsubscribe(subscription)
+
+
+event_bus = EventBus()
+
+
+def occupancy_state() -> Dict[str, Any]:
+    totals = occupancy.totals()
+    return {
+        "totals": asdict(totals),
+        "parkings": [asdict(parking) for parking in occupancy.parkings()],
+    }
+
+
+def publish_occupancy(kind: str, parking_id: int, **data: Any) -> None:
+    if not event_bus.has_subscribers():
+        return
+    parking = occupancy.peek(parking_id)
+    totals = occupancy.peek_totals()
+    event_bus.publish(
+        kind,
+        {
+            **data,
+            "parking_id": parking_id,
+            "parking": asdict(parking) if parking else None,
+            "totals": asdict(totals) if totals else None,
+        },
+    )
@@ -0,0 +1,99 @@
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+from markupsafe import Markup
+
+
+class FragmentCache:
+    def __init__(self, max_bytes: int = 8 * 1024 * 1024) -> None:
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Hashable, Tuple[str, Markup, int]]" = OrderedDict()
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def configure(self, max_bytes: int) -> None:
+        with self._lock:
+            self.max_bytes = max_bytes
+            self._evict()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def get(self, key: Hashable, version: str) -> Optional[Markup]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != version:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: Hashable, version: str, html: str) -> Markup:
+        fragment = Markup(html)
+        cost = len(html.encode())
+        with self._lock:
+            # One entry per key: a newer version replaces the stale fragment.
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.size -= previous[2]
+            if cost <= self.max_bytes:
+                self._entries[key] = (version, fragment, cost)
+                self.size += cost
+                self._evict()
+        return fragment
+
+    def _evict(self) -> None:
+        while self.size > self.max_bytes:
+            _, (_, _, cost) = self._entries.popitem(last=False)
+            self.size -= cost
+            self.evictions += 1
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self.size,
+            }
+
+
+fragments = FragmentCache()
+
+
+def fragment_metrics() -> List[Tuple[str, str, str, List[Any]]]:
+    stats = fragments.stats()
+    return [
+        (
+            "fragment_cache_hits_total",
+            "counter",
+            "List fragments served without rendering.",
+            [("fragment_cache_hits_total", {}, stats["hits"])],
+        ),
+        (
+            "fragment_cache_misses_total",
+            "counter",
+            "List fragments rendered because they were missing or stale.",
+            [("fragment_cache_misses_total", {}, stats["misses"])],
+        ),
+        (
+            "fragment_cache_evictions_total",
+            "counter",
+            "List fragments evicted to stay within the memory budget.",
+            [("fragment_cache_evictions_total", {}, stats["evictions"])],
+        ),
+        (
+            "fragment_cache_bytes",
+            "gauge",
+            "Size of the rendered fragments held in memory.",
+            [("fragment_cache_bytes", {}, stats["bytes"])],
+        ),
+    ]
@@ -0,0 +1,158 @@
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from sqlalchemy import Integer, and_, cast, func, select
+
+from project.app.archive import all_sessions
+from project.app.billing import billable_span, epoch_seconds, tariffs
+from project.app.models import Parking
+from project.database import db
+
+
+@dataclass(frozen=True)
+class ClientTotals:
+    visits: int
+    total_minutes: int
+    total_billed: int
+    favourite_parking_id: Optional[int]
+    favourite_address: Optional[str]
+
+
+@dataclass(frozen=True)
+class HistoryPage:
+    items: List[Any]
+    before: Optional[int]
+    next_before: Optional[int]
+    limit: int
+
+
+def history_page(client_id: int, before: Optional[int], limit: int) -> HistoryPage:
+    sessions = all_sessions()
+    statement = (
+        select(sessions, Parking.address)
+        .join(Parking, Parking.id == sessions.c.parking_id)
+        .where(sessions.c.client_id == client_id)
+    )
+    if before is not None:
+        statement = statement.where(sessions.c.id < before)
+    rows = db.session.execute(
+        statement.order_by(sessions.c.id.desc()).limit(limit + 1)
+    ).all()
+    next_before = rows[limit - 1].id if len(rows) > limit else None
+    return HistoryPage(list(rows[:limit]), before, next_before, limit)
+
+
+def totals_statement(client_id: int) -> Any:
+    sessions = all_sessions()
+    duration = epoch_seconds(sessions.c.time_out) - epoch_seconds(sessions.c.time_in)
+    return (
+        select(
+            sessions.c.parking_id,
+            Parking.address,
+            func.count().label("visits"),
+            func.coalesce(func.sum(cast(duration / 60, Integer)), 0).label("minutes"),
+        )
+        .join(Parking, Parking.id == sessions.c.parking_id)
+        .where(sessions.c.client_id == client_id)
+        .group_by(sessions.c.parking_id, Parking.address)
+    )
+
+
+def _billed(client_id: int, parking_ids: List[int]) -> int:
+    # Time-of-day and capped tariffs depend on when each minute fell, so only
+    # these parkings are priced session by session.
+    sessions = all_sessions()
+    rows = db.session.execute(
+        select(
+            sessions.c.parking_id,
+            epoch_seconds(sessions.c.time_in),
+            epoch_seconds(sessions.c.time_out),
+        ).where(
+            and_(
+                sessions.c.client_id == client_id,
+                sessions.c.parking_id.in_(parking_ids),
+                sessions.c.time_out.is_not(None),
+            )
+        )
+    ).all()
+    if not rows:
+        return 0
+    columns = np.array(rows, dtype=np.float64).T
+    start, end = billable_span(columns[1], columns[2])
+    return int(tariffs.price(columns[0].astype(np.int64), start, end).sum())
+
+
+def compute_totals(client_id: int) -> ClientTotals:
+    groups = db.session.execute(totals_statement(client_id)).all()
+    billed = 0
+    priced_per_session = []
+    for group in groups:
+        rate = tariffs.get(group.parking_id).flat_rate
+        if rate is None:
+            priced_per_session.append(group.parking_id)
+        else:
+            billed += rate * group.minutes
+    if priced_per_session:
+        billed += _billed(client_id, priced_per_session)
+
+    favourite = max(
+        groups, key=lambda g: (g.visits, g.minutes, -g.parking_id), default=None
+    )
+    return ClientTotals(
+        visits=sum(group.visits for group in groups),
+        total_minutes=sum(group.minutes for group in groups),
+        total_billed=billed,
+        favourite_parking_id=favourite.parking_id if favourite else None,
+        favourite_address=favourite.address if favourite else None,
+    )
+
+
+class TotalsCache:
+    def __init__(self, max_entries: int = 10_000) -> None:
+        self._lock = threading.Lock()
+        self._totals: "OrderedDict[int, ClientTotals]" = OrderedDict()
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._generation = 0
+
+    def get(self, client_id: int) -> ClientTotals:
+        with self._lock:
+            cached = self._totals.get(client_id)
+            if cached is not None:
+                self._totals.move_to_end(client_id)
+                self.hits += 1
+                return cached
+            self.misses += 1
+            generation = self._generation
+
+        totals = compute_totals(client_id)
+        with self._lock:
+            # An exit committed while computing makes this result stale.
+            if generation != self._generation:
+                return totals
+            self._totals[client_id] = totals
+            while len(self._totals) > self.max_entries:
+                self._totals.popitem(last=False)
+        return totals
+
+    def invalidate(self, *client_ids: int) -> None:
+        with self._lock:
+            self._generation += 1
+            for client_id in client_ids:
+                self._totals.pop(client_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._totals.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses}
+
+
+client_totals = TotalsCache()
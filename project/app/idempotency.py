@@ -0,0 +1,271 @@
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from functools import partial, wraps
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple, TypeVar, cast
+
+from flask import Response, g, jsonify, make_response, request
+from sqlalchemy import delete, select
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.exc import SQLAlchemyError
+
+from project.app.models import IdempotencyRecord
+from project.database import db
+
+logger = logging.getLogger(__name__)
+
+View = TypeVar("View", bound=Callable[..., Any])
+Key = Tuple[str, str]
+
+HEADER = "Idempotency-Key"
+INVALID_KEY = "Неверный ключ идемпотентности"
+IN_FLIGHT = "Запрос с этим ключом уже выполняется"
+MAX_KEY_LENGTH = 255
+PURGE_EVERY = 1000
+# Status of a key whose write committed before its response was stored.
+PENDING = 0
+
+
+class KeyInUse(Exception):
+    pass
+
+
+@dataclass(frozen=True)
+class StoredResponse:
+    fingerprint: str
+    status: int
+    body: str
+    created_at: datetime
+
+    def replay(self) -> Response:
+        response = Response(self.body, self.status, mimetype="application/json")
+        response.headers["Idempotent-Replayed"] = "true"
+        return response
+
+
+@dataclass(frozen=True)
+class PendingKey:
+    key: Key
+    fingerprint: str
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def lookup_statement(key: Key, cutoff: datetime) -> Any:
+    return select(
+        IdempotencyRecord.fingerprint,
+        IdempotencyRecord.status,
+        IdempotencyRecord.body,
+        IdempotencyRecord.created_at,
+    ).where(
+        IdempotencyRecord.scope == key[0],
+        IdempotencyRecord.key == key[1],
+        IdempotencyRecord.created_at > cutoff,
+    )
+
+
+def record_statement(key: Key, stored: StoredResponse, where: Any = None) -> Any:
+    values = {
+        "fingerprint": stored.fingerprint,
+        "status": stored.status,
+        "body": stored.body,
+        "created_at": stored.created_at,
+    }
+    # An expired record with the same key is overwritten in place.
+    return (
+        insert(IdempotencyRecord)
+        .values(scope=key[0], key=key[1], **values)
+        .on_conflict_do_update(
+            index_elements=["scope", "key"], set_=values, where=where
+        )
+    )
+
+
+def pending_statement(pending: PendingKey, ttl: timedelta) -> Any:
+    now = _now()
+    # Affects no row while another process holds a live record for the key.
+    return record_statement(
+        pending.key,
+        StoredResponse(pending.fingerprint, PENDING, "", now),
+        where=IdempotencyRecord.created_at <= now - ttl,
+    )
+
+
+def rejection(stored: StoredResponse, fingerprint: str) -> Optional[Tuple[str, int]]:
+    if stored.fingerprint != fingerprint:
+        return "Ключ идемпотентности использован с другим запросом", 422
+    if stored.status == PENDING:
+        return "Запрос с этим ключом уже выполнен, но его ответ не сохранён", 409
+    return None
+
+
+class IdempotencyStore:
+    def __init__(self, max_entries: int = 10_000, ttl_seconds: int = 86400) -> None:
+        self._lock = threading.Lock()
+        self._responses: "OrderedDict[Key, StoredResponse]" = OrderedDict()
+        self._in_flight: Set[Key] = set()
+        self.max_entries = max_entries
+        self.ttl = timedelta(seconds=ttl_seconds)
+        self.hits = 0
+        self.misses = 0
+        self._stored = 0
+
+    def configure(self, max_entries: int, ttl_seconds: int) -> None:
+        with self._lock:
+            self.max_entries = max_entries
+            self.ttl = timedelta(seconds=ttl_seconds)
+            self._evict()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._responses.clear()
+
+    def get(self, key: Key) -> Optional[StoredResponse]:
+        cutoff = _now() - self.ttl
+        with self._lock:
+            cached = self._responses.pop(key, None)
+            if cached is not None and cached.created_at > cutoff:
+                self._responses[key] = cached
+                self.hits += 1
+                return cached
+
+        # Not in memory after a restart or eviction: fall back to the table.
+        record = db.session.execute(lookup_statement(key, cutoff)).first()
+        if record is None:
+            with self._lock:
+                self.misses += 1
+            return None
+        stored = StoredResponse(*record)
+        self._remember(key, stored)
+        with self._lock:
+            self.hits += 1
+        return stored
+
+    def put(self, key: Key, fingerprint: str, response: Response) -> StoredResponse:
+        stored = StoredResponse(
+            fingerprint, response.status_code, response.get_data(as_text=True), _now()
+        )
+        with self._lock:
+            self._stored += 1
+            purge = self._stored % PURGE_EVERY == 0
+        try:
+            db.session.execute(record_statement(key, stored))
+            if purge:
+                db.session.execute(
+                    delete(IdempotencyRecord).where(
+                        IdempotencyRecord.created_at <= stored.created_at - self.ttl
+                    )
+                )
+            db.session.commit()
+        except SQLAlchemyError:
+            # The pending record committed with the write still blocks a rerun.
+            db.session.rollback()
+            logger.exception("Could not persist idempotency key %s", key[1])
+        self._remember(key, stored)
+        return stored
+
+    def claim(self, pending: PendingKey) -> None:
+        claimed = db.session.execute(pending_statement(pending, self.ttl))
+        if claimed.rowcount != 1:
+            raise KeyInUse()
+
+    def acquire(self, key: Key) -> bool:
+        with self._lock:
+            if key in self._in_flight:
+                return False
+            self._in_flight.add(key)
+            return True
+
+    def release(self, key: Key) -> None:
+        with self._lock:
+            self._in_flight.discard(key)
+
+    def _remember(self, key: Key, stored: StoredResponse) -> None:
+        with self._lock:
+            self._responses.pop(key, None)
+            self._responses[key] = stored
+            self._evict()
+
+    def _evict(self) -> None:
+        while len(self._responses) > self.max_entries:
+            self._responses.popitem(last=False)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses}
+
+
+idempotency = IdempotencyStore()
+
+
+def idempotency_metrics() -> List[Tuple[str, str, str, List[Any]]]:
+    stats = idempotency.stats()
+    return [
+        (
+            "idempotency_replays_total",
+            "counter",
+            "Idempotency-Key lookups answered with a stored response.",
+            [("idempotency_replays_total", {}, stats["hits"])],
+        ),
+        (
+            "idempotency_misses_total",
+            "counter",
+            "Idempotency-Key lookups without a stored response.",
+            [("idempotency_misses_total", {}, stats["misses"])],
+        ),
+    ]
+
+
+def fingerprint_of(body: bytes) -> str:
+    return hashlib.sha256(body).hexdigest()
+
+
+def valid_key(header: str) -> bool:
+    return 0 < len(header) <= MAX_KEY_LENGTH
+
+
+def idempotent(view: View) -> View:
+    @wraps(view)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        header = request.headers.get(HEADER)
+        if header is None:
+            return view(*args, **kwargs)
+        if not valid_key(header):
+            return jsonify({"error": INVALID_KEY}), 400
+
+        key = (request.endpoint or request.path, header)
+        fingerprint = fingerprint_of(request.get_data())
+        if not idempotency.acquire(key):
+            return jsonify({"error": IN_FLIGHT}), 409
+        try:
+            stored = idempotency.get(key)
+            if stored is None:
+                # The key is claimed in the same transaction as the write.
+                g.write_extras = [
+                    partial(idempotency.claim, PendingKey(key, fingerprint))
+                ]
+                try:
+                    response = make_response(view(*args, **kwargs))
+                except KeyInUse:
+                    return jsonify({"error": IN_FLIGHT}), 409
+                finally:
+                    g.pop("write_extras", None)
+                # Server errors are transient, the client may retry them.
+                if response.status_code < 500 and not response.is_streamed:
+                    idempotency.put(key, fingerprint, response)
+                return response
+        finally:
+            idempotency.release(key)
+
+        rejected = rejection(stored, fingerprint)
+        if rejected is not None:
+            message, status = rejected
+            return jsonify({"error": message}), status
+        return stored.replay()
+
+    return cast(View, wrapper)
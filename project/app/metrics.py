@@ -0,0 +1,254 @@
+import logging
+import re
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from flask import Flask, Response, current_app, g, has_app_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import ExceptionContext
+
+from project.database import db
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+Sample = Tuple[str, Dict[str, str], float]
+Family = Tuple[str, str, str, List[Sample]]
+Collector = Callable[[], Iterable[Family]]
+
+
+class Histogram:
+    def __init__(self, buckets: Sequence[float]) -> None:
+        self.buckets = tuple(buckets)
+        self.counts = [0] * len(self.buckets)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+        self.total += value
+        self.count += 1
+
+    def samples(self, name: str, labels: Dict[str, str]) -> List[Sample]:
+        samples: List[Sample] = [
+            (f"{name}_bucket", {**labels, "le": _format_value(bound)}, count)
+            for bound, count in zip(self.buckets, self.counts)
+        ]
+        samples.append((f"{name}_bucket", {**labels, "le": "+Inf"}, self.count))
+        samples.append((f"{name}_sum", labels, self.total))
+        samples.append((f"{name}_count", labels, self.count))
+        return samples
+
+
+@dataclass
+class RequestMetrics:
+    started: float = field(default_factory=time.perf_counter)
+    queries: int = 0
+    db_time: float = 0.0
+    shapes: Counter[str] = field(default_factory=Counter)
+
+
+class MetricsRegistry:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._collectors: List[Collector] = []
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.requests: Counter[Tuple[str, str, str]] = Counter()
+            self.latency: Dict[str, Histogram] = {}
+            self.queries: Dict[str, Histogram] = {}
+            self.db_time: Dict[str, Histogram] = {}
+            self.n_plus_one: Counter[str] = Counter()
+
+    def register_collector(self, collector: Collector) -> None:
+        with self._lock:
+            if collector not in self._collectors:
+                self._collectors.append(collector)
+
+    def observe_request(
+        self, endpoint: str, method: str, status: int, state: RequestMetrics
+    ) -> None:
+        elapsed = time.perf_counter() - state.started
+        with self._lock:
+            self.requests[(endpoint, method, str(status))] += 1
+            self.latency.setdefault(endpoint, Histogram(LATENCY_BUCKETS)).observe(
+                elapsed
+            )
+            self.queries.setdefault(endpoint, Histogram(QUERY_COUNT_BUCKETS)).observe(
+                state.queries
+            )
+            self.db_time.setdefault(endpoint, Histogram(LATENCY_BUCKETS)).observe(
+                state.db_time
+            )
+
+    def observe_n_plus_one(self, endpoint: str) -> None:
+        with self._lock:
+            self.n_plus_one[endpoint] += 1
+
+    def _families(self) -> List[Family]:
+        def histograms(name: str, source: Dict[str, Histogram]) -> List[Sample]:
+            return [
+                sample
+                for endpoint, histogram in sorted(source.items())
+                for sample in histogram.samples(name, {"endpoint": endpoint})
+            ]
+
+        with self._lock:
+            families: List[Family] = [
+                (
+                    "http_requests_total",
+                    "counter",
+                    "HTTP requests handled.",
+                    [
+                        (
+                            "http_requests_total",
+                            {"endpoint": e, "method": m, "status": s},
+                            count,
+                        )
+                        for (e, m, s), count in sorted(self.requests.items())
+                    ],
+                ),
+                (
+                    "http_request_duration_seconds",
+                    "histogram",
+                    "Request latency.",
+                    histograms("http_request_duration_seconds", self.latency),
+                ),
+                (
+                    "db_queries_per_request",
+                    "histogram",
+                    "SQL statements executed per request.",
+                    histograms("db_queries_per_request", self.queries),
+                ),
+                (
+                    "db_time_per_request_seconds",
+                    "histogram",
+                    "Time spent executing SQL per request.",
+                    histograms("db_time_per_request_seconds", self.db_time),
+                ),
+                (
+                    "n_plus_one_detections_total",
+                    "counter",
+                    "Requests that repeated one statement shape too often.",
+                    [
+                        ("n_plus_one_detections_total", {"endpoint": e}, count)
+                        for e, count in sorted(self.n_plus_one.items())
+                    ],
+                ),
+            ]
+            collectors = list(self._collectors)
+
+        for collector in collectors:
+            families.extend(collector())
+        return families
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for name, kind, help_text, samples in self._families():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for sample_name, labels, value in samples:
+                lines.append(f"{sample_name}{_format_labels(labels)} {value:g}")
+        return "\n".join(lines) + "\n"
+
+
+def _format_value(value: float) -> str:
+    return f"{value:g}"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    pairs = ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items())
+    return "{" + pairs + "}"
+
+
+def _statement_shape(statement: str) -> str:
+    return re.sub(r"\s+", " ", statement).strip()
+
+
+def _current_request() -> Optional[RequestMetrics]:
+    if not has_app_context():
+        return None
+    state: Optional[RequestMetrics] = g.get("request_metrics")
+    return state
+
+
+def _before_cursor_execute(conn: Any, *args: Any) -> None:
+    if _current_request() is not None:
+        # A connection runs one statement at a time, one timestamp is enough.
+        conn.info["query_started"] = time.perf_counter()
+
+
+def _query_finished(conn: Any, statement: Optional[str]) -> None:
+    started = conn.info.pop("query_started", None)
+    state = _current_request()
+    if state is None or started is None:
+        return
+    state.db_time += time.perf_counter() - started
+    state.queries += 1
+    if statement is not None:
+        state.shapes[_statement_shape(statement)] += 1
+
+
+def _after_cursor_execute(conn: Any, cursor: Any, statement: str, *args: Any) -> None:
+    _query_finished(conn, statement)
+
+
+def _handle_error(context: ExceptionContext) -> None:
+    if context.connection is not None:
+        _query_finished(context.connection, context.statement)
+
+
+def _start_request() -> None:
+    g.request_metrics = RequestMetrics()
+
+
+def _finish_request(response: Response) -> Response:
+    state = _current_request()
+    if state is None:
+        return response
+    g.request_metrics = None
+
+    endpoint = request.endpoint or "unknown"
+    metrics.observe_request(endpoint, request.method, response.status_code, state)
+
+    threshold = current_app.config.get("N_PLUS_ONE_THRESHOLD")
+    if threshold:
+        for shape, count in state.shapes.items():
+            if count > threshold:
+                metrics.observe_n_plus_one(endpoint)
+                logger.warning(
+                    "Possible N+1 in %s: statement ran %d times: %s",
+                    endpoint,
+                    count,
+                    shape[:200],
+                )
+    return response
+
+
+def init_metrics(app: Flask) -> None:
+    with app.app_context():
+        engine = db.engine
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(engine, "handle_error", _handle_error)
+    app.before_request(_start_request)
+    app.after_request(_finish_request)
+
+
+metrics = MetricsRegistry()
@@ -1,9 +1,10 @@
 from datetime import datetime
 from typing import Optional
 
-from sqlalchemy import Boolean, DateTime, ForeignKey, Integer, String
-from sqlalchemy.orm import Mapped, mapped_column, relationship
+from sqlalchemy import Boolean, DateTime, ForeignKey, Index, Integer, String, Text, text
+from sqlalchemy.orm import Mapped, mapped_column, relationship, validates
 
+from project.app.plates import normalize_plate, plate_default
 from project.database import db
 
 
@@ -15,11 +16,22 @@ class Client(db.Model):  # type: ignore[name-defined]
     surname: Mapped[str] = mapped_column(String(50), nullable=False)
     credit_card: Mapped[Optional[str]] = mapped_column(String(50))
     car_number: Mapped[str] = mapped_column(String(10))
+    plate: Mapped[Optional[str]] = mapped_column(String(10), default=plate_default)
 
     parking_sessions: Mapped[list["ClientParking"]] = relationship(
         "ClientParking", back_populates="client"
     )
 
+    __table_args__ = (
+        Index("ix_client_car_number", "car_number"),
+        Index("ix_client_plate", "plate", unique=True),
+    )
+
+    @validates("car_number")
+    def _normalize_plate(self, key: str, car_number: str) -> str:
+        self.plate = normalize_plate(car_number)
+        return car_number
+
 
 class Parking(db.Model):  # type: ignore[name-defined]
     __tablename__ = "parking"
@@ -33,6 +45,11 @@ class Parking(db.Model):  # type: ignore[name-defined]
     parking_sessions: Mapped[list["ClientParking"]] = relationship(
         "ClientParking", back_populates="parking"
     )
+    stats: Mapped[Optional["ParkingStats"]] = relationship(
+        "ParkingStats",
+        primaryjoin="foreign(ParkingStats.parking_id) == Parking.id",
+        viewonly=True,
+    )
 
 
 class ClientParking(db.Model):  # type: ignore[name-defined]
@@ -49,4 +66,109 @@ class ClientParking(db.Model):  # type: ignore[name-defined]
         "Parking", back_populates="parking_sessions"
     )
 
-    __table_args__ = ()
+    __table_args__ = (
+        Index(
+            "ix_client_parking_active",
+            "client_id",
+            unique=True,
+            sqlite_where=text("time_out IS NULL"),
+        ),
+        Index(
+            "ix_client_parking_client_parking_time_out",
+            "client_id",
+            "parking_id",
+            "time_out",
+        ),
+        Index("ix_client_parking_time_out", "time_out"),
+    )
+
+
+class ClientParkingHistory(db.Model):  # type: ignore[name-defined]
+    __tablename__ = "client_parking_history"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=False)
+    client_id: Mapped[int] = mapped_column(ForeignKey("client.id"))
+    parking_id: Mapped[int] = mapped_column(ForeignKey("parking.id"))
+    time_in: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    time_out: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+
+    __table_args__ = (
+        Index("ix_client_parking_history_client_time_in", "client_id", "time_in"),
+        Index("ix_client_parking_history_time_out", "time_out"),
+    )
+
+
+class ParkingTariff(db.Model):  # type: ignore[name-defined]
+    __tablename__ = "parking_tariff"
+
+    parking_id: Mapped[int] = mapped_column(ForeignKey("parking.id"), primary_key=True)
+    rate_per_minute: Mapped[int] = mapped_column(Integer, nullable=False)
+    daily_cap: Mapped[Optional[int]] = mapped_column(Integer)
+
+    periods: Mapped[list["TariffPeriod"]] = relationship(
+        "TariffPeriod",
+        cascade="all, delete-orphan",
+        order_by="TariffPeriod.start_minute",
+    )
+
+
+class TariffPeriod(db.Model):  # type: ignore[name-defined]
+    __tablename__ = "tariff_period"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    parking_id: Mapped[int] = mapped_column(
+        ForeignKey("parking_tariff.parking_id"), index=True
+    )
+    start_minute: Mapped[int] = mapped_column(Integer, nullable=False)
+    end_minute: Mapped[int] = mapped_column(Integer, nullable=False)
+    rate_per_minute: Mapped[int] = mapped_column(Integer, nullable=False)
+
+
+class OccupancyRollup(db.Model):  # type: ignore[name-defined]
+    __tablename__ = "occupancy_rollup"
+
+    parking_id: Mapped[int] = mapped_column(ForeignKey("parking.id"), primary_key=True)
+    hour: Mapped[datetime] = mapped_column(DateTime, primary_key=True)
+    peak: Mapped[int] = mapped_column(Integer, nullable=False)
+    occupied_seconds: Mapped[int] = mapped_column(Integer, nullable=False)
+
+
+class RollupWatermark(db.Model):  # type: ignore[name-defined]
+    __tablename__ = "rollup_watermark"
+
+    name: Mapped[str] = mapped_column(String(50), primary_key=True)
+    time_out: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+
+
+class ParkingStats(db.Model):  # type: ignore[name-defined]
+    __tablename__ = "parking_stats"
+
+    # Row 0 holds the totals over every parking.
+    parking_id: Mapped[int] = mapped_column(
+        Integer, primary_key=True, autoincrement=False
+    )
+    parkings: Mapped[int] = mapped_column(Integer, nullable=False)
+    places: Mapped[int] = mapped_column(Integer, nullable=False)
+    active_sessions: Mapped[int] = mapped_column(Integer, nullable=False)
+
+    @property
+    def utilization(self) -> float:
+        return self.active_sessions / self.places if self.places > 0 else 0.0
+
+
+class IdempotencyRecord(db.Model):  # type: ignore[name-defined]
+    __tablename__ = "idempotency_key"
+
+    scope: Mapped[str] = mapped_column(String(100), primary_key=True)
+    key: Mapped[str] = mapped_column(String(255), primary_key=True)
+    fingerprint: Mapped[str] = mapped_column(String(64), nullable=False)
+    status: Mapped[int] = mapped_column(Integer, nullable=False)
+    body: Mapped[str] = mapped_column(Text, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime, nullable=False, index=True)
+
+
+class SharedVersion(db.Model):  # type: ignore[name-defined]
+    __tablename__ = "shared_version"
+
+    name: Mapped[str] = mapped_column(String(50), primary_key=True)
+    version: Mapped[int] = mapped_column(Integer, nullable=False)
@@ -0,0 +1,202 @@
+import threading
+from dataclasses import dataclass, replace
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import Select, and_, func, select
+
+from project.app.models import ClientParking, Parking
+from project.database import db
+
+
+@dataclass(frozen=True)
+class ParkingOccupancy:
+    id: int
+    address: str
+    opened: bool
+    count_places: int
+    count_available_places: int
+    active_sessions: int
+
+
+@dataclass(frozen=True)
+class OccupancyTotals:
+    parkings_count: int
+    active_sessions_count: int
+
+
+def occupancy_statement(parking_id: Optional[int] = None) -> Select[Any]:
+    active = and_(
+        ClientParking.parking_id == Parking.id, ClientParking.time_out.is_(None)
+    )
+    statement = (
+        select(
+            Parking.id,
+            Parking.address,
+            Parking.opened,
+            Parking.count_places,
+            Parking.count_available_places,
+            func.count(ClientParking.id),
+        )
+        .outerjoin(ClientParking, active)
+        .group_by(Parking.id)
+    )
+    if parking_id is not None:
+        statement = statement.where(Parking.id == parking_id)
+    return statement
+
+
+def occupancy_entries(rows: Iterable[Any]) -> List[ParkingOccupancy]:
+    return [
+        ParkingOccupancy(
+            id=row[0],
+            address=row[1],
+            opened=bool(row[2]),
+            count_places=row[3],
+            count_available_places=row[4],
+            active_sessions=row[5],
+        )
+        for row in rows
+    ]
+
+
+class OccupancyCache:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._parkings: Dict[int, ParkingOccupancy] = {}
+        self._totals: Optional[OccupancyTotals] = None
+        self.hits = 0
+        self.misses = 0
+
+    def _load(self, parking_id: Optional[int] = None) -> List[ParkingOccupancy]:
+        return occupancy_entries(db.session.execute(occupancy_statement(parking_id)))
+
+    def rebuild(self) -> None:
+        self.load(self._load())
+
+    def load(self, entries: Iterable[ParkingOccupancy]) -> None:
+        parkings = {parking.id: parking for parking in entries}
+        totals = OccupancyTotals(
+            parkings_count=len(parkings),
+            active_sessions_count=sum(p.active_sessions for p in parkings.values()),
+        )
+        with self._lock:
+            self._parkings = parkings
+            self._totals = totals
+
+    def is_loaded(self) -> bool:
+        with self._lock:
+            return self._totals is not None
+
+    def totals(self) -> OccupancyTotals:
+        with self._lock:
+            totals = self._totals
+            if totals is not None:
+                self.hits += 1
+                return totals
+            self.misses += 1
+        self.rebuild()
+        with self._lock:
+            return self._totals or OccupancyTotals(0, 0)
+
+    def parkings(self) -> List[ParkingOccupancy]:
+        with self._lock:
+            if self._totals is not None:
+                self.hits += 1
+                return sorted(self._parkings.values(), key=lambda p: p.id)
+            self.misses += 1
+        self.rebuild()
+        with self._lock:
+            return sorted(self._parkings.values(), key=lambda p: p.id)
+
+    def parking(self, parking_id: int) -> Optional[ParkingOccupancy]:
+        with self._lock:
+            cached = self._parkings.get(parking_id)
+            if cached is not None:
+                self.hits += 1
+                return cached
+            self.misses += 1
+        loaded = self._load(parking_id)
+        if not loaded:
+            return None
+        with self._lock:
+            self._parkings[parking_id] = loaded[0]
+        return loaded[0]
+
+    def peek(self, parking_id: int) -> Optional[ParkingOccupancy]:
+        with self._lock:
+            return self._parkings.get(parking_id)
+
+    def peek_totals(self) -> Optional[OccupancyTotals]:
+        with self._lock:
+            return self._totals
+
+    def available_parkings(self) -> List[ParkingOccupancy]:
+        return [
+            parking
+            for parking in self.parkings()
+            if parking.opened and parking.count_available_places > 0
+        ]
+
+    def parking_added(self, parking: Parking) -> None:
+        with self._lock:
+            self._parkings[parking.id] = ParkingOccupancy(
+                id=parking.id,
+                address=parking.address,
+                opened=bool(parking.opened),
+                count_places=parking.count_places,
+                count_available_places=parking.count_available_places,
+                active_sessions=0,
+            )
+            if self._totals is not None:
+                self._totals = replace(
+                    self._totals, parkings_count=self._totals.parkings_count + 1
+                )
+
+    def session_started(self, parking_id: int, count: int = 1) -> None:
+        self._shift(parking_id, count)
+
+    def session_ended(self, parking_id: int, count: int = 1) -> None:
+        self._shift(parking_id, -count)
+
+    def _shift(self, parking_id: int, delta: int) -> None:
+        with self._lock:
+            cached = self._parkings.get(parking_id)
+            if cached is None:
+                # Unknown to the cache: the next read reloads it from the database.
+                self._totals = None
+                return
+            self._parkings[parking_id] = replace(
+                cached,
+                count_available_places=cached.count_available_places - delta,
+                active_sessions=cached.active_sessions + delta,
+            )
+            if self._totals is not None:
+                self._totals = replace(
+                    self._totals,
+                    active_sessions_count=self._totals.active_sessions_count + delta,
+                )
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses}
+
+
+occupancy = OccupancyCache()
+
+
+def occupancy_metrics() -> List[Tuple[str, str, str, List[Any]]]:
+    stats = occupancy.stats()
+    return [
+        (
+            "occupancy_cache_hits_total",
+            "counter",
+            "Occupancy reads served from the cache.",
+            [("occupancy_cache_hits_total", {}, stats["hits"])],
+        ),
+        (
+            "occupancy_cache_misses_total",
+            "counter",
+            "Occupancy reads that went to the database.",
+            [("occupancy_cache_misses_total", {}, stats["misses"])],
+        ),
+    ]
@@ -0,0 +1,40 @@
+from dataclasses import dataclass
+from typing import Any, Generic, List, Optional, Tuple, TypeVar
+
+from flask import request
+
+from project.config import Config
+
+T = TypeVar("T")
+
+
+@dataclass(frozen=True)
+class KeysetPage(Generic[T]):
+    items: List[T]
+    after: Optional[int]
+    next_after: Optional[int]
+    limit: int
+
+
+def page_args() -> Tuple[Optional[int], int]:
+    after = request.args.get("after", type=int)
+    limit = request.args.get("limit", Config.PAGE_SIZE, type=int)
+    return after, max(1, min(limit, Config.MAX_PAGE_SIZE))
+
+
+def keyset_page(
+    query: Any, id_column: Any, after: Optional[int], limit: int
+) -> KeysetPage[Any]:
+    if after is not None:
+        query = query.filter(id_column > after)
+    rows = query.order_by(id_column).limit(limit + 1).all()
+
+    next_after = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_after = rows[-1].id
+    return KeysetPage(items=rows, after=after, next_after=next_after, limit=limit)
+
+
+def stream_rows(query: Any, id_column: Any) -> Any:
+    return query.order_by(id_column).yield_per(Config.STREAM_BATCH_SIZE)
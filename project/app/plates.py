@@ -0,0 +1,21 @@
+import re
+from typing import Any, Optional
+
+PLATE_LETTERS = "ABEKMHOPCTYX"
+CYRILLIC_LETTERS = "АВЕКМНОРСТУХ"
+PLATE_PATTERN = re.compile(rf"[{PLATE_LETTERS}]\d{{3}}[{PLATE_LETTERS}]{{2}}\d{{2,3}}")
+
+_FOLD = str.maketrans(CYRILLIC_LETTERS, PLATE_LETTERS, " -")
+
+
+def normalize_plate(car_number: str) -> str:
+    return car_number.strip().upper().translate(_FOLD)
+
+
+def validate_car_number(car_number: str) -> bool:
+    return PLATE_PATTERN.fullmatch(normalize_plate(car_number)) is not None
+
+
+def plate_default(context: Any) -> Optional[str]:
+    car_number = context.get_current_parameters().get("car_number")
+    return None if car_number is None else normalize_plate(car_number)
@@ -1,21 +1,71 @@
-import re
-from datetime import datetime, timezone
-from typing import List, Tuple, Union, cast
+from dataclasses import asdict
+from datetime import date
+from functools import partial
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+    cast,
+)
 
 from flask import (
     Blueprint,
     Response,
+    current_app,
     flash,
     jsonify,
     redirect,
     render_template,
     request,
     session,
+    stream_template,
+    stream_with_context,
     url_for,
 )
+from sqlalchemy.orm import joinedload
 from werkzeug.wrappers import Response as WerkzeugResponse
 
+from project.app.admission import admitted
+from project.app.analytics import occupancy_series
+from project.app.billing import revenue_report
+from project.app.events import Event, event_bus, occupancy_state
+from project.app.fragments import fragments
+from project.app.history import client_totals, history_page
+from project.app.idempotency import KeyInUse, idempotent
+from project.app.metrics import metrics
 from project.app.models import Client, ClientParking, Parking
+from project.app.occupancy import occupancy
+from project.app.pagination import keyset_page, page_args, stream_rows
+from project.app.plates import normalize_plate, validate_car_number
+from project.app.search import match_expression, search_clients
+from project.app.services import (
+    BatchConflict,
+    CreditCardRequired,
+    GateEvent,
+    ParkingError,
+    SessionNotFound,
+    add_client,
+    add_parking,
+    enter_batch,
+    exit_batch,
+    plate_lookup_statement,
+    release_place,
+    reserve_place,
+)
+from project.app.stats import total_stats
+from project.app.versions import (
+    CLIENTS,
+    PARKINGS,
+    SESSIONS,
+    conditional,
+    data_versions,
+)
 from project.config import Config
 from project.database import db
 
@@ -23,35 +73,133 @@ bp = Blueprint("views", __name__)
 ResponseType = Union[Response, WerkzeugResponse, str]
 
 
-def validate_car_number(car_number: str) -> bool:
-    pattern = r"^[АВЕКМНОРСТУХABEKMHOPCTYX]\d{3}[АВЕКМНОРСТУХABEKMHOPCTYX]{2}\d{2,3}$"
-    return re.match(pattern, car_number.upper()) is not None
-
-
 @bp.route("/")
+@conditional(PARKINGS, SESSIONS)
 def index() -> str:
-    parkings_count = Parking.query.count()
-    active_sessions_count = ClientParking.query.filter_by(time_out=None).count()
+    totals = total_stats()
     return render_template(
         "index.html",
-        parkings_count=parkings_count,
-        active_sessions_count=active_sessions_count,
+        parkings_count=totals.parkings,
+        active_sessions_count=totals.active_sessions,
     )
 
 
+def _render_listing(
+    template: str,
+    name: str,
+    query: Any,
+    id_column: Any,
+    fragment: Optional[str] = None,
+    table: Optional[str] = None,
+) -> ResponseType:
+    if request.args.get("stream"):
+        rows = stream_rows(query, id_column)
+        return Response(stream_template(template, page=None, **{name: rows}))
+
+    after, limit = page_args()
+    if fragment is None or table is None:
+        page = keyset_page(query, id_column, after, limit)
+        return render_template(template, page=page, **{name: page.items})
+
+    key = (fragment, after, limit)
+    version, _ = data_versions.stamp(table)
+    html = fragments.get(key, version)
+    if html is None:
+        page = keyset_page(query, id_column, after, limit)
+        rendered = render_template(fragment, page=page, **{name: page.items})
+        html = fragments.put(key, version, rendered)
+    return render_template(template, table=html)
+
+
 @bp.route("/clients")
-def list_clients() -> str:
-    clients = Client.query.all()
-    return render_template("clients/list.html", clients=clients)
+@conditional(CLIENTS)
+def list_clients() -> ResponseType:
+    return _render_listing(
+        "clients/list.html",
+        "clients",
+        Client.query,
+        Client.id,
+        fragment="clients/_table.html",
+        table=CLIENTS,
+    )
+
+
+@bp.route("/clients/search")
+def search_clients_page() -> str:
+    query = request.args.get("q", "")
+    _, limit = page_args()
+    return render_template(
+        "clients/list.html", page=None, clients=search_clients(query, limit), q=query
+    )
+
+
+@bp.route("/api/clients/search")
+def search_clients_api() -> Union[Response, Tuple[Response, int]]:
+    query = request.args.get("q", "")
+    if match_expression(query) is None:
+        return jsonify({"error": "Пустой поисковый запрос"}), 400
+
+    _, limit = page_args()
+    offset = max(0, request.args.get("offset", 0, type=int))
+    matches = search_clients(query, limit + 1, offset)
+    next_offset = offset + limit if len(matches) > limit else None
+    return jsonify(
+        {
+            "items": [asdict(match) for match in matches[:limit]],
+            "next_offset": next_offset,
+        }
+    )
 
 
 @bp.route("/clients/<int:client_id>")
 def view_client(client_id: int) -> str:
     client = Client.query.get_or_404(client_id)
-    return render_template("clients/view.html", client=client)
+    _, limit = page_args()
+    page = history_page(client_id, request.args.get("before", type=int), limit)
+    return render_template(
+        "clients/view.html",
+        client=client,
+        sessions=page.items,
+        page=page,
+        totals=client_totals.get(client_id),
+    )
+
+
+@bp.route("/api/clients/<int:client_id>/history")
+def client_history(client_id: int) -> Union[Response, Tuple[Response, int]]:
+    client = db.session.get(Client, client_id)
+    if client is None:
+        return jsonify({"error": "Клиент не найден"}), 404
+
+    _, limit = page_args()
+    page = history_page(client_id, request.args.get("before", type=int), limit)
+    return jsonify(
+        {
+            "client": {
+                "id": client.id,
+                "name": client.name,
+                "surname": client.surname,
+                "car_number": client.car_number,
+            },
+            "totals": asdict(client_totals.get(client_id)),
+            "sessions": [
+                {
+                    "id": row.id,
+                    "parking_id": row.parking_id,
+                    "address": row.address,
+                    "time_in": row.time_in.isoformat(),
+                    "time_out": row.time_out.isoformat() if row.time_out else None,
+                    "archived": bool(row.archived),
+                }
+                for row in page.items
+            ],
+            "next_before": page.next_before,
+        }
+    )
 
 
 @bp.route("/clients/new", methods=["GET", "POST"])
+@admitted
 def create_client() -> Union[ResponseType, str]:
     if request.method == "POST":
         try:
@@ -74,12 +222,13 @@ def create_client() -> Union[ResponseType, str]:
                 car_number=car_number,
                 credit_card=credit_card,
             )
-            db.session.add(client)
-            db.session.commit()
+            add_client(client)
 
             flash("Клиент успешно создан", "success")
             return redirect(url_for("views.list_clients"))
 
+        except ParkingError as e:
+            flash(str(e), "danger")
         except Exception as e:
             db.session.rollback()
             flash(f"Ошибка при создании клиента: {str(e)}", "danger")
@@ -88,12 +237,20 @@ def create_client() -> Union[ResponseType, str]:
 
 
 @bp.route("/parkings")
-def list_parkings() -> str:
-    parkings = Parking.query.all()
-    return render_template("parkings/list.html", parkings=parkings)
+@conditional(PARKINGS)
+def list_parkings() -> ResponseType:
+    return _render_listing(
+        "parkings/list.html",
+        "parkings",
+        Parking.query.options(joinedload(Parking.stats)),
+        Parking.id,
+        fragment="parkings/_table.html",
+        table=PARKINGS,
+    )
 
 
 @bp.route("/parkings/new", methods=["GET", "POST"])
+@admitted
 def create_parking() -> Union[ResponseType, str]:
     if request.method == "POST":
         try:
@@ -118,8 +275,7 @@ def create_parking() -> Union[ResponseType, str]:
                 count_available_places=count_places,
                 opened="opened" in request.form,
             )
-            db.session.add(parking)
-            db.session.commit()
+            add_parking(parking)
             flash("Парковка успешно создана", "success")
             return redirect(url_for("views.list_parkings"))
         except Exception as e:
@@ -129,137 +285,147 @@ def create_parking() -> Union[ResponseType, str]:
     return render_template("parkings/new.html")
 
 
+def _render_enter_form() -> str:
+    available_clients = Client.query.filter(
+        ~Client.parking_sessions.any(ClientParking.time_out.is_(None))
+    ).all()
+    available_parkings = occupancy.available_parkings()
+
+    return render_template(
+        "client_parkings/enter.html",
+        clients=available_clients,
+        parkings=available_parkings,
+    )
+
+
 @bp.route("/client_parkings/enter", methods=["GET", "POST"])
+@admitted
 def enter_parking() -> Union[ResponseType, str]:
     if request.method == "POST":
         try:
             client_id = int(request.form["client_id"])
             parking_id = int(request.form["parking_id"])
 
-            if ClientParking.query.filter_by(
-                client_id=client_id, time_out=None
-            ).first():
-                flash("Этот клиент уже находится на парковке", "danger")
-                return redirect(url_for("views.enter_parking"))
-
-            parking = Parking.query.get_or_404(parking_id)
-
-            if not parking.opened:
-                flash("Парковка закрыта", "danger")
-                return redirect(url_for("views.enter_parking"))
-
-            if parking.count_available_places <= 0:
-                flash("Нет свободных мест", "danger")
-                return redirect(url_for("views.enter_parking"))
-
-            log = ClientParking(
-                client_id=client_id,
-                parking_id=parking_id,
-                time_in=datetime.now(timezone.utc),
-            )
-            parking.count_available_places -= 1
-
-            db.session.add(log)
-            db.session.commit()
+            reserve_place(client_id, parking_id)
 
             flash("Автомобиль успешно припаркован", "success")
-            active_ids = [
-                s.client_id for s in ClientParking.query.filter_by(time_out=None).all()
-            ]
-            return render_template(
-                "client_parkings/enter.html",
-                clients=Client.query.filter(~Client.id.in_(active_ids)).all(),
-                parkings=Parking.query.filter(
-                    Parking.opened.is_(True), Parking.count_available_places > 0
-                ).all(),
-            )
+            return _render_enter_form()
 
+        except ParkingError as e:
+            flash(str(e), "danger")
+            return redirect(url_for("views.enter_parking"))
         except Exception as e:
             db.session.rollback()
             flash(f"Ошибка: {str(e)}", "danger")
             return redirect(url_for("views.enter_parking"))
 
-    active_client_ids = [
-        s.client_id for s in ClientParking.query.filter_by(time_out=None).all()
-    ]
-    available_clients = Client.query.filter(~Client.id.in_(active_client_ids)).all()
-    available_parkings = Parking.query.filter(
-        Parking.opened.is_(True), Parking.count_available_places > 0
-    ).all()
+    return _render_enter_form()
 
-    return render_template(
-        "client_parkings/enter.html",
-        clients=available_clients,
-        parkings=available_parkings,
+
+def _active_sessions_query() -> Any:
+    return ClientParking.query.filter_by(time_out=None).options(
+        db.joinedload(ClientParking.client), db.joinedload(ClientParking.parking)
     )
 
 
 def get_active_sessions() -> List[ClientParking]:
-    sessions = (
-        ClientParking.query.filter_by(time_out=None)
-        .options(
-            db.joinedload(ClientParking.client), db.joinedload(ClientParking.parking)
-        )
-        .all()
-    )
+    sessions = _active_sessions_query().all()
     return cast(List[ClientParking], sessions)
 
 
 @bp.route("/api/client_parkings/exit", methods=["DELETE"])
+@admitted
+@idempotent
 def process_exit() -> Union[Response, Tuple[Response, int]]:
     try:
         data = request.get_json()
         if not data or "client_id" not in data or "parking_id" not in data:
             return jsonify({"error": "Неверные данные запроса"}), 400
 
-        parking_session = ClientParking.query.filter_by(
-            client_id=data["client_id"], parking_id=data["parking_id"], time_out=None
-        ).first()
-
-        if not parking_session:
-            return jsonify({"error": "Активная сессия не найдена"}), 404
-
-        if parking_session.time_out:
-            return jsonify({"error": "Эта сессия уже завершена"}), 400
-
-        if "credit_card" in data and data["credit_card"]:
-            parking_session.client.credit_card = data["credit_card"]
-            db.session.commit()
-
-        if not parking_session.client.credit_card:
-            return (
-                jsonify(
-                    {
-                        "require_credit_card": True,
-                        "client_name": parking_session.client.name,
-                        "car_number": parking_session.client.car_number,
-                        "client_id": parking_session.client_id,
-                        "parking_id": parking_session.parking_id,
-                    }
-                ),
-                200,
-            )
-
-        parking_session.time_out = datetime.now(timezone.utc)
-        parking_session.parking.count_available_places += 1
-        db.session.commit()
-
-        minutes = int(
-            (parking_session.time_out - parking_session.time_in).total_seconds() / 60
+        result = release_place(
+            data["client_id"], data["parking_id"], data.get("credit_card") or None
         )
-        amount = minutes * Config.PARKING_RATE_PER_MINUTE
+        amount = result.amount
 
         return jsonify(
             {"success": f"Автомобиль покинул парковку. Снята плата - {amount} руб."}
         )
 
+    except CreditCardRequired as e:
+        return (
+            jsonify(
+                {
+                    "require_credit_card": True,
+                    "client_name": e.client_name,
+                    "car_number": e.car_number,
+                    "client_id": e.client_id,
+                    "parking_id": e.parking_id,
+                }
+            ),
+            200,
+        )
+    except SessionNotFound as e:
+        return jsonify({"error": str(e)}), 404
+    except KeyInUse:
+        # Answered by @idempotent, the write is already rolled back.
+        raise
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": f"Ошибка: {str(e)}"}), 500
+
+
+def _parse_gate_events() -> Optional[List[GateEvent]]:
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict) or not isinstance(data.get("events"), list):
+        return None
+    if not 0 < len(data["events"]) <= Config.MAX_BATCH_SIZE:
+        return None
+    try:
+        return [
+            GateEvent(
+                client_id=int(event["client_id"]),
+                parking_id=int(event["parking_id"]),
+                credit_card=(event.get("credit_card") or "").strip() or None,
+            )
+            for event in data["events"]
+        ]
+    except (KeyError, TypeError, ValueError, AttributeError):
+        return None
+
+
+def _process_batch(
+    handler: Callable[[Sequence[GateEvent]], List[Dict[str, Any]]],
+) -> Union[Response, Tuple[Response, int]]:
+    events = _parse_gate_events()
+    if events is None:
+        return jsonify({"error": "Неверные данные запроса"}), 400
+    try:
+        return jsonify({"results": handler(events)})
+    except BatchConflict as e:
+        return jsonify({"error": str(e)}), 409
+    except KeyInUse:
+        raise
     except Exception as e:
         db.session.rollback()
         return jsonify({"error": f"Ошибка: {str(e)}"}), 500
 
 
+@bp.route("/api/client_parkings/enter/batch", methods=["POST"])
+@admitted
+@idempotent
+def process_enter_batch() -> Union[Response, Tuple[Response, int]]:
+    return _process_batch(enter_batch)
+
+
+@bp.route("/api/client_parkings/exit/batch", methods=["POST"])
+@admitted
+@idempotent
+def process_exit_batch() -> Union[Response, Tuple[Response, int]]:
+    return _process_batch(exit_batch)
+
+
 @bp.route("/client_parkings/exit", methods=["GET"])
-def exit_parking() -> str:
+def exit_parking() -> ResponseType:
     if "_flashes" in session:
         session.pop("_flashes")
 
@@ -271,25 +437,142 @@ def exit_parking() -> str:
     elif success:
         flash(success, "success")
 
-    active_sessions = (
-        ClientParking.query.filter_by(time_out=None)
-        .options(
-            db.joinedload(ClientParking.client), db.joinedload(ClientParking.parking)
-        )
-        .all()
+    return _render_listing(
+        "client_parkings/exit.html",
+        "active_sessions",
+        _active_sessions_query(),
+        ClientParking.id,
     )
-    return render_template("client_parkings/exit.html", active_sessions=active_sessions)
 
 
 @bp.route("/client_parkings/active")
-def list_active_sessions() -> str:
-    active_sessions = (
-        ClientParking.query.filter_by(time_out=None)
-        .options(
-            db.joinedload(ClientParking.client), db.joinedload(ClientParking.parking)
-        )
-        .all()
+@conditional(CLIENTS, PARKINGS, SESSIONS)
+def list_active_sessions() -> ResponseType:
+    return _render_listing(
+        "client_parkings/active.html",
+        "active_sessions",
+        _active_sessions_query(),
+        ClientParking.id,
     )
-    return render_template(
-        "client_parkings/active.html", active_sessions=active_sessions
+
+
+@bp.route("/api/occupancy")
+def occupancy_snapshot() -> Response:
+    totals = occupancy.totals()
+    return jsonify(
+        {
+            "parkings_count": totals.parkings_count,
+            "active_sessions_count": totals.active_sessions_count,
+            "parkings": [asdict(parking) for parking in occupancy.parkings()],
+            "cache": occupancy.stats(),
+        }
+    )
+
+
+@bp.route("/api/occupancy/stream")
+def occupancy_stream() -> Response:
+    # Subscribe before taking the snapshot so no delta falls between them.
+    subscription = event_bus.subscribe()
+    snapshot = Event("snapshot", occupancy_state())
+    heartbeat = current_app.config["SSE_HEARTBEAT_SECONDS"]
+    # The stream never touches the database again; give the connection back
+    # to the pool instead of holding it for the lifetime of the subscriber.
+    db.session.remove()
+
+    def generate() -> Iterator[str]:
+        yield snapshot.to_sse()
+        for event in event_bus.listen(subscription, heartbeat):
+            yield ": keep-alive\n\n" if event is None else event.to_sse()
+
+    response = Response(
+        stream_with_context(generate()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+    # A client gone before the first chunk never starts the generator.
+    response.call_on_close(partial(event_bus.unsubscribe, subscription))
+    return response
+
+
+@bp.route("/api/plates/<plate>")
+def lookup_plate(plate: str) -> Union[Response, Tuple[Response, int]]:
+    if not validate_car_number(plate):
+        return jsonify({"error": "Неверный формат номера автомобиля"}), 400
+
+    row = db.session.execute(plate_lookup_statement(normalize_plate(plate))).first()
+    if row is None:
+        return jsonify({"error": "Клиент не найден"}), 404
+
+    active_session = None
+    if row.session_id is not None:
+        active_session = {
+            "id": row.session_id,
+            "parking_id": row.parking_id,
+            "address": row.address,
+            "time_in": row.time_in.isoformat(),
+        }
+    return jsonify(
+        {
+            "client": {
+                "id": row.id,
+                "name": row.name,
+                "surname": row.surname,
+                "car_number": row.car_number,
+                "plate": row.plate,
+                "has_credit_card": bool(row.has_credit_card),
+            },
+            "active_session": active_session,
+        }
     )
+
+
+@bp.route("/metrics")
+def prometheus_metrics() -> Response:
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
+
+
+def _date_arg(name: str) -> Optional[date]:
+    value = request.args.get(name)
+    if value is None:
+        return None
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"Параметр {name} должен быть датой ГГГГ-ММ-ДД") from None
+
+
+def _int_arg(name: str) -> Optional[int]:
+    value = request.args.get(name)
+    if value is None:
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        raise ValueError(f"Параметр {name} должен быть целым числом") from None
+
+
+@bp.route("/api/reports/revenue")
+def revenue() -> Union[Response, Tuple[Response, int]]:
+    try:
+        date_from = _date_arg("from")
+        date_to = _date_arg("to")
+        rows = revenue_report(
+            request.args.get("group_by", "parking"), date_from, date_to
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify({"rows": rows})
+
+
+@bp.route("/api/analytics/occupancy")
+def occupancy_analytics() -> Union[Response, Tuple[Response, int]]:
+    try:
+        rows = occupancy_series(
+            request.args.get("granularity", "hour"),
+            _int_arg("parking_id"),
+            _date_arg("from"),
+            _date_arg("to"),
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify({"rows": rows})
@@ -0,0 +1,74 @@
+from dataclasses import dataclass
+from typing import Any, List, Optional
+
+from sqlalchemy import text
+
+from project.app.plates import normalize_plate
+from project.database import db
+
+MAX_TERMS = 8
+
+# Ranking scores every match, so it only pays off while the match set is
+# small; broader queries (a common name, a two-letter prefix) are listed in
+# id order and only the returned page is scored.
+RANKED_MATCHES = 5000
+
+COUNT_STATEMENT = text(
+    "SELECT count(*) FROM ("
+    "SELECT 1 FROM client_search WHERE client_search MATCH :query LIMIT :cap"
+    ")"
+)
+
+
+def _search_statement(order_by: str) -> Any:
+    # Plate hits weigh more than name hits: a plate identifies one client.
+    # The page is cut inside the FTS table first; only the page is joined.
+    return text(
+        "SELECT client.id, client.name, client.surname, client.car_number, "
+        "hit.rank FROM ("
+        "SELECT rowid, bm25(client_search, 1.0, 1.0, 4.0) AS rank "
+        "FROM client_search WHERE client_search MATCH :query "
+        f"ORDER BY {order_by} LIMIT :limit OFFSET :offset"
+        ") AS hit JOIN client ON client.id = hit.rowid "
+        f"ORDER BY {order_by.replace('rowid', 'hit.rowid')}"
+    )
+
+
+RANKED_STATEMENT = _search_statement("rank, rowid")
+BROAD_STATEMENT = _search_statement("rowid")
+
+
+@dataclass(frozen=True)
+class ClientMatch:
+    id: int
+    name: str
+    surname: str
+    car_number: str
+    rank: float
+
+
+def _quote(term: str) -> str:
+    return '"' + term.replace('"', '""') + '"'
+
+
+def match_expression(query: str) -> Optional[str]:
+    terms = [term for term in query.split() if any(ch.isalnum() for ch in term)]
+    parts = []
+    for term in terms[:MAX_TERMS]:
+        plate = _quote(normalize_plate(term))
+        parts.append(f"({{name surname}} : {_quote(term)}* OR plate : {plate}*)")
+    return " AND ".join(parts) or None
+
+
+def search_clients(query: str, limit: int, offset: int = 0) -> List[ClientMatch]:
+    expression = match_expression(query)
+    if expression is None:
+        return []
+    matches = db.session.execute(
+        COUNT_STATEMENT, {"query": expression, "cap": RANKED_MATCHES}
+    ).scalar_one()
+    statement = RANKED_STATEMENT if matches < RANKED_MATCHES else BROAD_STATEMENT
+    rows = db.session.execute(
+        statement, {"query": expression, "limit": limit, "offset": offset}
+    )
+    return [ClientMatch(*row) for row in rows]
@@ -0,0 +1,591 @@
+from collections import Counter
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from functools import partial
+from typing import Any, Dict, List, Optional, Sequence, Tuple, TypeVar
+
+from sqlalchemy import (
+    Integer,
+    and_,
+    bindparam,
+    exists,
+    func,
+    insert,
+    select,
+    update,
+)
+from sqlalchemy.exc import IntegrityError
+
+from project.app.billing import price_session
+from project.app.events import publish_occupancy
+from project.app.history import client_totals
+from project.app.models import Client, ClientParking, Parking
+from project.app.occupancy import occupancy
+from project.app.versions import (
+    CLIENTS,
+    PARKINGS,
+    SESSIONS,
+    bump_shared,
+    data_versions,
+)
+from project.app.writer import run_write
+from project.database import db
+
+Instance = TypeVar("Instance")
+
+
+class ParkingError(Exception):
+    message = "Ошибка парковки"
+
+    def __init__(self, message: Optional[str] = None) -> None:
+        super().__init__(message or self.message)
+
+
+class ClientAlreadyParked(ParkingError):
+    message = "Этот клиент уже находится на парковке"
+
+
+class ClientNotFound(ParkingError):
+    message = "Клиент не найден"
+
+
+class ParkingNotFound(ParkingError):
+    message = "Парковка не найдена"
+
+
+class ParkingClosed(ParkingError):
+    message = "Парковка закрыта"
+
+
+class ParkingFull(ParkingError):
+    message = "Нет свободных мест"
+
+
+class SessionNotFound(ParkingError):
+    message = "Активная сессия не найдена"
+
+
+class CreditCardRequired(ParkingError):
+    message = "Требуется кредитная карта"
+
+    def __init__(
+        self, client_id: int, parking_id: int, client_name: str, car_number: str
+    ) -> None:
+        super().__init__()
+        self.client_id = client_id
+        self.parking_id = parking_id
+        self.client_name = client_name
+        self.car_number = car_number
+
+
+class BatchConflict(ParkingError):
+    message = "Данные изменились во время обработки пакета, повторите запрос"
+
+
+class PlateTaken(ParkingError):
+    message = "Клиент с таким номером автомобиля уже зарегистрирован"
+
+
+@dataclass(frozen=True)
+class GateEvent:
+    client_id: int
+    parking_id: int
+    credit_card: Optional[str] = None
+
+
+@dataclass(frozen=True)
+class ExitResult:
+    time_in: datetime
+    time_out: datetime
+    amount: int
+
+
+def _insert(instance: Instance) -> Instance:
+    db.session.add(instance)
+    db.session.flush()
+    return instance
+
+
+def _parking_added(parking: Parking) -> None:
+    occupancy.parking_added(parking)
+    data_versions.bump(PARKINGS)
+    publish_occupancy("parking", parking.id)
+
+
+def _insert_client(client: Client) -> Client:
+    try:
+        inserted = _insert(client)
+    except IntegrityError as e:
+        raise PlateTaken() from e
+    bump_shared(CLIENTS)
+    return inserted
+
+
+def _insert_parking(parking: Parking) -> Parking:
+    inserted = _insert(parking)
+    bump_shared(PARKINGS)
+    return inserted
+
+
+def add_client(client: Client) -> Client:
+    return run_write(
+        partial(_insert_client, client), lambda _: data_versions.bump(CLIENTS)
+    )
+
+
+def add_parking(parking: Parking) -> Parking:
+    return run_write(partial(_insert_parking, parking), _parking_added)
+
+
+def plate_lookup_statement(plate: str) -> Any:
+    active = and_(
+        ClientParking.client_id == Client.id, ClientParking.time_out.is_(None)
+    )
+    return (
+        select(
+            Client.id,
+            Client.name,
+            Client.surname,
+            Client.car_number,
+            Client.plate,
+            (func.coalesce(Client.credit_card, "") != "").label("has_credit_card"),
+            ClientParking.id.label("session_id"),
+            ClientParking.parking_id,
+            ClientParking.time_in,
+            Parking.address,
+        )
+        .outerjoin(ClientParking, active)
+        .outerjoin(Parking, Parking.id == ClientParking.parking_id)
+        .where(Client.plate == plate)
+    )
+
+
+def _client_exists(client_id: int) -> Any:
+    return select(Client.id).where(Client.id == client_id).exists()
+
+
+def claim_place_statement(client_id: int, parking_id: int) -> Any:
+    return (
+        update(Parking)
+        .where(
+            Parking.id == parking_id,
+            Parking.opened.is_(True),
+            Parking.count_available_places > 0,
+            # Without foreign keys enforced, a session of an unknown client
+            # would hold the place forever.
+            _client_exists(client_id),
+        )
+        .values(count_available_places=Parking.count_available_places - 1)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def reservation_state_statement(client_id: int, parking_id: int) -> Any:
+    parking = select(Parking.opened).where(Parking.id == parking_id)
+    return select(
+        _client_exists(client_id).label("client_found"),
+        exists()
+        .where(ClientParking.client_id == client_id, ClientParking.time_out.is_(None))
+        .label("parked"),
+        parking.exists().label("found"),
+        parking.scalar_subquery().label("opened"),
+    )
+
+
+def reservation_error(state: Any) -> ParkingError:
+    if not state.client_found:
+        return ClientNotFound()
+    if state.parked:
+        return ClientAlreadyParked()
+    if not state.found:
+        return ParkingNotFound()
+    if not state.opened:
+        return ParkingClosed()
+    return ParkingFull()
+
+
+def _reserve(client_id: int, parking_id: int) -> ClientParking:
+    # The conditional decrement takes the write lock first, so capacity is
+    # checked and claimed atomically; the unique partial index on active
+    # sessions rejects a concurrent double entry of the same client.
+    reserved = db.session.execute(claim_place_statement(client_id, parking_id))
+    if reserved.rowcount != 1:
+        state = db.session.execute(
+            reservation_state_statement(client_id, parking_id)
+        ).one()
+        raise reservation_error(state)
+
+    parking_session = ClientParking(
+        client_id=client_id,
+        parking_id=parking_id,
+        time_in=datetime.now(timezone.utc),
+    )
+    db.session.add(parking_session)
+    try:
+        db.session.flush()
+    except IntegrityError as e:
+        raise ClientAlreadyParked() from e
+    bump_shared(PARKINGS, SESSIONS)
+    return parking_session
+
+
+def place_reserved(client_id: int, parking_id: int) -> None:
+    occupancy.session_started(parking_id)
+    client_totals.invalidate(client_id)
+    data_versions.bump(PARKINGS, SESSIONS)
+    publish_occupancy("enter", parking_id, client_id=client_id)
+
+
+def reserve_place(client_id: int, parking_id: int) -> ClientParking:
+    return run_write(
+        partial(_reserve, client_id, parking_id),
+        lambda _: place_reserved(client_id, parking_id),
+    )
+
+
+def calculate_fee(parking_id: int, time_in: datetime, time_out: datetime) -> int:
+    return price_session(parking_id, time_in, time_out)
+
+
+def _active_session(client_id: int, parking_id: int) -> Any:
+    return and_(
+        ClientParking.client_id == client_id,
+        ClientParking.parking_id == parking_id,
+        ClientParking.time_out.is_(None),
+    )
+
+
+def store_card_statement(client_id: int, parking_id: int, credit_card: str) -> Any:
+    return (
+        update(Client)
+        .where(
+            Client.id == client_id,
+            exists().where(_active_session(client_id, parking_id)),
+        )
+        .values(credit_card=credit_card)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def close_session_statement(client_id: int, parking_id: int, time_out: datetime) -> Any:
+    has_card = exists().where(
+        Client.id == ClientParking.client_id,
+        Client.credit_card.is_not(None),
+        Client.credit_card != "",
+    )
+    return (
+        update(ClientParking)
+        .where(_active_session(client_id, parking_id), has_card)
+        .values(time_out=time_out)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def free_place_statement(parking_id: int) -> Any:
+    return (
+        update(Parking)
+        .where(Parking.id == parking_id)
+        .values(count_available_places=Parking.count_available_places + 1)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def release_state_statement(client_id: int, parking_id: int) -> Any:
+    return (
+        select(
+            ClientParking.client_id,
+            ClientParking.parking_id,
+            Client.name,
+            Client.car_number,
+        )
+        .join(Client, Client.id == ClientParking.client_id)
+        .where(_active_session(client_id, parking_id))
+    )
+
+
+def release_error(state: Any) -> ParkingError:
+    if state is None:
+        return SessionNotFound()
+    return CreditCardRequired(*state)
+
+
+def _close_session(
+    client_id: int, parking_id: int
+) -> Optional[Tuple[datetime, datetime]]:
+    time_out = datetime.now(timezone.utc).replace(tzinfo=None)
+    close = close_session_statement(client_id, parking_id, time_out)
+
+    if db.session.get_bind().dialect.update_returning:
+        row = db.session.execute(close.returning(ClientParking.time_in)).first()
+        return None if row is None else (row.time_in, time_out)
+
+    # SQLite before 3.35 has no RETURNING: look the session up first.
+    found = db.session.execute(
+        select(ClientParking.id, ClientParking.time_in).where(close.whereclause)
+    ).first()
+    if found is None:
+        return None
+    db.session.execute(
+        update(ClientParking)
+        .where(ClientParking.id == found.id)
+        .values(time_out=time_out)
+        .execution_options(synchronize_session=False)
+    )
+    return found.time_in, time_out
+
+
+def _release(
+    client_id: int, parking_id: int, credit_card: Optional[str]
+) -> Tuple[datetime, datetime]:
+    if credit_card:
+        db.session.execute(store_card_statement(client_id, parking_id, credit_card))
+
+    closed = _close_session(client_id, parking_id)
+    if closed is None:
+        state = db.session.execute(
+            release_state_statement(client_id, parking_id)
+        ).first()
+        raise release_error(state)
+
+    db.session.execute(free_place_statement(parking_id))
+    bump_shared(CLIENTS, PARKINGS, SESSIONS)
+    return closed
+
+
+def place_released(client_id: int, parking_id: int) -> None:
+    occupancy.session_ended(parking_id)
+    client_totals.invalidate(client_id)
+    data_versions.bump(CLIENTS, PARKINGS, SESSIONS)
+    publish_occupancy("exit", parking_id, client_id=client_id)
+
+
+def release_place(
+    client_id: int, parking_id: int, credit_card: Optional[str] = None
+) -> ExitResult:
+    time_in, time_out = run_write(
+        partial(_release, client_id, parking_id, credit_card),
+        lambda _: place_released(client_id, parking_id),
+    )
+    return ExitResult(time_in, time_out, calculate_fee(parking_id, time_in, time_out))
+
+
+def _event_result(
+    event: GateEvent, error: Optional[ParkingError] = None, **extra: Any
+) -> Dict[str, Any]:
+    result: Dict[str, Any] = {
+        "client_id": event.client_id,
+        "parking_id": event.parking_id,
+        "status": "ok" if error is None else "error",
+    }
+    if error is not None:
+        result["error"] = str(error)
+    result.update(extra)
+    return result
+
+
+def _succeeded(results: List[Dict[str, Any]]) -> List[int]:
+    return [result["client_id"] for result in results if result["status"] == "ok"]
+
+
+def _enter_batch(
+    events: Sequence[GateEvent],
+) -> Tuple[List[Dict[str, Any]], Counter[int]]:
+    client_ids = {event.client_id for event in events}
+    parking_ids = {event.parking_id for event in events}
+    known = dict(
+        db.session.execute(
+            select(Client.id, ClientParking.id.is_not(None))
+            .outerjoin(
+                ClientParking,
+                and_(
+                    ClientParking.client_id == Client.id,
+                    ClientParking.time_out.is_(None),
+                ),
+            )
+            .where(Client.id.in_(client_ids))
+        )
+        .tuples()
+        .all()
+    )
+    parked = {client_id for client_id, active in known.items() if active}
+    available = {
+        row.id: row.count_available_places if row.opened else None
+        for row in db.session.execute(
+            select(Parking.id, Parking.opened, Parking.count_available_places).where(
+                Parking.id.in_(parking_ids)
+            )
+        )
+    }
+
+    results: List[Dict[str, Any]] = []
+    sessions: List[Dict[str, Any]] = []
+    reserved: Counter[int] = Counter()
+    time_in = datetime.now(timezone.utc)
+    for event in events:
+        places = available.get(event.parking_id, -1)
+        error: Optional[ParkingError] = None
+        if event.client_id not in known:
+            error = ClientNotFound()
+        elif event.client_id in parked:
+            error = ClientAlreadyParked()
+        elif event.parking_id not in available:
+            error = ParkingNotFound()
+        elif places is None:
+            error = ParkingClosed()
+        elif places <= 0:
+            error = ParkingFull()
+        else:
+            parked.add(event.client_id)
+            available[event.parking_id] = places - 1
+            reserved[event.parking_id] += 1
+            sessions.append(
+                {
+                    "client_id": event.client_id,
+                    "parking_id": event.parking_id,
+                    "time_in": time_in,
+                }
+            )
+        results.append(_event_result(event, error))
+
+    if not sessions:
+        return results, reserved
+
+    parking = Parking.__table__
+    reserved_n = bindparam("reserved", type_=Integer)
+    claimed = db.session.execute(
+        update(parking)
+        .where(
+            parking.c.id == bindparam("reserved_id"),
+            parking.c.opened.is_(True),
+            parking.c.count_available_places >= reserved_n,
+        )
+        .values(count_available_places=parking.c.count_available_places - reserved_n),
+        [{"reserved_id": pid, "reserved": n} for pid, n in reserved.items()],
+    )
+    if claimed.rowcount != len(reserved):
+        raise BatchConflict()
+
+    try:
+        db.session.execute(insert(ClientParking), sessions)
+    except IntegrityError as e:
+        raise BatchConflict() from e
+    bump_shared(PARKINGS, SESSIONS)
+    return results, reserved
+
+
+def _entered(batch: Tuple[List[Dict[str, Any]], Counter[int]]) -> None:
+    results, reserved = batch
+    if not reserved:
+        return
+    client_totals.invalidate(*_succeeded(results))
+    data_versions.bump(PARKINGS, SESSIONS)
+    for parking_id, count in reserved.items():
+        occupancy.session_started(parking_id, count)
+        publish_occupancy("enter", parking_id, count=count)
+
+
+def enter_batch(events: Sequence[GateEvent]) -> List[Dict[str, Any]]:
+    results, _ = run_write(partial(_enter_batch, events), _entered)
+    return results
+
+
+def _exit_batch(
+    events: Sequence[GateEvent],
+) -> Tuple[List[Dict[str, Any]], Counter[int]]:
+    active = {
+        (row.client_id, row.parking_id): row
+        for row in db.session.execute(
+            select(
+                ClientParking.id,
+                ClientParking.client_id,
+                ClientParking.parking_id,
+                ClientParking.time_in,
+                Client.name,
+                Client.car_number,
+                Client.credit_card,
+            )
+            .join(Client, Client.id == ClientParking.client_id)
+            .where(
+                ClientParking.client_id.in_({event.client_id for event in events}),
+                ClientParking.time_out.is_(None),
+            )
+        )
+    }
+
+    results: List[Dict[str, Any]] = []
+    closed: List[Dict[str, Any]] = []
+    cards: List[Dict[str, Any]] = []
+    released: Counter[int] = Counter()
+    time_out = datetime.now(timezone.utc).replace(tzinfo=None)
+    for event in events:
+        row = active.pop((event.client_id, event.parking_id), None)
+        if row is None:
+            results.append(_event_result(event, SessionNotFound()))
+            continue
+        if event.credit_card:
+            cards.append({"card_client_id": row.client_id, "card": event.credit_card})
+        elif not row.credit_card:
+            results.append(
+                _event_result(
+                    event,
+                    status="require_credit_card",
+                    client_name=row.name,
+                    car_number=row.car_number,
+                )
+            )
+            continue
+        closed.append({"session_id": row.id, "closed_at": time_out})
+        released[row.parking_id] += 1
+        results.append(
+            _event_result(
+                event,
+                amount=calculate_fee(row.parking_id, row.time_in, time_out),
+            )
+        )
+
+    if cards:
+        client = Client.__table__
+        db.session.execute(
+            update(client)
+            .where(client.c.id == bindparam("card_client_id"))
+            .values(credit_card=bindparam("card")),
+            cards,
+        )
+    if closed:
+        client_parking = ClientParking.__table__
+        result = db.session.execute(
+            update(client_parking)
+            .where(
+                client_parking.c.id == bindparam("session_id"),
+                client_parking.c.time_out.is_(None),
+            )
+            .values(time_out=bindparam("closed_at")),
+            closed,
+        )
+        if result.rowcount != len(closed):
+            raise BatchConflict()
+
+        parking = Parking.__table__
+        freed = parking.c.count_available_places + bindparam("released")
+        db.session.execute(
+            update(parking)
+            .where(parking.c.id == bindparam("released_id"))
+            .values(count_available_places=freed),
+            [{"released_id": pid, "released": n} for pid, n in released.items()],
+        )
+        bump_shared(CLIENTS, PARKINGS, SESSIONS)
+    return results, released
+
+
+def _exited(batch: Tuple[List[Dict[str, Any]], Counter[int]]) -> None:
+    results, released = batch
+    client_totals.invalidate(*_succeeded(results))
+    data_versions.bump(CLIENTS, PARKINGS, SESSIONS)
+    for parking_id, count in released.items():
+        occupancy.session_ended(parking_id, count)
+        publish_occupancy("exit", parking_id, count=count)
+
+
+def exit_batch(events: Sequence[GateEvent]) -> List[Dict[str, Any]]:
+    results, _ = run_write(partial(_exit_batch, events), _exited)
+    return results
@@ -0,0 +1,70 @@
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import select, text
+
+from project.app.models import ParkingStats
+from project.app.occupancy import occupancy_statement
+from project.database import db
+from project.database.migrations import PARKING_STATS_REBUILD
+
+TOTAL = 0
+
+StatsRow = Tuple[int, int, int]
+
+
+@dataclass(frozen=True)
+class StatsMismatch:
+    parking_id: int
+    stored: Optional[StatsRow]
+    expected: Optional[StatsRow]
+
+
+def total_stats() -> ParkingStats:
+    stats = db.session.get(ParkingStats, TOTAL)
+    if stats is None:
+        return ParkingStats(parking_id=TOTAL, parkings=0, places=0, active_sessions=0)
+    return stats
+
+
+def expected_stats() -> Dict[int, StatsRow]:
+    expected: Dict[int, StatsRow] = {}
+    for row in db.session.execute(occupancy_statement()):
+        expected[row[0]] = (1, row[3], row[5])
+    expected[TOTAL] = (
+        len(expected),
+        sum(row[1] for row in expected.values()),
+        sum(row[2] for row in expected.values()),
+    )
+    return expected
+
+
+def stored_stats() -> Dict[int, StatsRow]:
+    rows = db.session.execute(
+        select(
+            ParkingStats.parking_id,
+            ParkingStats.parkings,
+            ParkingStats.places,
+            ParkingStats.active_sessions,
+        )
+    )
+    return {row[0]: (row[1], row[2], row[3]) for row in rows}
+
+
+def rebuild_stats() -> None:
+    for statement in PARKING_STATS_REBUILD:
+        db.session.execute(text(statement))
+    db.session.commit()
+
+
+def check_stats(repair: bool = False) -> List[StatsMismatch]:
+    expected = expected_stats()
+    stored = stored_stats()
+    mismatches = [
+        StatsMismatch(parking_id, stored.get(parking_id), expected.get(parking_id))
+        for parking_id in sorted(expected.keys() | stored.keys())
+        if stored.get(parking_id) != expected.get(parking_id)
+    ]
+    if mismatches and repair:
+        rebuild_stats()
+    return mismatches
@@ -0,0 +1,224 @@
+import csv
+import json
+from dataclasses import dataclass
+from datetime import datetime
+from typing import IO, Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
+
+from project.app.archive import SESSION_COLUMNS, all_sessions
+from project.app.models import Client, Parking
+from project.app.occupancy import occupancy
+from project.app.plates import validate_car_number
+from project.app.versions import CLIENTS, PARKINGS, bump_shared, data_versions
+from project.config import Config
+from project.database import db
+
+FORMATS = ("csv", "jsonl")
+TRUE_VALUES = {"1", "true", "yes", "y", "да"}
+
+Record = Dict[str, Any]
+Rejected = Callable[[int, Record, str], None]
+
+
+class InvalidRecord(ValueError):
+    pass
+
+
+def _text(record: Record, name: str, required: bool = True) -> str:
+    value = str(record.get(name) or "").strip()
+    if required and not value:
+        raise InvalidRecord(f"{name} is required")
+    return value
+
+
+def _number(record: Record, name: str, positive: bool = False) -> int:
+    try:
+        value = record.get(name)
+        number = int("" if value is None else value)
+    except (TypeError, ValueError) as e:
+        raise InvalidRecord(f"{name} must be an integer") from e
+    if positive and number <= 0:
+        raise InvalidRecord(f"{name} must be positive")
+    if number < 0:
+        raise InvalidRecord(f"{name} must not be negative")
+    return number
+
+
+def client_row(record: Record) -> Record:
+    car_number = _text(record, "car_number")
+    if not validate_car_number(car_number):
+        raise InvalidRecord(f"invalid car number {car_number!r}")
+    return {
+        "name": _text(record, "name"),
+        "surname": _text(record, "surname"),
+        "car_number": car_number,
+        "credit_card": _text(record, "credit_card", required=False) or None,
+    }
+
+
+def _flag(record: Record, name: str) -> bool:
+    value = record.get(name, True)
+    if isinstance(value, bool):
+        return value
+    return str(value).strip().lower() in TRUE_VALUES
+
+
+def parking_row(record: Record) -> Record:
+    count_places = _number(record, "count_places", positive=True)
+    count_available = count_places
+    if record.get("count_available_places") not in (None, ""):
+        count_available = _number(record, "count_available_places")
+    if count_available > count_places:
+        raise InvalidRecord("count_available_places exceeds count_places")
+    return {
+        "address": _text(record, "address"),
+        "opened": _flag(record, "opened"),
+        "count_places": count_places,
+        "count_available_places": count_available,
+    }
+
+
+def clients_imported() -> None:
+    data_versions.bump(CLIENTS)
+
+
+def parkings_imported() -> None:
+    data_versions.bump(PARKINGS)
+    occupancy.rebuild()
+
+
+IMPORTS: Dict[str, Tuple[Any, Callable[[Record], Record]]] = {
+    "clients": (Client.__table__, client_row),
+    "parkings": (Parking.__table__, parking_row),
+}
+# Run in the importing process; servers follow the shared version stamp.
+IMPORTED: Dict[str, Callable[[], None]] = {
+    CLIENTS: clients_imported,
+    PARKINGS: parkings_imported,
+}
+
+
+@dataclass
+class ImportReport:
+    imported: int = 0
+    rejected: int = 0
+
+
+def read_records(stream: IO[str], fmt: str) -> Iterator[Tuple[int, Record]]:
+    if fmt == "csv":
+        reader = csv.DictReader(stream)
+        for record in reader:
+            yield reader.line_num, record
+        return
+    for line_num, line in enumerate(stream, 1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            record = {"__error__": "malformed JSON"}
+        yield line_num, (
+            record
+            if isinstance(record, dict)
+            else {"__error__": "expected a JSON object"}
+        )
+
+
+def _insert_chunk(
+    table: Any,
+    chunk: List[Tuple[int, Record, Record]],
+    report: ImportReport,
+    rejected: Rejected,
+) -> None:
+    try:
+        db.session.execute(insert(table), [row for _, _, row in chunk])
+        bump_shared(table.name)
+        db.session.commit()
+        report.imported += len(chunk)
+        return
+    except IntegrityError:
+        db.session.rollback()
+
+    # Isolate the offending rows instead of dropping the whole chunk.
+    for line_num, record, row in chunk:
+        try:
+            db.session.execute(insert(table), [row])
+            bump_shared(table.name)
+            db.session.commit()
+            report.imported += 1
+        except IntegrityError as e:
+            db.session.rollback()
+            report.rejected += 1
+            rejected(line_num, record, str(e.orig))
+
+
+def import_records(
+    entity: str,
+    records: Iterable[Tuple[int, Record]],
+    rejected: Rejected,
+    chunk_size: Optional[int] = None,
+) -> ImportReport:
+    table, convert = IMPORTS[entity]
+    chunk_size = chunk_size or Config.STREAM_BATCH_SIZE
+    report = ImportReport()
+    chunk: List[Tuple[int, Record, Record]] = []
+    for line_num, record in records:
+        try:
+            if "__error__" in record:
+                raise InvalidRecord(record["__error__"])
+            chunk.append((line_num, record, convert(record)))
+        except InvalidRecord as e:
+            report.rejected += 1
+            rejected(line_num, record, str(e))
+            continue
+        if len(chunk) >= chunk_size:
+            _insert_chunk(table, chunk, report, rejected)
+            chunk = []
+    if chunk:
+        _insert_chunk(table, chunk, report, rejected)
+
+    IMPORTED[table.name]()
+    return report
+
+
+EXPORTS: Dict[str, Tuple[str, ...]] = {
+    "clients": ("id", "name", "surname", "car_number", "credit_card"),
+    "parkings": ("id", "address", "opened", "count_places", "count_available_places"),
+    "sessions": SESSION_COLUMNS + ("archived",),
+}
+
+
+def _export_source(entity: str) -> Any:
+    if entity == "sessions":
+        return all_sessions()
+    return IMPORTS[entity][0]
+
+
+def _plain(value: Any) -> Any:
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def export_records(
+    entity: str, stream: IO[str], fmt: str, batch_size: Optional[int] = None
+) -> int:
+    columns, source = EXPORTS[entity], _export_source(entity)
+    rows = db.session.execute(
+        select(*(source.c[name] for name in columns)).order_by(source.c.id),
+        execution_options={"yield_per": batch_size or Config.STREAM_BATCH_SIZE},
+    )
+    writer = csv.writer(stream) if fmt == "csv" else None
+    if writer is not None:
+        writer.writerow(columns)
+
+    exported = 0
+    for row in rows:
+        values = [_plain(value) for value in row]
+        if writer is not None:
+            writer.writerow(values)
+        else:
+            stream.write(json.dumps(dict(zip(columns, values)), ensure_ascii=False))
+            stream.write("\n")
+        exported += 1
+    return exported
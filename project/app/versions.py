@@ -0,0 +1,179 @@
+import hashlib
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from functools import wraps
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, TypeVar, cast
+
+from flask import Response, make_response, request, session
+from sqlalchemy import select
+from sqlalchemy.dialects.sqlite import insert
+from werkzeug.http import is_resource_modified
+
+from project.app.models import SharedVersion
+from project.database import db
+
+View = TypeVar("View", bound=Callable[..., Any])
+
+CLIENTS = "client"
+PARKINGS = "parking"
+SESSIONS = "client_parking"
+TARIFFS = "tariff"
+
+
+class DataVersions:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        # Versions live in memory, so a restart must not revive old ETags.
+        self._epoch = uuid.uuid4().hex[:8]
+        self._versions: Dict[str, int] = {}
+        self._modified: Dict[str, datetime] = {}
+        self._started = datetime.now(timezone.utc).replace(microsecond=0)
+
+    def bump(self, *tables: str) -> None:
+        now = datetime.now(timezone.utc).replace(microsecond=0)
+        with self._lock:
+            for table in tables:
+                self._versions[table] = self._versions.get(table, 0) + 1
+                self._modified[table] = now
+
+    def stamp(self, *tables: str) -> Tuple[str, datetime]:
+        with self._lock:
+            versions = "-".join(str(self._versions.get(table, 0)) for table in tables)
+            modified = max(
+                (self._modified.get(table, self._started) for table in tables),
+                default=self._started,
+            )
+        return f"{self._epoch}-{versions}", modified
+
+
+data_versions = DataVersions()
+
+
+class SharedVersions:
+    def __init__(self, interval: Optional[float] = 2.0) -> None:
+        self._lock = threading.Lock()
+        self._seen: Dict[str, int] = {}
+        self._listeners: Dict[str, List[Callable[[], None]]] = {}
+        self._checked = 0.0
+        self.interval = interval
+
+    def configure(self, interval: Optional[float]) -> None:
+        with self._lock:
+            self.interval = interval
+            self._checked = time.monotonic()
+
+    def on_change(self, name: str, listener: Callable[[], None]) -> None:
+        with self._lock:
+            listeners = self._listeners.setdefault(name, [])
+            if listener not in listeners:
+                listeners.append(listener)
+
+    def due(self) -> bool:
+        now = time.monotonic()
+        with self._lock:
+            if self.interval is None or now - self._checked < self.interval:
+                return False
+            self._checked = now
+            return True
+
+    def changed(self, rows: Iterable[Tuple[str, int]]) -> List[str]:
+        versions = dict(rows)
+        with self._lock:
+            changed = [
+                name
+                for name, version in versions.items()
+                if self._seen.get(name) != version
+            ]
+            self._seen.update(versions)
+        return changed
+
+    def sync(self) -> None:
+        rows = db.session.execute(shared_version_statement()).tuples().all()
+        with self._lock:
+            self._seen = dict(rows)
+
+    def poll(self) -> None:
+        if not self.due():
+            return
+        # A connection of its own keeps the request session out of a read
+        # transaction that a later write would have to upgrade.
+        with db.engine.connect() as connection:
+            rows = connection.execute(shared_version_statement()).tuples().all()
+        changed = self.changed(rows)
+        if changed:
+            # Pages rendered from these tables are stale in every process.
+            data_versions.bump(*changed)
+        with self._lock:
+            # A listener shared by several changed names runs once.
+            listeners = list(
+                dict.fromkeys(
+                    listener
+                    for name in changed
+                    for listener in self._listeners.get(name, ())
+                )
+            )
+        for listener in listeners:
+            listener()
+
+
+shared_versions = SharedVersions()
+
+
+def shared_version_statement() -> Any:
+    return select(SharedVersion.name, SharedVersion.version)
+
+
+def shared_bump_statement(*names: str) -> Any:
+    return (
+        insert(SharedVersion)
+        .values([{"name": name, "version": 1} for name in names])
+        .on_conflict_do_update(
+            index_elements=["name"], set_={"version": SharedVersion.version + 1}
+        )
+    )
+
+
+def bump_shared(*names: str) -> None:
+    # Runs in the caller's transaction, other processes see it on commit.
+    db.session.execute(shared_bump_statement(*names))
+
+
+def _etag(stamp: str) -> str:
+    # Paginated pages differ by query string, so it is part of the tag.
+    query = hashlib.blake2b(request.query_string, digest_size=6).hexdigest()
+    return f"{request.endpoint}-{stamp}-{query}"
+
+
+def conditional(*tables: str) -> Callable[[View], View]:
+    def decorator(view: View) -> View:
+        @wraps(view)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            # Pending flash messages are rendered once, the page is not cacheable.
+            if "_flashes" in session:
+                return view(*args, **kwargs)
+
+            stamp, modified = data_versions.stamp(*tables)
+            etag = _etag(stamp)
+            if not is_resource_modified(
+                request.environ, etag=etag, last_modified=modified
+            ):
+                not_modified = Response(status=304)
+                _validators(not_modified, etag, modified)
+                return not_modified
+
+            response = make_response(view(*args, **kwargs))
+            if not response.is_streamed:
+                _validators(response, etag, modified)
+            return response
+
+        return cast(View, wrapper)
+
+    return decorator
+
+
+def _validators(response: Response, etag: str, modified: datetime) -> None:
+    response.set_etag(etag, weak=True)
+    response.last_modified = modified
+    response.cache_control.no_cache = True
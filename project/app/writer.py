@@ -0,0 +1,185 @@
+import logging
+import queue
+import threading
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeout
+from dataclasses import dataclass, field
+from functools import partial
+from typing import Any, Callable, List, Optional, Tuple, TypeVar
+
+from flask import Flask, current_app, g, has_request_context
+from sqlalchemy import text
+
+from project.database import db
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class WriterUnavailable(RuntimeError):
+    pass
+
+
+@dataclass
+class Write:
+    apply: Callable[[], Any]
+    committed: Callable[[Any], None]
+    future: "Future[Any]" = field(default_factory=Future)
+
+
+class WriteCoordinator(threading.Thread):
+    def __init__(self, app: Flask, group_size: int, timeout: float = 30.0) -> None:
+        super().__init__(name="sqlite-writer", daemon=True)
+        self.app = app
+        self.group_size = group_size
+        self.timeout = timeout
+        self.writes: "queue.Queue[Optional[Write]]" = queue.Queue()
+        self.groups = 0
+        self.committed = 0
+        self.stopped = False
+
+    def submit(self, apply: Callable[[], Any], committed: Callable[[Any], None]) -> Any:
+        if self.stopped:
+            raise WriterUnavailable("Write coordinator is stopped")
+        write = Write(apply, committed)
+        self.writes.put(write)
+        try:
+            return write.future.result(timeout=self.timeout)
+        except FutureTimeout:
+            # A write still in the queue is withdrawn and will never apply;
+            # one already being committed is waited for to learn its outcome.
+            if write.future.cancel():
+                raise WriterUnavailable(
+                    f"Write not started within {self.timeout} seconds"
+                ) from None
+            return write.future.result()
+
+    def stop(self) -> None:
+        self.writes.put(None)
+        self.join()
+
+    def run(self) -> None:
+        try:
+            self._loop()
+        finally:
+            self.stopped = True
+            self._fail_pending()
+
+    def _loop(self) -> None:
+        with self.app.app_context():
+            # Results are handed to other threads: keep their loaded state
+            # after commit instead of expiring it.
+            db.session().expire_on_commit = False
+            while True:
+                write = self.writes.get()
+                if write is None:
+                    break
+                group = [write]
+                while len(group) < self.group_size:
+                    try:
+                        pending = self.writes.get_nowait()
+                    except queue.Empty:
+                        break
+                    if pending is None:
+                        self.writes.put(None)
+                        break
+                    group.append(pending)
+                # Writes whose callers gave up are dropped unapplied.
+                group = [w for w in group if w.future.set_running_or_notify_cancel()]
+                if group:
+                    self._commit_group(group)
+                db.session.remove()
+                db.session().expire_on_commit = False
+
+    def _fail_pending(self) -> None:
+        while True:
+            try:
+                write = self.writes.get_nowait()
+            except queue.Empty:
+                return
+            if write is not None and write.future.set_running_or_notify_cancel():
+                write.future.set_exception(
+                    WriterUnavailable("Write coordinator is stopped")
+                )
+
+    def _begin(self) -> None:
+        # pysqlite only opens a transaction before DML: without an explicit
+        # BEGIN the first SAVEPOINT would start it and its RELEASE commit it.
+        if db.session.get_bind().dialect.name == "sqlite":
+            db.session.execute(text("BEGIN IMMEDIATE"))
+
+    def _commit_group(self, group: List[Write]) -> None:
+        applied: List[Tuple[Write, Any]] = []
+        failed: List[Tuple[Write, BaseException]] = []
+        try:
+            self._begin()
+            for write in group:
+                try:
+                    with db.session.begin_nested():
+                        applied.append((write, write.apply()))
+                except Exception as e:
+                    failed.append((write, e))
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            logger.exception("Group commit of %d writes failed", len(group))
+            for write in group:
+                if not write.future.done():
+                    write.future.set_exception(e)
+            return
+
+        db.session.expunge_all()
+        self.groups += 1
+        self.committed += len(applied)
+        for write, result in applied:
+            try:
+                write.committed(result)
+            except Exception:
+                logger.exception("After-commit hook failed")
+            write.future.set_result(result)
+        for write, error in failed:
+            write.future.set_exception(error)
+
+
+def _with_extras(apply: Callable[[], T], extras: List[Callable[[], None]]) -> T:
+    result = apply()
+    for extra in extras:
+        extra()
+    return result
+
+
+def run_write(apply: Callable[[], T], committed: Callable[[T], None]) -> T:
+    # Statements a request asked to commit atomically with its first write.
+    extras = g.pop("write_extras", None) if has_request_context() else None
+    if extras:
+        apply = partial(_with_extras, apply, extras)
+
+    coordinator: Optional[WriteCoordinator] = current_app.extensions.get("writer")
+    if coordinator is not None and coordinator.is_alive():
+        result: T = coordinator.submit(apply, committed)
+        return result
+
+    try:
+        result = apply()
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    try:
+        committed(result)
+    except Exception:
+        # The write is durable, so the caller must not see it as failed.
+        logger.exception("After-commit hook failed")
+    return result
+
+
+def init_writer(app: Flask) -> Optional[WriteCoordinator]:
+    if not app.config.get("WRITE_COORDINATOR"):
+        return None
+    coordinator = WriteCoordinator(
+        app, app.config["WRITER_GROUP_SIZE"], app.config["WRITER_TIMEOUT_SECONDS"]
+    )
+    app.extensions["writer"] = coordinator
+    coordinator.start()
+    return coordinator
@@ -0,0 +1,94 @@
+import argparse
+import json
+import platform
+import sqlite3
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from project.app import create_app
+from project.app.occupancy import occupancy
+from project.benchmarks import routes
+from project.benchmarks.datasets import DatasetSpec, generate
+from project.config import Config
+from project.database import db
+
+
+def _parse_args(argv: Optional[List[str]]) -> argparse.Namespace:
+    defaults = DatasetSpec()
+    parser = argparse.ArgumentParser(
+        prog="python -m project.benchmarks",
+        description="Benchmark every route over a synthetic parking dataset.",
+    )
+    parser.add_argument("--database", type=Path, default=Path("benchmark.db"))
+    parser.add_argument("--reuse", action="store_true", help="keep an existing db")
+    parser.add_argument("--clients", type=int, default=defaults.clients)
+    parser.add_argument("--parkings", type=int, default=defaults.parkings)
+    parser.add_argument("--sessions", type=int, default=defaults.sessions)
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--output", type=Path, default=Path("benchmark.json"))
+    parser.add_argument("--compare", type=Path, help="previous results to diff")
+    return parser.parse_args(argv)
+
+
+def compare(previous: Dict[str, Any], current: Dict[str, Any]) -> List[str]:
+    lines = []
+    for route, result in current["results"].items():
+        before = previous.get("results", {}).get(route)
+        if not before or not before["p50_ms"]:
+            continue
+        change = (result["p50_ms"] - before["p50_ms"]) / before["p50_ms"] * 100
+        lines.append(
+            f"{route:40} p50 {before['p50_ms']:9.2f} -> {result['p50_ms']:9.2f} ms"
+            f" ({change:+.1f}%)"
+        )
+    return lines
+
+
+def main(argv: Optional[List[str]] = None) -> Dict[str, Any]:
+    args = _parse_args(argv)
+    spec = DatasetSpec(
+        clients=args.clients,
+        parkings=args.parkings,
+        sessions=args.sessions,
+        seed=args.seed,
+    )
+    fresh = not (args.reuse and args.database.exists())
+    if fresh and args.database.exists():
+        args.database.unlink()
+
+    class BenchmarkConfig(Config):
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{args.database.resolve()}"
+
+    app = create_app(BenchmarkConfig())
+    dataset: Dict[str, Any] = {"reused": not fresh}
+    if fresh:
+        started = time.perf_counter()
+        with app.app_context():
+            dataset.update(generate(db.engine, spec))
+            occupancy.rebuild()
+        dataset["generation_seconds"] = round(time.perf_counter() - started, 2)
+
+    report = {
+        "meta": {
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "iterations": args.iterations,
+            "seed": args.seed,
+            "dataset": dataset,
+        },
+        "results": routes.run(app, args.iterations, args.seed),
+    }
+    args.output.write_text(json.dumps(report, indent=2, ensure_ascii=False))
+
+    if args.compare:
+        previous = json.loads(args.compare.read_text())
+        print("\n".join(compare(previous, report)))
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+import random
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterator, List
+
+from sqlalchemy import Engine, insert
+
+from project.app.models import Client, ClientParking, Parking
+from project.app.plates import PLATE_LETTERS
+
+FIRST_NAMES = ["Иван", "Пётр", "Анна", "Мария", "Олег", "Елена", "Сергей", "Ольга"]
+SURNAMES = ["Иванов", "Петров", "Сидоров", "Смирнов", "Кузнецов", "Попов", "Соколов"]
+STREETS = ["Ленина", "Мира", "Садовая", "Гагарина", "Победы", "Советская"]
+CHUNK_SIZE = 10_000
+
+
+@dataclass(frozen=True)
+class DatasetSpec:
+    clients: int = 1_000_000
+    parkings: int = 10_000
+    sessions: int = 10_000_000
+    active_ratio: float = 0.3
+    history_days: int = 365
+    seed: int = 42
+
+
+def plate_for(index: int) -> str:
+    index, region = divmod(index, 900)
+    index, digits = divmod(index, 1000)
+    letters = []
+    for _ in range(3):
+        index, letter = divmod(index, len(PLATE_LETTERS))
+        letters.append(PLATE_LETTERS[letter])
+    return f"{letters[0]}{digits:03}{letters[1]}{letters[2]}{region + 100}"
+
+
+def _chunks(rows: Iterator[Dict[str, Any]]) -> Iterator[List[Dict[str, Any]]]:
+    chunk: List[Dict[str, Any]] = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == CHUNK_SIZE:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _client_rows(spec: DatasetSpec, rng: random.Random) -> Iterator[Dict[str, Any]]:
+    for index in range(spec.clients):
+        yield {
+            "id": index + 1,
+            "name": rng.choice(FIRST_NAMES),
+            "surname": rng.choice(SURNAMES),
+            "car_number": plate_for(index),
+            "credit_card": (
+                f"{rng.randrange(10**15, 10**16)}" if rng.random() < 0.7 else None
+            ),
+        }
+
+
+def _parking_rows(spec: DatasetSpec, rng: random.Random) -> List[Dict[str, Any]]:
+    return [
+        {
+            "id": index + 1,
+            "address": f"ул. {rng.choice(STREETS)}, {rng.randint(1, 200)}",
+            "opened": rng.random() < 0.95,
+            "count_places": rng.randint(50, 500),
+        }
+        for index in range(spec.parkings)
+    ]
+
+
+def _session_rows(
+    spec: DatasetSpec, rng: random.Random, now: datetime
+) -> Iterator[Dict[str, Any]]:
+    for index in range(spec.sessions):
+        time_in = now - timedelta(minutes=rng.randint(60, spec.history_days * 1440))
+        minutes = max(1, int(rng.lognormvariate(4.5, 1.0)))
+        yield {
+            "id": index + 1,
+            "client_id": rng.randint(1, spec.clients),
+            "parking_id": rng.randint(1, spec.parkings),
+            "time_in": time_in,
+            "time_out": min(time_in + timedelta(minutes=minutes), now),
+        }
+
+
+def generate(engine: Engine, spec: DatasetSpec) -> Dict[str, int]:
+    rng = random.Random(spec.seed)
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    parkings = _parking_rows(spec, rng)
+
+    # Park a share of clients: one active session per client, never more
+    # cars on a parking than it has places.
+    occupied = [0] * spec.parkings
+    active: List[Dict[str, Any]] = []
+    active_clients = rng.sample(
+        range(1, spec.clients + 1), int(spec.clients * spec.active_ratio)
+    )
+    for client_id in active_clients:
+        parking_index = rng.randrange(spec.parkings)
+        if occupied[parking_index] >= parkings[parking_index]["count_places"]:
+            continue
+        occupied[parking_index] += 1
+        active.append(
+            {
+                "id": spec.sessions + len(active) + 1,
+                "client_id": client_id,
+                "parking_id": parking_index + 1,
+                "time_in": now - timedelta(minutes=rng.randint(1, 1440)),
+                "time_out": None,
+            }
+        )
+    for parking, taken in zip(parkings, occupied):
+        parking["count_available_places"] = parking["count_places"] - taken
+
+    with engine.begin() as connection:
+        for chunk in _chunks(_client_rows(spec, rng)):
+            connection.execute(insert(Client.__table__), chunk)
+        for chunk in _chunks(iter(parkings)):
+            connection.execute(insert(Parking.__table__), chunk)
+        for chunk in _chunks(_session_rows(spec, rng, now)):
+            connection.execute(insert(ClientParking.__table__), chunk)
+        for chunk in _chunks(iter(active)):
+            connection.execute(insert(ClientParking.__table__), chunk)
+
+    return {
+        "clients": spec.clients,
+        "parkings": spec.parkings,
+        "closed_sessions": spec.sessions,
+        "active_sessions": len(active),
+    }
@@ -0,0 +1,146 @@
+import random
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List
+
+from flask import Flask
+from flask.testing import FlaskClient
+from sqlalchemy import func, select
+
+from project.app.models import Client, ClientParking, Parking
+from project.database import db
+
+Request = Callable[[FlaskClient], Any]
+
+
+@dataclass
+class RouteTimings:
+    latencies: List[float] = field(default_factory=list)
+    errors: int = 0
+
+    def record(self, started: float, status_code: int) -> None:
+        self.latencies.append(time.perf_counter() - started)
+        if status_code >= 400:
+            self.errors += 1
+
+    def summary(self) -> Dict[str, float]:
+        latencies = sorted(self.latencies)
+        total = sum(latencies)
+        return {
+            "requests": len(latencies),
+            "errors": self.errors,
+            "throughput_rps": len(latencies) / total if total else 0.0,
+            "p50_ms": _percentile(latencies, 50) * 1000,
+            "p95_ms": _percentile(latencies, 95) * 1000,
+            "p99_ms": _percentile(latencies, 99) * 1000,
+            "max_ms": (latencies[-1] if latencies else 0.0) * 1000,
+        }
+
+
+def _percentile(ordered: List[float], percent: float) -> float:
+    if not ordered:
+        return 0.0
+    rank = max(0, min(len(ordered) - 1, round(percent / 100 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+def _timed(client: FlaskClient, timings: RouteTimings, request: Request) -> Any:
+    started = time.perf_counter()
+    response = request(client)
+    timings.record(started, response.status_code)
+    return response
+
+
+def _free_clients(limit: int) -> List[int]:
+    parked = select(ClientParking.id).where(
+        ClientParking.client_id == Client.id, ClientParking.time_out.is_(None)
+    )
+    return list(
+        db.session.scalars(
+            select(Client.id).where(~parked.exists()).order_by(Client.id).limit(limit)
+        )
+    )
+
+
+def _open_parkings() -> List[int]:
+    return list(
+        db.session.scalars(
+            select(Parking.id)
+            .where(Parking.opened.is_(True), Parking.count_available_places > 0)
+            .order_by(Parking.count_available_places.desc())
+            .limit(100)
+        )
+    )
+
+
+def run(app: Flask, iterations: int, seed: int = 42) -> Dict[str, Dict[str, float]]:
+    rng = random.Random(seed)
+    with app.app_context():
+        max_client = db.session.scalar(select(func.max(Client.id))) or 1
+        free_clients = _free_clients(iterations * 2)
+        open_parkings = _open_parkings()
+        db.session.remove()
+
+    reads: Dict[str, Request] = {
+        "GET /": lambda c: c.get("/"),
+        "GET /clients": lambda c: c.get("/clients"),
+        "GET /clients?after": lambda c: c.get(
+            f"/clients?after={rng.randint(1, max_client)}"
+        ),
+        "GET /clients/<id>": lambda c: c.get(f"/clients/{rng.randint(1, max_client)}"),
+        "GET /parkings": lambda c: c.get("/parkings"),
+        "GET /client_parkings/enter": lambda c: c.get("/client_parkings/enter"),
+        "GET /client_parkings/exit": lambda c: c.get("/client_parkings/exit"),
+        "GET /client_parkings/active": lambda c: c.get("/client_parkings/active"),
+        "GET /api/occupancy": lambda c: c.get("/api/occupancy"),
+        "GET /metrics": lambda c: c.get("/metrics"),
+    }
+    timings: Dict[str, RouteTimings] = {}
+    client = app.test_client()
+
+    for name, request in reads.items():
+        route = timings.setdefault(name, RouteTimings())
+        for _ in range(iterations):
+            _timed(client, route, request)
+
+    if not open_parkings:
+        return {name: route.summary() for name, route in timings.items()}
+
+    enter = timings.setdefault("POST /client_parkings/enter", RouteTimings())
+    leave = timings.setdefault("DELETE /api/client_parkings/exit", RouteTimings())
+    for client_id in free_clients[:iterations]:
+        event = {"client_id": client_id, "parking_id": rng.choice(open_parkings)}
+        _timed(client, enter, lambda c: c.post("/client_parkings/enter", data=event))
+        _timed(
+            client,
+            leave,
+            lambda c: c.delete(
+                "/api/client_parkings/exit", json={**event, "credit_card": "4000"}
+            ),
+        )
+
+    enter_batch = timings.setdefault("POST /api/.../enter/batch", RouteTimings())
+    exit_batch = timings.setdefault("POST /api/.../exit/batch", RouteTimings())
+    batch_clients = free_clients[iterations:]
+    for offset in range(0, len(batch_clients), 50):
+        events = [
+            {"client_id": client_id, "parking_id": rng.choice(open_parkings)}
+            for client_id in batch_clients[offset : offset + 50]
+        ]
+        _timed(
+            client,
+            enter_batch,
+            lambda c: c.post(
+                "/api/client_parkings/enter/batch", json={"events": events}
+            ),
+        )
+        _timed(
+            client,
+            exit_batch,
+            lambda c: c.post(
+                "/api/client_parkings/exit/batch",
+                json={"events": [{**e, "credit_card": "4000"} for e in events]},
+            ),
+        )
+
+    return {name: route.summary() for name, route in timings.items()}
@@ -0,0 +1,182 @@
+import argparse
+import json
+import random
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from flask import Flask
+from sqlalchemy import text
+
+from project.app import create_app
+from project.app.occupancy import occupancy
+from project.benchmarks.datasets import DatasetSpec, generate
+from project.benchmarks.routes import RouteTimings
+from project.config import Config
+from project.database import db
+
+PROFILES: Dict[str, Optional[Dict[str, Any]]] = {
+    "default": None,
+    "tuned": Config.SQLITE_PRAGMAS,
+}
+
+
+def _parse_args(argv: Optional[List[str]]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="python -m project.benchmarks.sqlite_profile",
+        description="Compare mixed read/write throughput with and without "
+        "the SQLite tuning profile.",
+    )
+    parser.add_argument("--directory", type=Path, default=Path("."))
+    parser.add_argument("--clients", type=int, default=20_000)
+    parser.add_argument("--parkings", type=int, default=50)
+    parser.add_argument("--sessions", type=int, default=100_000)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--operations", type=int, default=200, help="per thread")
+    parser.add_argument("--write-ratio", type=float, default=0.3)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", type=Path, default=Path("sqlite_profile.json"))
+    return parser.parse_args(argv)
+
+
+def _profile_app(database: Path, pragmas: Optional[Dict[str, Any]]) -> Flask:
+    class ProfileConfig(Config):
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{database.resolve()}"
+        SQLITE_PRAGMAS = pragmas
+        SQLITE_POOL_SIZE = 5 if pragmas is None else Config.SQLITE_POOL_SIZE
+        SQLITE_MAX_OVERFLOW = 10 if pragmas is None else Config.SQLITE_MAX_OVERFLOW
+
+    return create_app(ProfileConfig())
+
+
+def _worker(
+    app: Flask,
+    clients: List[int],
+    parking_ids: List[int],
+    args: argparse.Namespace,
+    seed: int,
+    reads: RouteTimings,
+    writes: RouteTimings,
+    barrier: threading.Barrier,
+) -> None:
+    rng = random.Random(seed)
+    client = app.test_client()
+    parked: Dict[int, int] = {}
+    barrier.wait()
+    for _ in range(args.operations):
+        started = time.perf_counter()
+        if rng.random() >= args.write_ratio:
+            response = client.get(f"/clients/{rng.choice(clients)}")
+            reads.record(started, response.status_code)
+        elif parked:
+            client_id, parking_id = parked.popitem()
+            response = client.delete(
+                "/api/client_parkings/exit",
+                json={
+                    "client_id": client_id,
+                    "parking_id": parking_id,
+                    "credit_card": "4000",
+                },
+            )
+            writes.record(started, response.status_code)
+        else:
+            client_id = rng.choice(clients)
+            parking_id = rng.choice(parking_ids)
+            response = client.post(
+                "/api/client_parkings/enter/batch",
+                json={"events": [{"client_id": client_id, "parking_id": parking_id}]},
+            )
+            failed = response.status_code >= 400
+            if not failed and response.get_json()["results"][0]["status"] == "ok":
+                parked[client_id] = parking_id
+            writes.record(started, response.status_code)
+
+
+def run_profile(
+    name: str, args: argparse.Namespace, spec: DatasetSpec
+) -> Dict[str, Any]:
+    database = args.directory / f"sqlite_profile_{name}.db"
+    for suffix in ("", "-wal", "-shm"):
+        Path(f"{database}{suffix}").unlink(missing_ok=True)
+    app = _profile_app(database, PROFILES[name])
+    with app.app_context():
+        generate(db.engine, spec)
+        occupancy.rebuild()
+        journal_mode = db.session.execute(text("PRAGMA journal_mode")).scalar()
+        db.session.remove()
+
+    # Each thread owns a disjoint slice of clients and pays on exit, so
+    # failures come from lock contention, not from business rules.
+    clients = list(range(1, spec.clients + 1))
+    share = len(clients) // args.threads
+    parking_ids = list(range(1, spec.parkings + 1))
+    reads, writes = RouteTimings(), RouteTimings()
+    barrier = threading.Barrier(args.threads)
+    threads = [
+        threading.Thread(
+            target=_worker,
+            args=(
+                app,
+                clients[index * share : (index + 1) * share],
+                parking_ids,
+                args,
+                args.seed + index,
+                reads,
+                writes,
+                barrier,
+            ),
+        )
+        for index in range(args.threads)
+    ]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    with app.app_context():
+        db.engine.dispose()
+
+    operations = len(reads.latencies) + len(writes.latencies)
+    return {
+        "journal_mode": journal_mode,
+        "elapsed_seconds": round(elapsed, 3),
+        "throughput_ops": operations / elapsed if elapsed else 0.0,
+        "reads": reads.summary(),
+        "writes": writes.summary(),
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> Dict[str, Any]:
+    args = _parse_args(argv)
+    spec = DatasetSpec(
+        clients=args.clients,
+        parkings=args.parkings,
+        sessions=args.sessions,
+        active_ratio=0.0,
+        seed=args.seed,
+    )
+    report: Dict[str, Any] = {
+        "meta": {
+            "sqlite": sqlite3.sqlite_version,
+            "threads": args.threads,
+            "operations_per_thread": args.operations,
+            "write_ratio": args.write_ratio,
+        },
+        "profiles": {name: run_profile(name, args, spec) for name in PROFILES},
+    }
+    args.output.write_text(json.dumps(report, indent=2, ensure_ascii=False))
+    for name, result in report["profiles"].items():
+        print(
+            f"{name:8} {result['throughput_ops']:9.1f} ops/s"
+            f"  read p95 {result['reads']['p95_ms']:8.2f} ms"
+            f"  write p95 {result['writes']['p95_ms']:8.2f} ms"
+            f"  errors {result['reads']['errors'] + result['writes']['errors']}"
+        )
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,5 @@
 from pathlib import Path
+from typing import Any, Dict, Optional
 
 BASE_DIR = Path(__file__).parent
 
@@ -8,4 +9,39 @@ class Config:
     SQLALCHEMY_DATABASE_URI = f"sqlite:///{DATABASE_PATH}"
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     SECRET_KEY = "secret-key"
+    SQLITE_PRAGMAS: Optional[Dict[str, Any]] = {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "busy_timeout": 5000,
+        "cache_size": -64000,
+        "mmap_size": 256 * 1024 * 1024,
+        "temp_store": "MEMORY",
+    }
+    SQLITE_POOL_SIZE = 8
+    SQLITE_MAX_OVERFLOW = 8
+    WRITE_COORDINATOR = False
+    WRITER_GROUP_SIZE = 32
+    WRITER_TIMEOUT_SECONDS = 30.0
     PARKING_RATE_PER_MINUTE = 10
+    # Wall clock of tariff periods and of the daily cap reset.
+    TARIFF_TIMEZONE = "Europe/Moscow"
+    PAGE_SIZE = 50
+    MAX_PAGE_SIZE = 500
+    STREAM_BATCH_SIZE = 1000
+    MAX_BATCH_SIZE = 500
+    N_PLUS_ONE_THRESHOLD: Optional[int] = None
+    ARCHIVE_INTERVAL_SECONDS: Optional[float] = None
+    ARCHIVE_BATCH_SIZE = 1000
+    ARCHIVE_MAX_BATCHES = 10
+    ARCHIVE_AFTER_HOURS = 24
+    ROLLUP_SETTLE_SECONDS = 60
+    SSE_HEARTBEAT_SECONDS = 15.0
+    FRAGMENT_CACHE_BYTES = 8 * 1024 * 1024
+    IDEMPOTENCY_TTL_SECONDS = 24 * 3600
+    IDEMPOTENCY_CACHE_SIZE = 10_000
+    ADMISSION_MAX_CONCURRENT = 8
+    ADMISSION_QUEUE_SIZE = 64
+    ADMISSION_MAX_WAIT_SECONDS = 2.0
+    GATE_RATE_PER_SECOND: Optional[float] = None
+    GATE_BURST = 20
+    SHARED_VERSIONS_POLL_SECONDS: Optional[float] = 2.0
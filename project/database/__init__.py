@@ -1,10 +1,36 @@
+from typing import Any, Dict, Optional
+
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import create_engine
+
+from project.database.migrations import upgrade
+from project.database.tuning import apply_pragmas, engine_options
 
 db = SQLAlchemy()
 
 
 def init_db(app: Flask) -> None:
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
+        **engine_options(
+            app.config["SQLALCHEMY_DATABASE_URI"],
+            app.config["SQLITE_POOL_SIZE"],
+            app.config["SQLITE_MAX_OVERFLOW"],
+        ),
+        **app.config.get("SQLALCHEMY_ENGINE_OPTIONS", {}),
+    }
     db.init_app(app)
     with app.app_context():
+        apply_pragmas(db.engine, app.config["SQLITE_PRAGMAS"])
         db.create_all()
+        upgrade(db.engine)
+
+
+def prepare_schema(database_uri: str, pragmas: Optional[Dict[str, Any]] = None) -> None:
+    engine = create_engine(database_uri)
+    apply_pragmas(engine, pragmas)
+    try:
+        db.metadata.create_all(engine)
+        upgrade(engine)
+    finally:
+        engine.dispose()
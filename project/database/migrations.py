@@ -0,0 +1,246 @@
+import logging
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Set
+
+from sqlalchemy import Connection, Engine, text
+
+logger = logging.getLogger(__name__)
+
+MigrationStep = Callable[[Connection], None]
+
+# The folding rules as of migration 3; a migration must not change behaviour
+# when project.app.plates does.
+_PLATE_FOLD = str.maketrans("АВЕКМНОРСТУХ", "ABEKMHOPCTYX", " -")
+
+
+@dataclass(frozen=True)
+class Migration:
+    version: int
+    description: str
+    upgrade: MigrationStep
+
+
+def _execute(*statements: str) -> MigrationStep:
+    def upgrade(connection: Connection) -> None:
+        for statement in statements:
+            connection.execute(text(statement))
+
+    return upgrade
+
+
+def _one_active_session(connection: Connection) -> None:
+    # Concurrent entries may have left a client with several open sessions.
+    # Only the latest one stays open; the older ones are closed when it began
+    # and their places are given back, so the unique index can be built.
+    latest: Dict[int, Any] = {}
+    closed: List[Dict[str, Any]] = []
+    freed: Dict[int, int] = {}
+    rows = connection.execute(
+        text(
+            "SELECT id, client_id, parking_id, time_in FROM client_parking "
+            "WHERE time_out IS NULL ORDER BY client_id, id DESC"
+        )
+    )
+    for session_id, client_id, parking_id, time_in in rows:
+        if client_id not in latest:
+            latest[client_id] = time_in
+            continue
+        logger.warning(
+            "Closing session %d: client %d has a newer open session",
+            session_id,
+            client_id,
+        )
+        closed.append(
+            {"session_id": session_id, "time_out": max(time_in, latest[client_id])}
+        )
+        freed[parking_id] = freed.get(parking_id, 0) + 1
+    if closed:
+        connection.execute(
+            text(
+                "UPDATE client_parking SET time_out = :time_out WHERE id = :session_id"
+            ),
+            closed,
+        )
+        connection.execute(
+            text(
+                "UPDATE parking SET count_available_places = "
+                "count_available_places + :freed WHERE id = :parking_id"
+            ),
+            [{"parking_id": p, "freed": n} for p, n in freed.items()],
+        )
+    connection.exec_driver_sql("DROP INDEX IF EXISTS ix_client_parking_active")
+    connection.exec_driver_sql(
+        "CREATE UNIQUE INDEX ix_client_parking_active "
+        "ON client_parking (client_id) WHERE time_out IS NULL"
+    )
+
+
+def _normalize_plates(connection: Connection) -> None:
+    columns = connection.exec_driver_sql("PRAGMA table_info(client)").all()
+    if "plate" not in {column.name for column in columns}:
+        connection.exec_driver_sql("ALTER TABLE client ADD COLUMN plate VARCHAR(10)")
+
+    # Duplicated plates keep a NULL plate on every client after the first one
+    # so the unique index can be built; they are reported for manual cleanup.
+    seen: Set[str] = set()
+    updates: List[Dict[str, Any]] = []
+    rows = connection.execute(
+        text(
+            "SELECT id, car_number FROM client WHERE car_number IS NOT NULL ORDER BY id"
+        )
+    )
+    for client_id, car_number in rows:
+        plate = car_number.strip().upper().translate(_PLATE_FOLD)
+        if plate in seen:
+            logger.warning("Client %d duplicates plate %s", client_id, plate)
+            continue
+        seen.add(plate)
+        updates.append({"client_id": client_id, "plate": plate})
+    if updates:
+        connection.execute(
+            text("UPDATE client SET plate = :plate WHERE id = :client_id"), updates
+        )
+    connection.exec_driver_sql(
+        "CREATE UNIQUE INDEX IF NOT EXISTS ix_client_plate ON client (plate)"
+    )
+
+
+PARKING_STATS_REBUILD = (
+    "DELETE FROM parking_stats",
+    "INSERT INTO parking_stats (parking_id, parkings, places, active_sessions) "
+    "SELECT parking.id, 1, parking.count_places, "
+    "(SELECT count(*) FROM client_parking WHERE client_parking.parking_id = parking.id "
+    "AND client_parking.time_out IS NULL) FROM parking",
+    "INSERT INTO parking_stats (parking_id, parkings, places, active_sessions) "
+    "SELECT 0, count(*), coalesce(sum(places), 0), coalesce(sum(active_sessions), 0) "
+    "FROM parking_stats",
+)
+
+
+MIGRATIONS: List[Migration] = [
+    Migration(
+        1,
+        "index active sessions, session lookups and car numbers",
+        _execute(
+            "CREATE INDEX IF NOT EXISTS ix_client_parking_active "
+            "ON client_parking (client_id) WHERE time_out IS NULL",
+            "CREATE INDEX IF NOT EXISTS ix_client_parking_client_parking_time_out "
+            "ON client_parking (client_id, parking_id, time_out)",
+            "CREATE INDEX IF NOT EXISTS ix_client_car_number ON client (car_number)",
+        ),
+    ),
+    Migration(2, "allow at most one active session per client", _one_active_session),
+    Migration(3, "add unique normalized plates", _normalize_plates),
+    Migration(
+        4,
+        "full-text search over client names and plates",
+        _execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS client_search USING fts5("
+            "name, surname, plate, content='client', content_rowid='id', "
+            "tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+            "CREATE TRIGGER IF NOT EXISTS client_search_ai AFTER INSERT ON client "
+            "BEGIN "
+            "INSERT INTO client_search (rowid, name, surname, plate) "
+            "VALUES (new.id, new.name, new.surname, new.plate); "
+            "END",
+            "CREATE TRIGGER IF NOT EXISTS client_search_ad AFTER DELETE ON client "
+            "BEGIN "
+            "INSERT INTO client_search (client_search, rowid, name, surname, plate) "
+            "VALUES ('delete', old.id, old.name, old.surname, old.plate); "
+            "END",
+            "CREATE TRIGGER IF NOT EXISTS client_search_au "
+            "AFTER UPDATE OF name, surname, plate ON client "
+            "BEGIN "
+            "INSERT INTO client_search (client_search, rowid, name, surname, plate) "
+            "VALUES ('delete', old.id, old.name, old.surname, old.plate); "
+            "INSERT INTO client_search (rowid, name, surname, plate) "
+            "VALUES (new.id, new.name, new.surname, new.plate); "
+            "END",
+            "INSERT INTO client_search (client_search) VALUES ('rebuild')",
+        ),
+    ),
+    Migration(
+        5,
+        "index sessions by close time for occupancy rollups",
+        _execute(
+            "CREATE INDEX IF NOT EXISTS ix_client_parking_time_out "
+            "ON client_parking (time_out)",
+        ),
+    ),
+    Migration(
+        6,
+        "maintain per-parking and global stats with triggers",
+        _execute(
+            "CREATE TABLE IF NOT EXISTS parking_stats ("
+            "parking_id INTEGER NOT NULL PRIMARY KEY, "
+            "parkings INTEGER NOT NULL, "
+            "places INTEGER NOT NULL, "
+            "active_sessions INTEGER NOT NULL)",
+            "CREATE TRIGGER IF NOT EXISTS parking_stats_parking_ai "
+            "AFTER INSERT ON parking "
+            "BEGIN "
+            "INSERT INTO parking_stats (parking_id, parkings, places, active_sessions) "
+            "VALUES (new.id, 1, new.count_places, 0); "
+            "UPDATE parking_stats SET parkings = parkings + 1, "
+            "places = places + new.count_places WHERE parking_id = 0; "
+            "END",
+            "CREATE TRIGGER IF NOT EXISTS parking_stats_parking_au "
+            "AFTER UPDATE OF count_places ON parking "
+            "BEGIN "
+            "UPDATE parking_stats "
+            "SET places = places + new.count_places - old.count_places "
+            "WHERE parking_id IN (0, new.id); "
+            "END",
+            "CREATE TRIGGER IF NOT EXISTS parking_stats_parking_ad "
+            "AFTER DELETE ON parking "
+            "BEGIN "
+            "UPDATE parking_stats SET parkings = parkings - 1, "
+            "places = places - old.count_places, "
+            "active_sessions = active_sessions - coalesce("
+            "(SELECT active_sessions FROM parking_stats WHERE parking_id = old.id), 0) "
+            "WHERE parking_id = 0; "
+            "DELETE FROM parking_stats WHERE parking_id = old.id; "
+            "END",
+            "CREATE TRIGGER IF NOT EXISTS parking_stats_session_ai "
+            "AFTER INSERT ON client_parking WHEN new.time_out IS NULL "
+            "BEGIN "
+            "UPDATE parking_stats SET active_sessions = active_sessions + 1 "
+            "WHERE parking_id IN (0, new.parking_id); "
+            "END",
+            "CREATE TRIGGER IF NOT EXISTS parking_stats_session_au "
+            "AFTER UPDATE OF time_out, parking_id ON client_parking "
+            "BEGIN "
+            "UPDATE parking_stats SET active_sessions = active_sessions - 1 "
+            "WHERE old.time_out IS NULL AND parking_id IN (0, old.parking_id); "
+            "UPDATE parking_stats SET active_sessions = active_sessions + 1 "
+            "WHERE new.time_out IS NULL AND parking_id IN (0, new.parking_id); "
+            "END",
+            "CREATE TRIGGER IF NOT EXISTS parking_stats_session_ad "
+            "AFTER DELETE ON client_parking WHEN old.time_out IS NULL "
+            "BEGIN "
+            "UPDATE parking_stats SET active_sessions = active_sessions - 1 "
+            "WHERE parking_id IN (0, old.parking_id); "
+            "END",
+            *PARKING_STATS_REBUILD,
+        ),
+    ),
+]
+
+
+def get_schema_version(connection: Connection) -> int:
+    return int(connection.exec_driver_sql("PRAGMA user_version").scalar() or 0)
+
+
+def upgrade(engine: Engine) -> int:
+    with engine.connect() as connection:
+        version = get_schema_version(connection)
+
+    for migration in MIGRATIONS:
+        if migration.version <= version:
+            continue
+        with engine.begin() as connection:
+            migration.upgrade(connection)
+            connection.exec_driver_sql(f"PRAGMA user_version = {migration.version}")
+        version = migration.version
+
+    return version
@@ -3,14 +3,15 @@ CREATE TABLE client (
     name VARCHAR(50) NOT NULL,
     surname VARCHAR(50) NOT NULL,
     credit_card VARCHAR(50),
-    car_number VARCHAR(10),
+    car_number VARCHAR(10) NOT NULL,
+    plate VARCHAR(10),
     PRIMARY KEY (id)
 );
 
 CREATE TABLE parking (
     id INTEGER NOT NULL,
     address VARCHAR(100) NOT NULL,
-    opened BOOLEAN,
+    opened BOOLEAN NOT NULL,
     count_places INTEGER NOT NULL,
     count_available_places INTEGER NOT NULL,
     PRIMARY KEY (id)
@@ -18,12 +19,174 @@ CREATE TABLE parking (
 
 CREATE TABLE client_parking (
     id INTEGER NOT NULL,
-    client_id INTEGER,
-    parking_id INTEGER,
-    time_in DATETIME,
+    client_id INTEGER NOT NULL,
+    parking_id INTEGER NOT NULL,
+    time_in DATETIME NOT NULL,
     time_out DATETIME,
     PRIMARY KEY (id),
-    CONSTRAINT unique_client_parking UNIQUE (client_id, parking_id),
     FOREIGN KEY(client_id) REFERENCES client (id),
     FOREIGN KEY(parking_id) REFERENCES parking (id)
-);
\ No newline at end of file
+);
+
+CREATE TABLE client_parking_history (
+    id INTEGER NOT NULL,
+    client_id INTEGER NOT NULL,
+    parking_id INTEGER NOT NULL,
+    time_in DATETIME NOT NULL,
+    time_out DATETIME NOT NULL,
+    PRIMARY KEY (id),
+    FOREIGN KEY(client_id) REFERENCES client (id),
+    FOREIGN KEY(parking_id) REFERENCES parking (id)
+);
+
+CREATE TABLE parking_tariff (
+    parking_id INTEGER NOT NULL,
+    rate_per_minute INTEGER NOT NULL,
+    daily_cap INTEGER,
+    PRIMARY KEY (parking_id),
+    FOREIGN KEY(parking_id) REFERENCES parking (id)
+);
+
+CREATE TABLE tariff_period (
+    id INTEGER NOT NULL,
+    parking_id INTEGER NOT NULL,
+    start_minute INTEGER NOT NULL,
+    end_minute INTEGER NOT NULL,
+    rate_per_minute INTEGER NOT NULL,
+    PRIMARY KEY (id),
+    FOREIGN KEY(parking_id) REFERENCES parking_tariff (parking_id)
+);
+
+CREATE TABLE occupancy_rollup (
+    parking_id INTEGER NOT NULL,
+    hour DATETIME NOT NULL,
+    peak INTEGER NOT NULL,
+    occupied_seconds INTEGER NOT NULL,
+    PRIMARY KEY (parking_id, hour),
+    FOREIGN KEY(parking_id) REFERENCES parking (id)
+);
+
+CREATE TABLE rollup_watermark (
+    name VARCHAR(50) NOT NULL,
+    time_out DATETIME NOT NULL,
+    PRIMARY KEY (name)
+);
+
+CREATE TABLE parking_stats (
+    parking_id INTEGER NOT NULL,
+    parkings INTEGER NOT NULL,
+    places INTEGER NOT NULL,
+    active_sessions INTEGER NOT NULL,
+    PRIMARY KEY (parking_id)
+);
+
+CREATE TABLE idempotency_key (
+    scope VARCHAR(100) NOT NULL,
+    "key" VARCHAR(255) NOT NULL,
+    fingerprint VARCHAR(64) NOT NULL,
+    status INTEGER NOT NULL,
+    body TEXT NOT NULL,
+    created_at DATETIME NOT NULL,
+    PRIMARY KEY (scope, "key")
+);
+
+CREATE TABLE shared_version (
+    name VARCHAR(50) NOT NULL,
+    version INTEGER NOT NULL,
+    PRIMARY KEY (name)
+);
+
+CREATE INDEX ix_client_car_number ON client (car_number);
+
+CREATE UNIQUE INDEX ix_client_plate ON client (plate);
+
+CREATE UNIQUE INDEX ix_client_parking_active ON client_parking (client_id)
+    WHERE time_out IS NULL;
+
+CREATE INDEX ix_client_parking_client_parking_time_out
+    ON client_parking (client_id, parking_id, time_out);
+
+CREATE INDEX ix_client_parking_time_out ON client_parking (time_out);
+
+CREATE INDEX ix_client_parking_history_client_time_in
+    ON client_parking_history (client_id, time_in);
+
+CREATE INDEX ix_client_parking_history_time_out
+    ON client_parking_history (time_out);
+
+CREATE INDEX ix_tariff_period_parking_id ON tariff_period (parking_id);
+
+CREATE INDEX ix_idempotency_key_created_at ON idempotency_key (created_at);
+
+CREATE VIRTUAL TABLE client_search USING fts5(
+    name, surname, plate,
+    content='client', content_rowid='id',
+    tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+);
+
+CREATE TRIGGER client_search_ai AFTER INSERT ON client BEGIN
+    INSERT INTO client_search (rowid, name, surname, plate)
+    VALUES (new.id, new.name, new.surname, new.plate);
+END;
+
+CREATE TRIGGER client_search_ad AFTER DELETE ON client BEGIN
+    INSERT INTO client_search (client_search, rowid, name, surname, plate)
+    VALUES ('delete', old.id, old.name, old.surname, old.plate);
+END;
+
+CREATE TRIGGER client_search_au AFTER UPDATE OF name, surname, plate ON client BEGIN
+    INSERT INTO client_search (client_search, rowid, name, surname, plate)
+    VALUES ('delete', old.id, old.name, old.surname, old.plate);
+    INSERT INTO client_search (rowid, name, surname, plate)
+    VALUES (new.id, new.name, new.surname, new.plate);
+END;
+
+CREATE TRIGGER parking_stats_parking_ai AFTER INSERT ON parking BEGIN
+    INSERT INTO parking_stats (parking_id, parkings, places, active_sessions)
+    VALUES (new.id, 1, new.count_places, 0);
+    UPDATE parking_stats SET parkings = parkings + 1, places = places + new.count_places
+    WHERE parking_id = 0;
+END;
+
+CREATE TRIGGER parking_stats_parking_au AFTER UPDATE OF count_places ON parking BEGIN
+    UPDATE parking_stats SET places = places + new.count_places - old.count_places
+    WHERE parking_id IN (0, new.id);
+END;
+
+CREATE TRIGGER parking_stats_parking_ad AFTER DELETE ON parking BEGIN
+    UPDATE parking_stats SET
+        parkings = parkings - 1,
+        places = places - old.count_places,
+        active_sessions = active_sessions - coalesce(
+            (SELECT active_sessions FROM parking_stats WHERE parking_id = old.id), 0
+        )
+    WHERE parking_id = 0;
+    DELETE FROM parking_stats WHERE parking_id = old.id;
+END;
+
+CREATE TRIGGER parking_stats_session_ai AFTER INSERT ON client_parking
+WHEN new.time_out IS NULL BEGIN
+    UPDATE parking_stats SET active_sessions = active_sessions + 1
+    WHERE parking_id IN (0, new.parking_id);
+END;
+
+CREATE TRIGGER parking_stats_session_au AFTER UPDATE OF time_out, parking_id
+ON client_parking BEGIN
+    UPDATE parking_stats SET active_sessions = active_sessions - 1
+    WHERE old.time_out IS NULL AND parking_id IN (0, old.parking_id);
+    UPDATE parking_stats SET active_sessions = active_sessions + 1
+    WHERE new.time_out IS NULL AND parking_id IN (0, new.parking_id);
+END;
+
+CREATE TRIGGER parking_stats_session_ad AFTER DELETE ON client_parking
+WHEN old.time_out IS NULL BEGIN
+    UPDATE parking_stats SET active_sessions = active_sessions - 1
+    WHERE parking_id IN (0, old.parking_id);
+END;
+
+-- Row 0 holds the totals over all parkings.
+INSERT INTO parking_stats (parking_id, parkings, places, active_sessions)
+VALUES (0, 0, 0, 0);
+
+-- Matches the last migration, so upgrade() has nothing left to apply.
+PRAGMA user_version = 6;
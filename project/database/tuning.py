@@ -0,0 +1,29 @@
+from typing import Any, Dict, Optional
+
+from sqlalchemy import Engine, event
+from sqlalchemy.engine import make_url
+
+
+def engine_options(
+    database_uri: str, pool_size: int, max_overflow: int
+) -> Dict[str, Any]:
+    url = make_url(database_uri)
+    if url.get_backend_name() != "sqlite" or url.database in (None, "", ":memory:"):
+        return {}
+    # One pooled connection per request thread of this worker; connections keep
+    # their page cache and mmap between requests instead of reopening the file.
+    return {"pool_size": pool_size, "max_overflow": max_overflow}
+
+
+def apply_pragmas(engine: Engine, pragmas: Optional[Dict[str, Any]]) -> None:
+    if engine.dialect.name != "sqlite" or not pragmas:
+        return
+
+    @event.listens_for(engine, "connect")
+    def set_pragmas(dbapi_connection: Any, connection_record: Any) -> None:
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name}={value}")
+        finally:
+            cursor.close()
@@ -1,13 +1,16 @@
 from datetime import datetime, timedelta, timezone
-from typing import Any, Generator, Iterator
+from pathlib import Path
+from typing import Any, Callable, Generator, Iterator, List
 
 import pytest
 from flask import Flask
 from flask.testing import FlaskClient
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import create_engine, event, text
 
 from project.app import create_app
 from project.app.models import Client, ClientParking, Parking
+from project.app.occupancy import occupancy
 from project.config import Config
 from project.database import db as _db
 
@@ -18,6 +21,9 @@ def app() -> Generator[Flask, Any, None]:
         TESTING = True
         WTF_CSRF_ENABLED = False
         SQLALCHEMY_DATABASE_URI = "sqlite:///:memory:"
+        SHARED_VERSIONS_POLL_SECONDS = None
+        # Expected prices below are worked out on the UTC clock.
+        TARIFF_TIMEZONE = "UTC"
 
     test_config = TestConfig()
     app = create_app(test_config)
@@ -55,6 +61,7 @@ def app() -> Generator[Flask, Any, None]:
         _db.session.add(log_active)
 
         _db.session.commit()
+        occupancy.rebuild()
 
     yield app
 
@@ -73,3 +80,41 @@ def db(app: Flask) -> Iterator[SQLAlchemy]:
         _db.session.begin_nested()
         yield _db
         _db.session.rollback()
+
+
+@pytest.fixture(scope="function")
+def statements(app: Flask) -> Iterator[List[str]]:
+    executed: List[str] = []
+
+    def before_cursor_execute(*args: Any) -> None:
+        executed.append(args[2])
+
+    with app.app_context():
+        engine = _db.engine
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    yield executed
+    event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+
+@pytest.fixture()
+def polling_app(tmp_path: Path) -> Flask:
+    class PollingConfig(Config):
+        TESTING = True
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{tmp_path / 'parking.db'}"
+        SHARED_VERSIONS_POLL_SECONDS = 0
+
+    return create_app(PollingConfig())
+
+
+@pytest.fixture()
+def other_process(polling_app: Flask) -> Iterator[Callable[..., None]]:
+    # A second engine on the same file stands in for another server process.
+    engine = create_engine(polling_app.config["SQLALCHEMY_DATABASE_URI"])
+
+    def execute(*statements: str) -> None:
+        with engine.begin() as connection:
+            for statement in statements:
+                connection.execute(text(statement))
+
+    yield execute
+    engine.dispose()
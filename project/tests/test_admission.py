@@ -0,0 +1,78 @@
+import threading
+import time
+from typing import Iterator, List, Optional
+
+import pytest
+from flask.testing import FlaskClient
+
+from project.app.admission import (
+    AdmissionController,
+    GateLimiter,
+    admission,
+    gate_limiter,
+)
+from project.config import Config
+
+
+@pytest.fixture()
+def restore_limits() -> Iterator[None]:
+    yield
+    admission.configure(
+        Config.ADMISSION_MAX_CONCURRENT,
+        Config.ADMISSION_QUEUE_SIZE,
+        Config.ADMISSION_MAX_WAIT_SECONDS,
+    )
+    gate_limiter.configure(Config.GATE_RATE_PER_SECOND, Config.GATE_BURST)
+
+
+def test_queue_bounds_and_wait_timeout() -> None:
+    controller = AdmissionController(limit=1, queue_size=0, max_wait=0.01)
+    assert controller.acquire() is None
+    assert controller.acquire() == "queue_full"
+
+    controller.configure(limit=1, queue_size=1, max_wait=0.01)
+    assert controller.acquire() == "timeout"
+
+    admitted: List[Optional[str]] = []
+    controller.configure(limit=1, queue_size=1, max_wait=5.0)
+    waiter = threading.Thread(target=lambda: admitted.append(controller.acquire()))
+    waiter.start()
+    while controller.stats()["waiting"] == 0:
+        time.sleep(0.001)
+    controller.release()
+    waiter.join()
+
+    assert admitted == [None]
+    assert controller.stats()["rejected"] == {"queue_full": 1, "timeout": 1}
+
+
+def test_token_bucket_per_gate() -> None:
+    limiter = GateLimiter(rate=1.0, burst=2)
+
+    assert [limiter.take("north") for _ in range(2)] == [0.0, 0.0]
+    assert 0 < limiter.take("north") <= 1.0
+    assert limiter.take("south") == 0.0
+
+
+@pytest.mark.usefixtures("restore_limits")
+def test_overloaded_writes_are_shed(client: FlaskClient) -> None:
+    admission.configure(limit=0, queue_size=0, max_wait=2.5)
+
+    response = client.delete("/api/client_parkings/exit", json={})
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "3"
+    assert client.get("/client_parkings/enter").status_code == 200
+
+    admission.configure(limit=1, queue_size=0, max_wait=1.0)
+    gate_limiter.configure(rate=0.5, burst=1)
+    headers = {"X-Gate-Id": "gate-7"}
+    response = client.delete("/api/client_parkings/exit", json={}, headers=headers)
+    assert response.status_code == 400
+    response = client.delete("/api/client_parkings/exit", json={}, headers=headers)
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "2"
+
+    body = client.get("/metrics").get_data(as_text=True)
+    assert 'admission_rejected_total{reason="queue_full"}' in body
+    assert 'admission_rejected_total{reason="rate_limited"}' in body
+    assert "admission_queue_depth 0" in body
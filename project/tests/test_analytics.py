@@ -0,0 +1,99 @@
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pytest
+from flask import Flask
+from flask.testing import FlaskClient
+from flask_sqlalchemy import SQLAlchemy
+
+from project.app.analytics import occupancy_curve, occupancy_series, refresh_rollups
+from project.app.cli import occupancy_rollup_command
+from project.app.models import ClientParking
+from project.config import Config
+from project.tests.factories import ClientFactory, ParkingFactory
+
+HOUR = 3600
+
+
+def test_sweep_line_matches_minute_by_minute_count() -> None:
+    rng = np.random.default_rng(7)
+    time_in = rng.integers(0, 6 * HOUR, 200) // 60 * 60
+    time_out = time_in + rng.integers(0, 3 * HOUR, 200) // 60 * 60
+    start, buckets = HOUR, 4
+
+    peaks, occupied = occupancy_curve(time_in, time_out, start, buckets)
+
+    minutes = np.arange(start, start + buckets * HOUR, 60)
+    parked = ((time_in[:, None] <= minutes) & (time_out[:, None] > minutes)).sum(0)
+    assert peaks.tolist() == parked.reshape(buckets, 60).max(1).tolist()
+    assert occupied.tolist() == (parked.reshape(buckets, 60).sum(1) * 60).tolist()
+
+
+def test_back_to_back_sessions_do_not_overlap() -> None:
+    peaks, occupied = occupancy_curve([0, HOUR / 2], [HOUR / 2, HOUR], 0, 1)
+
+    assert peaks.tolist() == [1]
+    assert occupied.tolist() == [HOUR]
+
+
+def test_rollups_extend_incrementally(
+    db: SQLAlchemy, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(Config, "ROLLUP_SETTLE_SECONDS", 0)
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    parking = ParkingFactory.create()
+    first, second = ClientFactory.create(), ClientFactory.create()
+    db.session.flush()
+    db.session.add(
+        ClientParking(
+            client_id=first.id,
+            parking_id=parking.id,
+            time_in=now - timedelta(hours=2),
+            time_out=now - timedelta(minutes=1),
+        )
+    )
+    db.session.commit()
+    refresh_rollups()
+    assert max(r["peak"] for r in occupancy_series("hour", parking.id)) == 1
+
+    db.session.add(
+        ClientParking(
+            client_id=second.id,
+            parking_id=parking.id,
+            time_in=now - timedelta(minutes=30),
+            time_out=datetime.now(timezone.utc).replace(tzinfo=None),
+        )
+    )
+    db.session.commit()
+    report = refresh_rollups()
+
+    assert (report.sessions, report.parkings) == (1, 1)
+    hourly = occupancy_series("hour", parking.id)
+    assert max(row["peak"] for row in hourly) == 2
+    assert max(row["peak"] for row in occupancy_series("day", parking.id)) == 2
+    assert refresh_rollups().sessions == 0
+
+    refresh_rollups(full=True)
+    assert occupancy_series("hour", parking.id) == hourly
+
+
+def test_occupancy_api_and_command(
+    app: Flask, db: SQLAlchemy, client: FlaskClient, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(Config, "ROLLUP_SETTLE_SECONDS", 0)
+    result = app.test_cli_runner().invoke(occupancy_rollup_command, ["--full"])
+    assert result.exit_code == 0
+    assert "Rolled up" in result.output
+
+    response = client.get("/api/analytics/occupancy?granularity=day&parking_id=1")
+    assert response.status_code == 200
+    rows = response.get_json()["rows"]
+    assert rows and all(row["parking_id"] == 1 for row in rows)
+
+    response = client.get("/api/analytics/occupancy?granularity=week")
+    assert response.status_code == 400
+    assert "должен быть одним из" in response.get_json()["error"]
+    for query in ("parking_id=first", "from=yesterday", "to=2024-02-30"):
+        response = client.get(f"/api/analytics/occupancy?{query}")
+        assert response.status_code == 400
+        assert query.split("=")[0] in response.get_json()["error"]
@@ -0,0 +1,199 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+from typing import Any, Iterator
+
+import pytest
+from flask import Flask
+
+from project.api import create_api
+from project.app import create_app
+from project.app.versions import SESSIONS, data_versions
+from project.config import Config
+from project.database import db
+from project.tests.factories import ClientFactory, ParkingFactory
+
+pytest.importorskip("aiosqlite")
+testclient = pytest.importorskip("fastapi.testclient")
+
+GATE_PROCESS = """
+import sys
+
+from fastapi.testclient import TestClient
+
+from project.api import create_api
+from project.config import Config
+
+
+class FileConfig(Config):
+    SQLALCHEMY_DATABASE_URI = sys.argv[1]
+
+
+with TestClient(create_api(FileConfig())) as client:
+    response = client.post(
+        "/api/client_parkings/enter", json={"client_id": 1, "parking_id": 1}
+    )
+    assert response.status_code == 201, response.text
+"""
+
+
+@pytest.fixture()
+def api_client(tmp_path: Path) -> Iterator[Any]:
+    class FileConfig(Config):
+        TESTING = True
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{tmp_path / 'parking.db'}"
+
+    app = create_app(FileConfig())
+    with app.app_context():
+        ClientFactory.create(car_number="A100AA77", credit_card=None)
+        ClientFactory.create(car_number="A200AA77", credit_card="4000")
+        ParkingFactory.create(count_places=1)
+        ParkingFactory.create(count_places=5)
+        db.session.commit()
+
+    with testclient.TestClient(create_api(FileConfig())) as client:
+        yield client
+
+
+def test_enter_active_occupancy_and_exit(api_client: Any) -> None:
+    response = api_client.post(
+        "/api/client_parkings/enter", json={"client_id": 2, "parking_id": 1}
+    )
+    assert response.status_code == 201
+
+    response = api_client.post(
+        "/api/client_parkings/enter", json={"client_id": 1, "parking_id": 1}
+    )
+    assert response.status_code == 409
+    assert response.json()["error"] == "Нет свободных мест"
+
+    active = api_client.get("/api/client_parkings/active").json()
+    assert [s["car_number"] for s in active["active_sessions"]] == ["A200AA77"]
+
+    snapshot = api_client.get("/api/occupancy").json()
+    assert snapshot["active_sessions_count"] == 1
+    assert snapshot["parkings"][0]["count_available_places"] == 0
+
+    response = api_client.request(
+        "DELETE", "/api/client_parkings/exit", json={"client_id": 2, "parking_id": 1}
+    )
+    assert "Снята плата - 0 руб." in response.json()["success"]
+    assert api_client.get("/api/occupancy").json()["active_sessions_count"] == 0
+
+
+def test_enter_of_unknown_client_is_not_found(api_client: Any) -> None:
+    response = api_client.post(
+        "/api/client_parkings/enter", json={"client_id": 42, "parking_id": 1}
+    )
+    assert response.status_code == 404
+    assert response.json()["error"] == "Клиент не найден"
+
+    snapshot = api_client.get("/api/occupancy").json()
+    assert snapshot["parkings"][0]["count_available_places"] == 1
+
+
+def test_exit_requires_card(api_client: Any) -> None:
+    api_client.post(
+        "/api/client_parkings/enter", json={"client_id": 1, "parking_id": 1}
+    )
+
+    response = api_client.request(
+        "DELETE", "/api/client_parkings/exit", json={"client_id": 1, "parking_id": 1}
+    )
+    assert response.json()["require_credit_card"] is True
+
+    response = api_client.request(
+        "DELETE",
+        "/api/client_parkings/exit",
+        json={"client_id": 1, "parking_id": 1, "credit_card": "4111"},
+    )
+    assert "success" in response.json()
+
+    response = api_client.request(
+        "DELETE", "/api/client_parkings/exit", json={"client_id": 1, "parking_id": 1}
+    )
+    assert response.status_code == 404
+
+
+def test_enter_twice_is_rejected(api_client: Any) -> None:
+    before = data_versions.stamp(SESSIONS)[0]
+    response = api_client.post(
+        "/api/client_parkings/enter", json={"client_id": 2, "parking_id": 1}
+    )
+    assert response.status_code == 201
+    assert data_versions.stamp(SESSIONS)[0] != before
+
+    response = api_client.post(
+        "/api/client_parkings/enter", json={"client_id": 2, "parking_id": 2}
+    )
+    assert response.status_code == 409
+    assert response.json()["error"] == "Этот клиент уже находится на парковке"
+
+    snapshot = api_client.get("/api/occupancy").json()
+    assert snapshot["active_sessions_count"] == 1
+    assert [p["count_available_places"] for p in snapshot["parkings"]] == [0, 5]
+
+
+def test_idempotency_key_replays_enter_and_exit(api_client: Any) -> None:
+    enter = {"client_id": 2, "parking_id": 2}
+    headers = {"Idempotency-Key": "api-enter-1"}
+    first = api_client.post("/api/client_parkings/enter", json=enter, headers=headers)
+    retry = api_client.post("/api/client_parkings/enter", json=enter, headers=headers)
+    assert first.status_code == retry.status_code == 201
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    assert retry.json() == first.json()
+    assert api_client.get("/api/occupancy").json()["active_sessions_count"] == 1
+
+    other = api_client.post(
+        "/api/client_parkings/enter",
+        json={"client_id": 1, "parking_id": 2},
+        headers=headers,
+    )
+    assert other.status_code == 422
+
+    headers = {"Idempotency-Key": "api-exit-1"}
+    first = api_client.request(
+        "DELETE", "/api/client_parkings/exit", json=enter, headers=headers
+    )
+    retry = api_client.request(
+        "DELETE", "/api/client_parkings/exit", json=enter, headers=headers
+    )
+    assert "success" in first.json()
+    assert retry.json() == first.json()
+    assert api_client.get("/api/occupancy").json()["active_sessions_count"] == 0
+
+    bad = api_client.post(
+        "/api/client_parkings/enter", json=enter, headers={"Idempotency-Key": ""}
+    )
+    assert bad.status_code == 400
+
+
+def test_gate_in_another_process_reaches_flask(polling_app: Flask) -> None:
+    with polling_app.app_context():
+        ParkingFactory.create(opened=True, count_places=1, count_available_places=1)
+        ClientFactory.create()
+        db.session.commit()
+    server = polling_app.test_client()
+    tag = server.get("/client_parkings/active").headers["ETag"]
+    assert server.get("/api/occupancy").get_json()["active_sessions_count"] == 0
+
+    root = Path(__file__).resolve().parents[2]
+    subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            GATE_PROCESS,
+            polling_app.config["SQLALCHEMY_DATABASE_URI"],
+        ],
+        check=True,
+        cwd=root,
+        env={**os.environ, "PYTHONPATH": str(root)},
+        timeout=60,
+    )
+
+    snapshot = server.get("/api/occupancy").get_json()
+    assert snapshot["active_sessions_count"] == 1
+    assert snapshot["parkings"][0]["count_available_places"] == 0
+    response = server.get("/client_parkings/active", headers={"If-None-Match": tag})
+    assert response.status_code == 200
@@ -0,0 +1,63 @@
+from datetime import datetime, timedelta
+
+from flask import Flask
+from flask.testing import FlaskClient
+from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import func
+
+from project.app.archive import all_sessions, archive_closed_sessions
+from project.app.cli import archive_sessions_command
+from project.app.models import ClientParking, ClientParkingHistory
+from project.tests.factories import ClientFactory
+
+
+def _closed_sessions(db: SQLAlchemy, count: int) -> int:
+    history_client = ClientFactory.create()
+    db.session.flush()
+    started = datetime(2024, 1, 1, 8, 0)
+    db.session.add_all(
+        ClientParking(
+            client_id=history_client.id,
+            parking_id=1,
+            time_in=started + timedelta(days=day),
+            time_out=started + timedelta(days=day, hours=2),
+        )
+        for day in range(count)
+    )
+    db.session.commit()
+    return int(history_client.id)
+
+
+def test_archive_moves_closed_sessions_in_batches(
+    client: FlaskClient, db: SQLAlchemy
+) -> None:
+    client_id = _closed_sessions(db, 5)
+    active_before = ClientParking.query.filter_by(time_out=None).count()
+    total_before = db.session.query(all_sessions()).count()
+    newest_id = db.session.query(func.max(ClientParking.id)).scalar()
+
+    moved = archive_closed_sessions(batch_size=2, max_batches=2)
+
+    assert moved == 4
+    assert ClientParkingHistory.query.count() == 4
+    assert db.session.query(all_sessions()).count() == total_before
+
+    archive_closed_sessions(batch_size=100)
+    old = ClientParking.query.filter(ClientParking.time_out < datetime(2025, 1, 1))
+    assert [session.id for session in old] == [newest_id]
+    assert ClientParking.query.filter_by(time_out=None).count() == active_before
+
+    html = client.get(f"/clients/{client_id}").get_data(as_text=True)
+    assert html.count("01.01.2024 08:00") == 1
+    assert html.count(".2024 10:00") == 5
+
+
+def test_archive_cli(app: Flask, db: SQLAlchemy) -> None:
+    _closed_sessions(db, 2)
+
+    result = app.test_cli_runner().invoke(
+        archive_sessions_command, ["--older-than-hours", "1"]
+    )
+
+    assert result.exit_code == 0
+    assert "Archived" in result.output
@@ -0,0 +1,150 @@
+from typing import List
+
+from flask.testing import FlaskClient
+from flask_sqlalchemy import SQLAlchemy
+
+from project.app.models import Client, ClientParking, Parking
+from project.tests.factories import ClientFactory, ParkingFactory
+
+
+def _seed(db: SQLAlchemy) -> tuple[list[int], int, int]:
+    clients = [
+        ClientFactory.create(credit_card="4000000000000000"),
+        ClientFactory.create(credit_card="4000000000000001"),
+        ClientFactory.create(credit_card=None, car_number="B002BB77"),
+        ClientFactory.create(credit_card="4000000000000003"),
+    ]
+    opened = ParkingFactory.create(count_places=2)
+    closed = ParkingFactory.create(opened=False, count_places=2)
+    db.session.commit()
+    return [c.id for c in clients], opened.id, closed.id
+
+
+def test_enter_and_exit_batches(
+    client: FlaskClient, db: SQLAlchemy, statements: List[str]
+) -> None:
+    client_ids, parking_id, closed_id = _seed(db)
+    c0, c1, c2, c3 = client_ids
+
+    statements.clear()
+    response = client.post(
+        "/api/client_parkings/enter/batch",
+        json={
+            "events": [
+                {"client_id": c0, "parking_id": parking_id},
+                {"client_id": c0, "parking_id": parking_id},
+                {"client_id": c1, "parking_id": closed_id},
+                {"client_id": c1, "parking_id": 999},
+                {"client_id": c1, "parking_id": parking_id},
+                {"client_id": c2, "parking_id": parking_id},
+            ]
+        },
+    )
+
+    assert response.status_code == 200
+    results = response.get_json()["results"]
+    assert [r["status"] for r in results] == [
+        "ok",
+        "error",
+        "error",
+        "error",
+        "ok",
+        "error",
+    ]
+    assert results[1]["error"] == "Этот клиент уже находится на парковке"
+    assert results[2]["error"] == "Парковка закрыта"
+    assert results[3]["error"] == "Парковка не найдена"
+    assert results[5]["error"] == "Нет свободных мест"
+    assert [s.split()[0] for s in statements] == [
+        "SELECT",
+        "SELECT",
+        "UPDATE",
+        "INSERT",
+        "INSERT",
+    ]
+    assert Parking.query.get(parking_id).count_available_places == 0
+
+    response = client.post(
+        "/api/client_parkings/enter/batch",
+        json={"events": [{"client_id": c2, "parking_id": closed_id}]},
+    )
+    assert response.get_json()["results"][0]["error"] == "Парковка закрыта"
+
+    closed_parking = Parking.query.get(closed_id)
+    closed_parking.opened = True
+    db.session.commit()
+    client.post(
+        "/api/client_parkings/enter/batch",
+        json={"events": [{"client_id": c2, "parking_id": closed_id}]},
+    )
+
+    statements.clear()
+    response = client.post(
+        "/api/client_parkings/exit/batch",
+        json={
+            "events": [
+                {"client_id": c0, "parking_id": parking_id},
+                {"client_id": c2, "parking_id": closed_id},
+                {"client_id": c3, "parking_id": parking_id},
+                {"client_id": c1, "parking_id": parking_id},
+            ]
+        },
+    )
+
+    results = response.get_json()["results"]
+    assert [r["status"] for r in results] == [
+        "ok",
+        "require_credit_card",
+        "error",
+        "ok",
+    ]
+    assert results[0]["amount"] == 0
+    assert results[1]["car_number"] == "B002BB77"
+    assert [s.split()[0] for s in statements] == [
+        "SELECT",
+        "UPDATE",
+        "UPDATE",
+        "INSERT",
+    ]
+    assert Parking.query.get(parking_id).count_available_places == 2
+    assert ClientParking.query.filter_by(client_id=c2, time_out=None).count() == 1
+
+    response = client.post(
+        "/api/client_parkings/exit/batch",
+        json={
+            "events": [
+                {"client_id": c2, "parking_id": closed_id, "credit_card": "4111"}
+            ]
+        },
+    )
+    assert response.get_json()["results"][0]["status"] == "ok"
+    assert Client.query.get(c2).credit_card == "4111"
+    assert Parking.query.get(closed_id).count_available_places == 2
+
+
+def test_unknown_client_takes_no_place(client: FlaskClient, db: SQLAlchemy) -> None:
+    driver = ClientFactory.create()
+    parking = ParkingFactory.create(count_places=2)
+    db.session.commit()
+
+    response = client.post(
+        "/api/client_parkings/enter/batch",
+        json={
+            "events": [
+                {"client_id": 999, "parking_id": parking.id},
+                {"client_id": driver.id, "parking_id": parking.id},
+            ]
+        },
+    )
+
+    results = response.get_json()["results"]
+    assert [r["status"] for r in results] == ["error", "ok"]
+    assert results[0]["error"] == "Клиент не найден"
+    assert Parking.query.get(parking.id).count_available_places == 1
+    assert ClientParking.query.filter_by(client_id=999).count() == 0
+
+
+def test_batch_rejects_malformed_payload(client: FlaskClient) -> None:
+    for payload in [{}, {"events": []}, {"events": [{"client_id": "x"}]}]:
+        response = client.post("/api/client_parkings/enter/batch", json=payload)
+        assert response.status_code == 400
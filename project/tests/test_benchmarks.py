@@ -0,0 +1,69 @@
+import json
+from pathlib import Path
+
+from project.app.routes import validate_car_number
+from project.benchmarks import sqlite_profile
+from project.benchmarks.__main__ import main
+from project.benchmarks.datasets import plate_for
+
+
+def test_plates_are_unique_and_valid() -> None:
+    plates = [plate_for(index) for index in range(0, 5_000_000, 997)]
+    assert len(set(plates)) == len(plates)
+    assert all(validate_car_number(plate) for plate in plates)
+
+
+def test_benchmark_smoke_run(tmp_path: Path) -> None:
+    output = tmp_path / "results.json"
+    main(
+        [
+            "--database",
+            str(tmp_path / "bench.db"),
+            "--clients",
+            "300",
+            "--parkings",
+            "5",
+            "--sessions",
+            "2000",
+            "--iterations",
+            "3",
+            "--output",
+            str(output),
+        ]
+    )
+
+    report = json.loads(output.read_text())
+    assert report["meta"]["dataset"]["closed_sessions"] == 2000
+    results = report["results"]
+    assert results["POST /client_parkings/enter"]["requests"] == 3
+    assert all(result["errors"] == 0 for result in results.values())
+    assert results["GET /clients"]["p99_ms"] >= results["GET /clients"]["p50_ms"]
+
+
+def test_sqlite_profile_smoke_run(tmp_path: Path) -> None:
+    output = tmp_path / "profile.json"
+    sqlite_profile.main(
+        [
+            "--directory",
+            str(tmp_path),
+            "--clients",
+            "200",
+            "--parkings",
+            "3",
+            "--sessions",
+            "500",
+            "--threads",
+            "4",
+            "--operations",
+            "10",
+            "--output",
+            str(output),
+        ]
+    )
+
+    profiles = json.loads(output.read_text())["profiles"]
+    assert profiles["tuned"]["journal_mode"] == "wal"
+    assert profiles["default"]["journal_mode"] == "delete"
+    for result in profiles.values():
+        assert result["reads"]["requests"] + result["writes"]["requests"] == 40
+        assert result["writes"]["errors"] == 0
@@ -0,0 +1,193 @@
+import random
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+import pytest
+from flask import Flask
+from flask.testing import FlaskClient
+from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import create_engine, text
+
+from project.app import create_app
+from project.app.billing import (
+    Tariff,
+    TariffBook,
+    billable_span,
+    price_session,
+    save_tariff,
+    tariffs,
+)
+from project.app.cli import revenue_report_command
+from project.app.models import ClientParking
+from project.config import Config
+from project.database import db as _db
+from project.tests.factories import ClientFactory, ParkingFactory
+
+NIGHT_AND_DAY = [(480, 1200, 15), (1320, 360, 2)]
+
+
+def _reference_price(
+    tariff_periods: list[tuple[int, int, int]],
+    rate: int,
+    cap: int | None,
+    time_in: datetime,
+    time_out: datetime,
+) -> int:
+    rates = [rate] * 1440
+    for start, end, period_rate in tariff_periods:
+        minutes = (
+            range(start, end) if start <= end else [*range(start, 1440), *range(end)]
+        )
+        for minute in minutes:
+            rates[minute] = period_rate
+
+    per_day: dict[int, int] = {}
+    moment = time_in.replace(second=0, microsecond=0)
+    for _ in range(int((time_out - time_in).total_seconds() // 60)):
+        day = (moment - datetime(1970, 1, 1)).days
+        per_day[day] = per_day.get(day, 0) + rates[moment.hour * 60 + moment.minute]
+        moment += timedelta(minutes=1)
+    return sum(min(v, cap) if cap is not None else v for v in per_day.values())
+
+
+def _seconds(moment: datetime) -> float:
+    return (moment - datetime(1970, 1, 1)).total_seconds()
+
+
+@pytest.mark.parametrize("cap", [None, 3000])
+def test_vectorized_price_matches_minute_by_minute(cap: int | None) -> None:
+    rng = random.Random(7)
+    tariff = Tariff.from_periods(10, NIGHT_AND_DAY, cap)
+    sessions = []
+    for _ in range(60):
+        time_in = datetime(2024, 3, 1) + timedelta(seconds=rng.randint(0, 10**7))
+        sessions.append(
+            (time_in, time_in + timedelta(seconds=rng.randint(0, 4 * 86400)))
+        )
+
+    start, end = billable_span(
+        [_seconds(t) for t, _ in sessions], [_seconds(t) for _, t in sessions]
+    )
+    prices = tariff.price(start, end)
+
+    expected = [_reference_price(NIGHT_AND_DAY, 10, cap, *s) for s in sessions]
+    assert prices.tolist() == expected
+
+
+def test_flat_tariff_matches_minutes_times_rate() -> None:
+    time_in = datetime(2024, 1, 1, 23, 59, 40)
+    time_out = time_in + timedelta(minutes=90, seconds=59)
+    start, end = billable_span([_seconds(time_in)], [_seconds(time_out)])
+
+    assert Tariff.flat(10).price(start, end).tolist() == [900]
+    assert Tariff.flat(10, daily_cap=100).price(start, end).tolist() == [110]
+    assert np.array_equal(end - start, [90])
+
+
+def test_tariff_clock_follows_the_tariff_zone() -> None:
+    book = TariffBook()
+    book.configure("Europe/Moscow")
+    book.set(1, Tariff.from_periods(10, [(1320, 360, 2)]))
+    book.set(2, Tariff.flat(10, daily_cap=100))
+    # 19:00-20:00 UTC is the first night hour in Moscow.
+    night = datetime(2024, 5, 1, 19)
+    # 20:30-21:30 UTC crosses midnight in Moscow, so the cap applies twice.
+    midnight = datetime(2024, 5, 1, 20, 30)
+    start, end = billable_span(
+        [_seconds(night), _seconds(midnight)],
+        [_seconds(night + timedelta(hours=1)), _seconds(midnight + timedelta(hours=1))],
+    )
+
+    assert book.price(np.array([1, 2]), start, end).tolist() == [120, 200]
+
+    book.configure("UTC")
+    assert book.price(np.array([1, 2]), start, end).tolist() == [600, 100]
+
+
+def _history(db: SQLAlchemy) -> tuple[int, int]:
+    parking = ParkingFactory.create()
+    billed = ClientFactory.create()
+    db.session.flush()
+    for day, hours in [(1, 1), (1, 2), (2, 3)]:
+        time_in = datetime(2024, 5, day, 9)
+        db.session.add(
+            ClientParking(
+                client_id=billed.id,
+                parking_id=parking.id,
+                time_in=time_in,
+                time_out=time_in + timedelta(hours=hours),
+            )
+        )
+    db.session.commit()
+    return parking.id, billed.id
+
+
+def test_revenue_report_groups_sessions(
+    app: Flask, client: FlaskClient, db: SQLAlchemy
+) -> None:
+    parking_id, client_id = _history(db)
+    save_tariff(parking_id, 5, [(480, 1200, 20)], daily_cap=3000)
+
+    response = client.get(
+        "/api/reports/revenue?group_by=day&from=2024-05-01&to=2024-05-03"
+    )
+    assert response.get_json()["rows"] == [
+        {"day": "2024-05-01", "sessions": 2, "minutes": 180, "amount": 3600},
+        {"day": "2024-05-02", "sessions": 1, "minutes": 180, "amount": 3000},
+    ]
+
+    rows = client.get("/api/reports/revenue?group_by=client&to=2024-06-01")
+    assert {"client": client_id, "sessions": 3, "minutes": 360, "amount": 6600} in (
+        rows.get_json()["rows"]
+    )
+    morning = price_session(
+        parking_id, datetime(2024, 5, 1, 7), datetime(2024, 5, 1, 9)
+    )
+    assert morning == 1500
+
+    result = app.test_cli_runner().invoke(
+        revenue_report_command, ["--group-by", "parking", "--to", "2024-06-01"]
+    )
+    assert f"{parking_id},3,360,6600" in result.output
+
+
+def test_revenue_report_rejects_unknown_grouping(client: FlaskClient) -> None:
+    response = client.get("/api/reports/revenue?group_by=week")
+    assert response.status_code == 400
+
+    response = client.get("/api/reports/revenue?from=2024-13-01")
+    assert response.status_code == 400
+    assert "from" in response.get_json()["error"]
+
+
+def test_tariff_saved_by_another_process_is_reloaded(tmp_path: Path) -> None:
+    class PollingConfig(Config):
+        TESTING = True
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{tmp_path / 'parking.db'}"
+        SHARED_VERSIONS_POLL_SECONDS = 0
+
+    app = create_app(PollingConfig())
+    with app.app_context():
+        parking = ParkingFactory.create()
+        _db.session.commit()
+        parking_id = parking.id
+    assert tariffs.get(parking_id).flat_rate == Config.PARKING_RATE_PER_MINUTE
+
+    # Stands in for set-tariff run from a separate CLI process.
+    other = create_engine(PollingConfig.SQLALCHEMY_DATABASE_URI)
+    with other.begin() as connection:
+        connection.execute(
+            text(
+                "INSERT INTO parking_tariff (parking_id, rate_per_minute)"
+                " VALUES (:p, 3)"
+            ),
+            {"p": parking_id},
+        )
+        connection.execute(
+            text("INSERT INTO shared_version (name, version) VALUES ('tariff', 1)")
+        )
+    other.dispose()
+
+    app.test_client().get("/api/occupancy")
+    assert tariffs.get(parking_id).flat_rate == 3
@@ -0,0 +1,132 @@
+import json
+import queue
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Tuple
+
+import pytest
+from flask.testing import FlaskClient
+from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import text
+
+from project.app import create_app, routes
+from project.app.events import Event, EventBus, event_bus, occupancy_state
+from project.app.occupancy import occupancy
+from project.config import Config
+from project.database import db as _db
+from project.tests.factories import ClientFactory, ParkingFactory
+
+
+def _read_event(chunks: Iterator[Any]) -> Tuple[str, Dict[str, Any]]:
+    lines = next(chunks).decode().splitlines()
+    kind = lines[0].removeprefix("event: ")
+    return kind, json.loads(lines[1].removeprefix("data: "))
+
+
+def test_bus_fans_out_and_drops_oldest() -> None:
+    bus = EventBus(queue_size=2)
+    first, second = bus.subscribe(), bus.subscribe()
+
+    for n in range(3):
+        bus.publish("enter", {"n": n})
+
+    for subscription in (first, second):
+        received: List[int] = [subscription.get_nowait().data["n"] for _ in range(2)]
+        assert received == [1, 2]
+    bus.unsubscribe(first)
+    bus.unsubscribe(second)
+    assert not bus.has_subscribers()
+
+
+def test_publish_survives_a_racing_publisher() -> None:
+    bus = EventBus(queue_size=1)
+    subscription = bus.subscribe()
+    bus.publish("enter", {"n": 0})
+
+    def refilled() -> Event:
+        # Another publisher fills the slot freed by this one.
+        dropped = queue.Queue.get_nowait(subscription)
+        subscription.put_nowait(Event("enter", {"n": 1}))
+        return dropped
+
+    subscription.get_nowait = refilled  # type: ignore[method-assign]
+    bus.publish("enter", {"n": 2})
+
+    assert queue.Queue.get_nowait(subscription).data == {"n": 1}
+
+
+def test_heartbeat_is_yielded_when_idle() -> None:
+    bus = EventBus()
+    listener = bus.listen(bus.subscribe(), heartbeat=0.01)
+
+    assert next(listener) is None
+    listener.close()
+    assert not bus.has_subscribers()
+
+
+def test_stream_pushes_snapshot_and_deltas(client: FlaskClient, db: SQLAlchemy) -> None:
+    parking = ParkingFactory.create(count_places=3)
+    gate_client = ClientFactory.create(credit_card="4444")
+    db.session.commit()
+    occupancy.rebuild()
+    parking_id, client_id = parking.id, gate_client.id
+
+    response = client.get("/api/occupancy/stream")
+    assert response.mimetype == "text/event-stream"
+    assert response.headers["Cache-Control"] == "no-cache"
+    chunks = iter(response.response)
+    kind, snapshot = _read_event(chunks)
+    assert kind == "snapshot"
+    assert parking_id in {parking["id"] for parking in snapshot["parkings"]}
+    assert event_bus.has_subscribers()
+
+    client.post(
+        "/client_parkings/enter",
+        data={"client_id": client_id, "parking_id": parking_id},
+    )
+    kind, entered = _read_event(chunks)
+    assert kind == "enter"
+    assert (entered["client_id"], entered["parking_id"]) == (client_id, parking_id)
+    assert entered["parking"]["count_available_places"] == 2
+
+    client.delete(
+        "/api/client_parkings/exit",
+        json={"client_id": client_id, "parking_id": parking_id},
+    )
+    kind, left = _read_event(chunks)
+    assert kind == "exit"
+    assert left["parking"]["count_available_places"] == 3
+    assert left["totals"] == snapshot["totals"]
+
+    response.close()
+    assert not event_bus.has_subscribers()
+
+
+def test_stream_closed_before_reading_unsubscribes(client: FlaskClient) -> None:
+    response = client.get("/api/occupancy/stream")
+    assert event_bus.has_subscribers()
+
+    response.close()
+    assert not event_bus.has_subscribers()
+
+
+def test_stream_returns_its_connection_to_the_pool(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    class FileConfig(Config):
+        TESTING = True
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{tmp_path / 'parking.db'}"
+
+    app = create_app(FileConfig())
+
+    def state_from_database() -> Dict[str, Any]:
+        _db.session.execute(text("SELECT 1"))
+        return occupancy_state()
+
+    monkeypatch.setattr(routes, "occupancy_state", state_from_database)
+    response = app.test_client().get("/api/occupancy/stream")
+    chunks = iter(response.response)
+    assert _read_event(chunks)[0] == "snapshot"
+
+    with app.app_context():
+        assert _db.engine.pool.checkedout() == 0  # type: ignore[attr-defined]
+    response.close()
@@ -0,0 +1,57 @@
+from typing import List
+
+from flask.testing import FlaskClient
+
+from project.app.fragments import FragmentCache, fragments
+
+
+def test_lru_eviction_is_bounded_by_bytes() -> None:
+    cache = FragmentCache(max_bytes=10)
+    cache.put("a", "1", "aaaa")
+    cache.put("b", "1", "bbbb")
+    assert cache.get("a", "1") == "aaaa"
+
+    cache.put("c", "1", "cccc")
+
+    assert cache.get("b", "1") is None
+    assert cache.get("a", "1") == "aaaa"
+    assert cache.stats()["evictions"] == 1
+    assert cache.stats()["bytes"] == 8
+
+
+def test_stale_version_is_a_miss_and_is_replaced() -> None:
+    cache = FragmentCache()
+    cache.put("page", "1", "old")
+
+    assert cache.get("page", "2") is None
+    cache.put("page", "2", "new")
+
+    assert cache.get("page", "2") == "new"
+    assert cache.stats()["entries"] == 1
+    assert cache.stats()["bytes"] == 3
+
+
+def test_repeated_list_view_skips_query_and_render(
+    client: FlaskClient, statements: List[str]
+) -> None:
+    fragments.clear()
+    first = client.get("/parkings").get_data(as_text=True)
+    hits = fragments.stats()["hits"]
+
+    statements.clear()
+    second = client.get("/parkings").get_data(as_text=True)
+
+    assert second == first
+    assert statements == []
+    assert fragments.stats()["hits"] == hits + 1
+
+
+def test_created_client_invalidates_fragment(client: FlaskClient) -> None:
+    client.get("/clients")
+    client.post(
+        "/clients/new",
+        data={"name": "Fragment", "surname": "Client", "car_number": "M001MM77"},
+    )
+
+    assert "M001MM77" in client.get("/clients?limit=500").get_data(as_text=True)
+    assert "M001MM77" in client.get("/clients?stream=1").get_data(as_text=True)
@@ -0,0 +1,93 @@
+from datetime import datetime, timedelta
+from typing import List
+
+from flask.testing import FlaskClient
+from flask_sqlalchemy import SQLAlchemy
+
+from project.app.archive import archive_closed_sessions
+from project.app.billing import Tariff, save_tariff, tariffs
+from project.app.history import client_totals, compute_totals
+from project.app.models import ClientParking
+from project.config import Config
+from project.tests.factories import ClientFactory, ParkingFactory
+
+START = datetime(2024, 3, 4, 10, 0)
+
+
+def _client_with_history(db: SQLAlchemy) -> tuple[int, int, int]:
+    flat, night = (ParkingFactory.create(address=name) for name in ("Flat", "Night"))
+    history_client = ClientFactory.create(credit_card="4000")
+    db.session.flush()
+    spans = [(flat, 0, 30), (flat, 60, 90), (flat, 120, 125), (night, 0, 60)]
+    db.session.add_all(
+        ClientParking(
+            client_id=history_client.id,
+            parking_id=parking.id,
+            time_in=START + timedelta(days=day, minutes=begin),
+            time_out=START + timedelta(days=day, minutes=end),
+        )
+        for day, (parking, begin, end) in enumerate(spans)
+    )
+    db.session.commit()
+    return history_client.id, flat.id, night.id
+
+
+def test_totals_use_grouped_aggregates(db: SQLAlchemy, statements: List[str]) -> None:
+    client_id, flat_id, night_id = _client_with_history(db)
+    # 10:00-11:00 costs 1 per minute before 10:30 and 3 after.
+    save_tariff(night_id, 1, [(630, 660, 3)], None)
+    archive_closed_sessions(batch_size=2, max_batches=1)
+
+    statements.clear()
+    totals = compute_totals(client_id)
+
+    assert len(statements) == 2
+    assert (totals.visits, totals.total_minutes) == (4, 125)
+    flat_rate = Config.PARKING_RATE_PER_MINUTE
+    assert tariffs.get(flat_id).flat_rate == flat_rate
+    assert totals.total_billed == flat_rate * 65 + 30 * 1 + 30 * 3
+    assert (totals.favourite_parking_id, totals.favourite_address) == (flat_id, "Flat")
+
+
+def test_flat_rate_detection() -> None:
+    assert Tariff.flat(7).flat_rate == 7
+    assert Tariff.flat(7, daily_cap=100).flat_rate is None
+    assert Tariff.from_periods(7, [(0, 60, 1)]).flat_rate is None
+
+
+def test_cached_totals_refresh_on_exit(client: FlaskClient, db: SQLAlchemy) -> None:
+    client_id, flat_id, _ = _client_with_history(db)
+    client_totals.clear()
+    assert client_totals.get(client_id).visits == 4
+    hits = client_totals.stats()["hits"]
+    assert client_totals.get(client_id).visits == 4
+    assert client_totals.stats()["hits"] == hits + 1
+
+    client.post(
+        "/client_parkings/enter", data={"client_id": client_id, "parking_id": flat_id}
+    )
+    assert client_totals.get(client_id).visits == 5
+    client.delete(
+        "/api/client_parkings/exit",
+        json={"client_id": client_id, "parking_id": flat_id},
+    )
+    assert client_totals.get(client_id).favourite_parking_id == flat_id
+
+
+def test_history_is_paginated(client: FlaskClient, db: SQLAlchemy) -> None:
+    client_id, _, _ = _client_with_history(db)
+
+    first = client.get(f"/api/clients/{client_id}/history?limit=3").get_json()
+    rest = client.get(
+        f"/api/clients/{client_id}/history?limit=3&before={first['next_before']}"
+    ).get_json()
+
+    ids = [s["id"] for s in first["sessions"] + rest["sessions"]]
+    assert len(ids) == 4 and ids == sorted(ids, reverse=True)
+    assert rest["next_before"] is None
+    assert first["totals"]["visits"] == 4
+    assert client.get("/api/clients/999999/history").status_code == 404
+
+    html = client.get(f"/clients/{client_id}?limit=3").get_data(as_text=True)
+    assert f"before={first['next_before']}" in html
+    assert "Посещений" in html
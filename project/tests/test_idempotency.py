@@ -0,0 +1,131 @@
+from datetime import datetime, timezone
+from typing import Any, List, Tuple
+
+import pytest
+from flask.testing import FlaskClient
+from flask_sqlalchemy import SQLAlchemy
+
+from project.app.idempotency import (
+    IN_FLIGHT,
+    PENDING,
+    StoredResponse,
+    idempotency,
+    record_statement,
+)
+from project.app.models import Parking
+from project.app.services import reserve_place
+from project.tests.factories import ClientFactory, ParkingFactory
+
+
+def _parked(db: SQLAlchemy) -> Tuple[int, int]:
+    parking = ParkingFactory.create(count_places=3)
+    driver = ClientFactory.create(credit_card="4000")
+    db.session.commit()
+    reserve_place(driver.id, parking.id)
+    return driver.id, parking.id
+
+
+def test_exit_retry_replays_original_response(
+    client: FlaskClient, db: SQLAlchemy, statements: List[str]
+) -> None:
+    client_id, parking_id = _parked(db)
+    payload = {"client_id": client_id, "parking_id": parking_id}
+    headers = {"Idempotency-Key": "exit-401"}
+
+    first = client.delete("/api/client_parkings/exit", json=payload, headers=headers)
+    assert first.status_code == 200
+    assert "success" in first.get_json()
+
+    statements.clear()
+    retry = client.delete("/api/client_parkings/exit", json=payload, headers=headers)
+    assert statements == []
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    assert (retry.status_code, retry.get_json()) == (200, first.get_json())
+
+    # After a restart the response comes from the table, not the sessions.
+    idempotency.clear()
+    statements.clear()
+    retry = client.delete("/api/client_parkings/exit", json=payload, headers=headers)
+    assert len(statements) == 1
+    assert "FROM idempotency_key" in statements[0]
+    assert retry.get_json() == first.get_json()
+
+    without_key = client.delete("/api/client_parkings/exit", json=payload)
+    assert without_key.status_code == 404
+
+
+def test_key_reused_with_another_payload(client: FlaskClient, db: SQLAlchemy) -> None:
+    client_id, parking_id = _parked(db)
+    headers = {"Idempotency-Key": "enter-402"}
+    events = [{"client_id": client_id, "parking_id": parking_id}]
+
+    first = client.post(
+        "/api/client_parkings/enter/batch", json={"events": events}, headers=headers
+    )
+    replay = client.post(
+        "/api/client_parkings/enter/batch", json={"events": events}, headers=headers
+    )
+    assert replay.get_json() == first.get_json()
+
+    events[0]["parking_id"] += 1
+    response = client.post(
+        "/api/client_parkings/enter/batch", json={"events": events}, headers=headers
+    )
+    assert response.status_code == 422
+
+    response = client.delete(
+        "/api/client_parkings/exit",
+        json={"client_id": client_id, "parking_id": parking_id},
+        headers={"Idempotency-Key": "x" * 256},
+    )
+    assert response.status_code == 400
+
+
+def test_key_commits_with_the_write(
+    client: FlaskClient, db: SQLAlchemy, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    client_id, parking_id = _parked(db)
+    payload = {"client_id": client_id, "parking_id": parking_id}
+    headers = {"Idempotency-Key": "exit-403"}
+
+    def crash(*args: Any) -> None:
+        raise RuntimeError("process died before storing the response")
+
+    # The exit commits, then the process dies before the response is stored.
+    with monkeypatch.context() as patch:
+        patch.setattr(idempotency, "put", crash)
+        with pytest.raises(RuntimeError):
+            client.delete("/api/client_parkings/exit", json=payload, headers=headers)
+
+    idempotency.clear()
+    retry = client.delete("/api/client_parkings/exit", json=payload, headers=headers)
+    assert retry.status_code == 409
+    assert "не сохранён" in retry.get_json()["error"]
+
+
+def test_key_claimed_by_another_process_is_in_flight(
+    client: FlaskClient, db: SQLAlchemy, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    client_id, parking_id = _parked(db)
+    payload = {"client_id": client_id, "parking_id": parking_id}
+    events = {"events": [payload]}
+    # Another process claimed both keys after this one looked them up.
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    for scope in ("views.process_exit", "views.process_exit_batch"):
+        pending = StoredResponse("other", PENDING, "", now)
+        db.session.execute(record_statement((scope, "race-404"), pending))
+    db.session.commit()
+    monkeypatch.setattr(idempotency, "get", lambda key: None)
+    headers = {"Idempotency-Key": "race-404"}
+
+    response = client.delete("/api/client_parkings/exit", json=payload, headers=headers)
+    assert (response.status_code, response.get_json()) == (409, {"error": IN_FLIGHT})
+
+    response = client.post(
+        "/api/client_parkings/exit/batch", json=events, headers=headers
+    )
+    assert (response.status_code, response.get_json()) == (409, {"error": IN_FLIGHT})
+
+    # Neither exit was committed without its key.
+    parking = db.session.get(Parking, parking_id)
+    assert parking is not None and parking.count_available_places == 2
@@ -0,0 +1,89 @@
+import logging
+import re
+from pathlib import Path
+
+import pytest
+from flask import Flask
+from flask.testing import FlaskClient
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from project.app import create_app
+from project.app.metrics import metrics
+from project.app.models import Client
+from project.config import Config
+from project.database import db
+
+
+def _sample(body: str, name: str, **labels: str) -> float:
+    rendered = ",".join(f'{key}="{value}"' for key, value in labels.items())
+    match = re.search(rf"^{name}\{{{re.escape(rendered)}\}} (\S+)$", body, re.M)
+    assert match, f"{name}{{{rendered}}} not exported"
+    return float(match.group(1))
+
+
+def test_requests_and_queries_are_exported(client: FlaskClient) -> None:
+    metrics.reset()
+    client.get("/client_parkings/active")
+    client.get("/client_parkings/active")
+
+    body = client.get("/metrics").get_data(as_text=True)
+
+    assert "# TYPE http_request_duration_seconds histogram" in body
+    labels = {"endpoint": "views.list_active_sessions"}
+    assert (
+        _sample(body, "http_requests_total", **labels, method="GET", status="200") == 2
+    )
+    assert _sample(body, "http_request_duration_seconds_count", **labels) == 2
+    assert _sample(body, "db_queries_per_request_sum", **labels) == 2
+    assert _sample(body, "db_queries_per_request_bucket", **labels, le="1") == 2
+    assert "occupancy_cache_hits_total" in body
+
+
+@pytest.fixture()
+def n_plus_one_app(tmp_path: Path) -> Flask:
+    class DetectorConfig(Config):
+        TESTING = True
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{tmp_path / 'parking.db'}"
+        N_PLUS_ONE_THRESHOLD = 3
+
+    app = create_app(DetectorConfig())
+
+    @app.route("/failing-query")
+    def failing_query() -> str:
+        try:
+            db.session.execute(text("SELECT * FROM missing_table"))
+        except OperationalError:
+            db.session.rollback()
+        db.session.get(Client, 1)
+        return "ok"
+
+    @app.route("/n-plus-one")
+    def n_plus_one() -> str:
+        for client_id in range(1, 6):
+            db.session.get(Client, client_id)
+        return "ok"
+
+    return app
+
+
+def test_n_plus_one_detector_logs_repeated_statements(
+    n_plus_one_app: Flask, caplog: pytest.LogCaptureFixture
+) -> None:
+    metrics.reset()
+    with caplog.at_level(logging.WARNING, logger="project.app.metrics"):
+        n_plus_one_app.test_client().get("/n-plus-one")
+
+    assert "Possible N+1 in n_plus_one: statement ran 5 times" in caplog.text
+    assert metrics.n_plus_one["n_plus_one"] == 1
+
+
+def test_failing_statements_are_timed(n_plus_one_app: Flask) -> None:
+    metrics.reset()
+    n_plus_one_app.test_client().get("/failing-query")
+
+    with n_plus_one_app.app_context():
+        with db.engine.connect() as connection:
+            assert "query_started" not in connection.info
+    body = n_plus_one_app.test_client().get("/metrics").get_data(as_text=True)
+    assert _sample(body, "db_queries_per_request_sum", endpoint="failing_query") == 2
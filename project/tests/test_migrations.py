@@ -0,0 +1,162 @@
+import re
+import sqlite3
+from pathlib import Path
+
+from sqlalchemy import create_engine, inspect
+
+from project.app import create_app
+from project.config import BASE_DIR, Config
+from project.database.migrations import MIGRATIONS, upgrade
+
+LEGACY_SCHEMA = """
+CREATE TABLE client (
+    id INTEGER NOT NULL PRIMARY KEY,
+    name VARCHAR(50) NOT NULL,
+    surname VARCHAR(50) NOT NULL,
+    credit_card VARCHAR(50),
+    car_number VARCHAR(10)
+);
+CREATE TABLE parking (
+    id INTEGER NOT NULL PRIMARY KEY,
+    address VARCHAR(100) NOT NULL,
+    opened BOOLEAN,
+    count_places INTEGER NOT NULL,
+    count_available_places INTEGER NOT NULL
+);
+CREATE TABLE client_parking (
+    id INTEGER NOT NULL PRIMARY KEY,
+    client_id INTEGER REFERENCES client (id),
+    parking_id INTEGER REFERENCES parking (id),
+    time_in DATETIME NOT NULL,
+    time_out DATETIME
+);
+"""
+
+
+def _index_names(database_path: Path, table: str) -> set[str | None]:
+    engine = create_engine(f"sqlite:///{database_path}")
+    try:
+        return {index["name"] for index in inspect(engine).get_indexes(table)}
+    finally:
+        engine.dispose()
+
+
+def _user_version(database_path: Path) -> int:
+    with sqlite3.connect(database_path) as connection:
+        return int(connection.execute("PRAGMA user_version").fetchone()[0])
+
+
+def test_existing_database_is_upgraded(tmp_path: Path) -> None:
+    database_path = tmp_path / "parking.db"
+    with sqlite3.connect(database_path) as connection:
+        connection.executescript(LEGACY_SCHEMA)
+
+    class LegacyConfig(Config):
+        TESTING = True
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{database_path}"
+
+    create_app(LegacyConfig())
+
+    assert _user_version(database_path) == MIGRATIONS[-1].version
+    assert {
+        "ix_client_parking_active",
+        "ix_client_parking_client_parking_time_out",
+        "ix_client_parking_time_out",
+    } <= _index_names(database_path, "client_parking")
+    assert "ix_client_car_number" in _index_names(database_path, "client")
+
+
+def test_upgrade_is_idempotent(tmp_path: Path) -> None:
+    database_path = tmp_path / "parking.db"
+    with sqlite3.connect(database_path) as connection:
+        connection.executescript(LEGACY_SCHEMA)
+
+    engine = create_engine(f"sqlite:///{database_path}")
+    try:
+        assert upgrade(engine) == MIGRATIONS[-1].version
+        assert upgrade(engine) == MIGRATIONS[-1].version
+    finally:
+        engine.dispose()
+
+
+def test_duplicate_open_sessions_are_closed(tmp_path: Path) -> None:
+    database_path = tmp_path / "parking.db"
+    with sqlite3.connect(database_path) as connection:
+        connection.executescript(LEGACY_SCHEMA)
+        connection.executescript(
+            "INSERT INTO client VALUES (1, 'Race', 'Twice', '4000', 'A777AA77');"
+            "INSERT INTO parking VALUES (1, 'Race', 1, 5, 3);"
+            "INSERT INTO client_parking VALUES "
+            "(1, 1, 1, '2024-03-04 10:00:00.000000', NULL), "
+            "(2, 1, 1, '2024-03-04 10:05:00.000000', NULL);"
+        )
+
+    engine = create_engine(f"sqlite:///{database_path}")
+    try:
+        assert upgrade(engine) == MIGRATIONS[-1].version
+    finally:
+        engine.dispose()
+
+    with sqlite3.connect(database_path) as connection:
+        sessions = connection.execute(
+            "SELECT id, time_out FROM client_parking ORDER BY id"
+        ).fetchall()
+        available = connection.execute(
+            "SELECT count_available_places FROM parking"
+        ).fetchone()[0]
+    assert sessions == [(1, "2024-03-04 10:05:00.000000"), (2, None)]
+    assert available == 4
+
+
+def test_plates_are_folded_and_duplicates_left_empty(tmp_path: Path) -> None:
+    database_path = tmp_path / "parking.db"
+    with sqlite3.connect(database_path) as connection:
+        connection.executescript(LEGACY_SCHEMA)
+        connection.executescript(
+            "INSERT INTO client VALUES (1, 'First', 'Owner', NULL, ' а123вс 77');"
+            "INSERT INTO client VALUES (2, 'Second', 'Owner', NULL, 'A123-BC77');"
+        )
+
+    engine = create_engine(f"sqlite:///{database_path}")
+    try:
+        upgrade(engine)
+    finally:
+        engine.dispose()
+
+    with sqlite3.connect(database_path) as connection:
+        plates = connection.execute(
+            "SELECT id, plate FROM client ORDER BY id"
+        ).fetchall()
+    assert plates == [(1, "A123BC77"), (2, None)]
+
+
+def _objects(database_path: Path) -> dict[str, str]:
+    with sqlite3.connect(database_path) as connection:
+        rows = connection.execute(
+            "SELECT name, sql FROM sqlite_master WHERE sql IS NOT NULL"
+        ).fetchall()
+    return {name: re.sub(r"\s+", "", sql) for name, sql in rows}
+
+
+def test_schema_sql_matches_migrated_models(tmp_path: Path) -> None:
+    migrated = tmp_path / "migrated.db"
+
+    class FreshConfig(Config):
+        TESTING = True
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{migrated}"
+
+    create_app(FreshConfig())
+
+    scripted = tmp_path / "scripted.db"
+    with sqlite3.connect(scripted) as connection:
+        connection.executescript(
+            (BASE_DIR / "database" / "schema.sql").read_text(encoding="utf-8")
+        )
+
+    assert _objects(scripted) == _objects(migrated)
+    assert _user_version(scripted) == MIGRATIONS[-1].version
+    engine = create_engine(f"sqlite:///{scripted}")
+    try:
+        assert upgrade(engine) == MIGRATIONS[-1].version
+    finally:
+        engine.dispose()
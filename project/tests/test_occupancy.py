@@ -0,0 +1,94 @@
+from typing import Callable, List
+
+from flask import Flask
+from flask.testing import FlaskClient
+from flask_sqlalchemy import SQLAlchemy
+
+from project.app.occupancy import occupancy
+from project.database import db as _db
+from project.tests.factories import ClientFactory, ParkingFactory
+
+
+def test_dashboard_reads_one_stats_row(
+    client: FlaskClient, statements: List[str]
+) -> None:
+    response = client.get("/")
+
+    assert response.status_code == 200
+    assert len(statements) == 1
+    assert "FROM parking_stats" in statements[0]
+    assert "parking_stats.parking_id = ?" in statements[0]
+
+
+def test_enter_and_exit_write_through(client: FlaskClient, db: SQLAlchemy) -> None:
+    parking = ParkingFactory.create(count_places=2)
+    gate_client = ClientFactory.create(credit_card="4444")
+    db.session.commit()
+    occupancy.rebuild()
+    parking_id, client_id = parking.id, gate_client.id
+    before = occupancy.totals().active_sessions_count
+
+    client.post(
+        "/client_parkings/enter",
+        data={"client_id": client_id, "parking_id": parking_id},
+    )
+    cached = occupancy.parking(parking_id)
+    assert cached is not None
+    assert (cached.active_sessions, cached.count_available_places) == (1, 1)
+    assert occupancy.totals().active_sessions_count == before + 1
+
+    client.delete(
+        "/api/client_parkings/exit",
+        json={"client_id": client_id, "parking_id": parking_id},
+    )
+    cached = occupancy.parking(parking_id)
+    assert cached is not None
+    assert (cached.active_sessions, cached.count_available_places) == (0, 2)
+    assert occupancy.totals().active_sessions_count == before
+
+
+def test_unknown_parking_is_loaded_on_miss(client: FlaskClient, db: SQLAlchemy) -> None:
+    parking = ParkingFactory.create(count_places=4)
+    db.session.commit()
+    misses = occupancy.stats()["misses"]
+
+    cached = occupancy.parking(parking.id)
+
+    assert cached is not None
+    assert cached.count_available_places == 4
+    assert occupancy.stats()["misses"] == misses + 1
+
+
+def test_create_parking_updates_cache(client: FlaskClient) -> None:
+    before = occupancy.totals().parkings_count
+    client.post("/parkings/new", data={"address": "New", "count_places": "3"})
+
+    snapshot = client.get("/api/occupancy").get_json()
+    assert snapshot["parkings_count"] == before + 1
+    assert snapshot["parkings"][-1]["address"] == "New"
+    assert snapshot["parkings"][-1]["opened"] is False
+
+
+def test_writes_of_other_processes_reach_the_cache(
+    polling_app: Flask, other_process: Callable[..., None]
+) -> None:
+    with polling_app.app_context():
+        ParkingFactory.create(opened=True, count_places=1, count_available_places=1)
+        ClientFactory.create()
+        _db.session.commit()
+    server = polling_app.test_client()
+    assert server.get("/api/occupancy").get_json()["active_sessions_count"] == 0
+
+    other_process(
+        "INSERT INTO client_parking (client_id, parking_id, time_in)"
+        " VALUES (1, 1, CURRENT_TIMESTAMP)",
+        "UPDATE parking SET count_available_places = 0 WHERE id = 1",
+        "INSERT INTO shared_version (name, version)"
+        " VALUES ('parking', 1), ('client_parking', 1)"
+        " ON CONFLICT (name) DO UPDATE SET version = version + 1",
+    )
+
+    snapshot = server.get("/api/occupancy").get_json()
+    assert snapshot["active_sessions_count"] == 1
+    assert snapshot["parkings"][0]["count_available_places"] == 0
+    assert occupancy.available_parkings() == []
@@ -0,0 +1,55 @@
+import re
+
+from flask.testing import FlaskClient
+from flask_sqlalchemy import SQLAlchemy
+
+from project.app.models import Client
+from project.tests.factories import ClientFactory
+
+
+def _client_ids(html: str) -> list[int]:
+    return [int(i) for i in re.findall(r"/clients/(\d+)\"", html)]
+
+
+def test_keyset_pages_follow_cursor(client: FlaskClient, db: SQLAlchemy) -> None:
+    ClientFactory.create_batch(7)
+    db.session.commit()
+    total = Client.query.count()
+
+    seen: list[int] = []
+    url = "/clients?limit=3"
+    while True:
+        html = client.get(url).get_data(as_text=True)
+        ids = _client_ids(html)
+        assert len(ids) <= 3
+        seen.extend(ids)
+        match = re.search(r"after=(\d+)&amp;limit=3", html)
+        if not match:
+            break
+        url = f"/clients?after={match.group(1)}&limit=3"
+
+    assert seen == sorted(seen)
+    assert len(seen) == total
+
+
+def test_streamed_listing_renders_every_row(
+    client: FlaskClient, db: SQLAlchemy
+) -> None:
+    total = Client.query.count()
+    response = client.get("/clients?stream=1")
+
+    assert response.is_streamed
+    html = response.get_data(as_text=True)
+    assert len(_client_ids(html)) == total
+    assert "Следующая страница" not in html
+
+
+def test_limit_is_clamped(client: FlaskClient) -> None:
+    response = client.get("/parkings?limit=0")
+    assert response.status_code == 200
+
+
+def test_streamed_active_sessions(client: FlaskClient) -> None:
+    response = client.get("/client_parkings/active?stream=1")
+    assert response.status_code == 200
+    assert "A123BC123" in response.get_data(as_text=True)
@@ -0,0 +1,101 @@
+import sqlite3
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import List
+
+import pytest
+from flask.testing import FlaskClient
+from flask_sqlalchemy import SQLAlchemy
+
+from project.app import create_app
+from project.app.models import Client, ClientParking
+from project.app.plates import normalize_plate, validate_car_number
+from project.config import Config
+from project.tests.factories import ClientFactory, ParkingFactory
+from project.tests.test_migrations import LEGACY_SCHEMA
+
+
+@pytest.mark.parametrize(
+    "car_number,plate",
+    [
+        ("а123вс77", "A123BC77"),
+        ("A 123 BC 777", "A123BC777"),
+        ("м001ТТ-99", "M001TT99"),
+    ],
+)
+def test_plates_fold_cyrillic_and_case(car_number: str, plate: str) -> None:
+    assert normalize_plate(car_number) == plate
+    assert validate_car_number(car_number)
+
+
+def test_look_alike_plates_are_one_client(client: FlaskClient, db: SQLAlchemy) -> None:
+    client.post(
+        "/clients/new",
+        data={"name": "Plate", "surname": "Latin", "car_number": "P500PP77"},
+    )
+    response = client.post(
+        "/clients/new",
+        data={"name": "Plate", "surname": "Cyrillic", "car_number": "Р500РР77"},
+    )
+
+    assert "уже зарегистрирован" in response.get_data(as_text=True)
+    assert Client.query.filter_by(plate="P500PP77").count() == 1
+
+
+def test_plate_lookup_returns_client_and_active_session(
+    client: FlaskClient, db: SQLAlchemy, statements: List[str]
+) -> None:
+    parking = ParkingFactory.create(
+        address="Camera", count_places=5, count_available_places=4
+    )
+    camera_client = ClientFactory.create(car_number="P600PP77", credit_card="4444")
+    db.session.flush()
+    db.session.add(
+        ClientParking(
+            client_id=camera_client.id,
+            parking_id=parking.id,
+            time_in=datetime.now(timezone.utc),
+        )
+    )
+    db.session.commit()
+    client_id, parking_id = camera_client.id, parking.id
+
+    statements.clear()
+    response = client.get("/api/plates/р600рр77")
+
+    assert response.status_code == 200
+    assert len(statements) == 1
+    body = response.get_json()
+    assert body["client"]["id"] == client_id
+    assert body["client"]["has_credit_card"] is True
+    assert body["active_session"]["parking_id"] == parking_id
+    assert body["active_session"]["address"] == "Camera"
+
+
+def test_plate_lookup_errors(client: FlaskClient, db: SQLAlchemy) -> None:
+    ClientFactory.create(car_number="P700PP77")
+    db.session.commit()
+
+    assert client.get("/api/plates/P700PP77").get_json()["active_session"] is None
+    assert client.get("/api/plates/X999XX99").status_code == 404
+    assert client.get("/api/plates/not-a-plate").status_code == 400
+
+
+def test_migration_backfills_plates_and_skips_duplicates(tmp_path: Path) -> None:
+    database_path = tmp_path / "parking.db"
+    with sqlite3.connect(database_path) as connection:
+        connection.executescript(LEGACY_SCHEMA)
+        connection.executemany(
+            "INSERT INTO client (name, surname, car_number) VALUES (?, ?, ?)",
+            [("A", "A", "а123вс77"), ("B", "B", "A123BC77"), ("C", "C", "K001KK77")],
+        )
+
+    class LegacyConfig(Config):
+        TESTING = True
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{database_path}"
+
+    create_app(LegacyConfig())
+
+    with sqlite3.connect(database_path) as connection:
+        plates = connection.execute("SELECT plate FROM client ORDER BY id").fetchall()
+    assert plates == [("A123BC77",), (None,), ("K001KK77",)]
@@ -1,10 +1,12 @@
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
+from typing import List
 
 import pytest
 from flask.testing import FlaskClient
 from flask_sqlalchemy import SQLAlchemy
 
 from project.app.models import Client, ClientParking, Parking
+from project.app.occupancy import occupancy
 from project.tests.factories import ClientFactory, ParkingFactory
 
 
@@ -25,7 +27,7 @@ def test_get_routes(client: FlaskClient, route: str, expected: int) -> None:
 
 
 def test_create_client(client: FlaskClient, db: SQLAlchemy) -> None:
-    test_car_number = "A123BC123"
+    test_car_number = "A124BC123"
 
     data = {
         "name": "New",
@@ -187,7 +189,7 @@ def test_create_client_with_factory(client: FlaskClient, db: SQLAlchemy) -> None
     client_data = {
         "name": test_client.name,
         "surname": test_client.surname,
-        "car_number": "А123BC123",
+        "car_number": "А125BC123",
         "credit_card": test_client.credit_card if test_client.credit_card else "",
     }
 
@@ -207,6 +209,7 @@ def test_create_client_with_factory(client: FlaskClient, db: SQLAlchemy) -> None
     assert new_client is not None
     assert new_client.name == client_data["name"]
     assert new_client.surname == client_data["surname"]
+    assert new_client.plate == "A125BC123"
 
 
 def test_create_parking_with_factory(client: FlaskClient, db: SQLAlchemy) -> None:
@@ -230,3 +233,91 @@ def test_create_parking_with_factory(client: FlaskClient, db: SQLAlchemy) -> Non
     assert new_parking.opened is True
     assert new_parking.count_available_places == test_parking.count_places
     assert "Парковка успешно создана" in response.data.decode("utf-8")
+
+
+def _parked_client(
+    db: SQLAlchemy, credit_card: str | None, car_number: str = "E123EE77"
+) -> tuple[Client, Parking]:
+    parking = Parking(
+        address="Exit", opened=True, count_places=3, count_available_places=2
+    )
+    exit_client = Client(
+        name="Exit", surname="Client", car_number=car_number, credit_card=credit_card
+    )
+    db.session.add_all([parking, exit_client])
+    db.session.flush()
+    db.session.add(
+        ClientParking(
+            client_id=exit_client.id,
+            parking_id=parking.id,
+            time_in=datetime.now(timezone.utc) - timedelta(minutes=30),
+        )
+    )
+    db.session.commit()
+    return exit_client, parking
+
+
+@pytest.mark.parking
+def test_exit_statement_count(
+    client: FlaskClient, db: SQLAlchemy, statements: List[str]
+) -> None:
+    exit_client, parking = _parked_client(db, credit_card="1111222233334444")
+    payload = {"client_id": exit_client.id, "parking_id": parking.id}
+
+    statements.clear()
+    response = client.delete("/api/client_parkings/exit", json=payload)
+
+    assert response.status_code == 200
+    assert "Снята плата - 300 руб." in response.get_json()["success"]
+    # Close the session, free the place, stamp the shared data versions.
+    assert [s.split()[0] for s in statements] == ["UPDATE", "UPDATE", "INSERT"]
+    assert Parking.query.get(parking.id).count_available_places == 3
+
+
+@pytest.mark.parking
+def test_exit_with_new_card_statement_count(
+    client: FlaskClient, db: SQLAlchemy, statements: List[str]
+) -> None:
+    exit_client, parking = _parked_client(db, credit_card=None, car_number="E124EE77")
+    payload = {"client_id": exit_client.id, "parking_id": parking.id}
+
+    statements.clear()
+    response = client.delete("/api/client_parkings/exit", json=payload)
+    assert response.get_json()["require_credit_card"] is True
+    assert response.get_json()["car_number"] == "E124EE77"
+
+    statements.clear()
+    response = client.delete(
+        "/api/client_parkings/exit",
+        json={**payload, "credit_card": "5555666677778888"},
+    )
+
+    assert "success" in response.get_json()
+    assert len(statements) == 4
+    assert Client.query.get(exit_client.id).credit_card == "5555666677778888"
+
+
+def test_exit_unknown_session(client: FlaskClient, db: SQLAlchemy) -> None:
+    response = client.delete(
+        "/api/client_parkings/exit", json={"client_id": 999, "parking_id": 999}
+    )
+    assert response.status_code == 404
+
+
+def test_enter_form_excludes_parked_clients(
+    client: FlaskClient, db: SQLAlchemy, statements: List[str]
+) -> None:
+    _parked_client(db, credit_card=None, car_number="P123PP77")
+    free = Client(name="Free", surname="Client", car_number="F123FF77")
+    db.session.add(free)
+    db.session.commit()
+    occupancy.rebuild()
+
+    statements.clear()
+    response = client.get("/client_parkings/enter")
+    text = response.get_data(as_text=True)
+
+    assert "F123FF77" in text
+    assert len(statements) == 1
+    assert "P123PP77" not in text
+    assert "NOT (EXISTS" in statements[0]
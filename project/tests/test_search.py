@@ -0,0 +1,75 @@
+import pytest
+from flask.testing import FlaskClient
+from flask_sqlalchemy import SQLAlchemy
+
+from project.app import search
+from project.app.search import match_expression, search_clients
+from project.tests.factories import ClientFactory
+
+
+def _add_clients(db: SQLAlchemy) -> None:
+    for name, surname, car_number in [
+        ("Пётр", "Поисков", "С101СС77"),
+        ("Поисков", "Иван", "С102СС77"),
+        ("Анна", "Поискова", "С103СС77"),
+        ("Олег", "Другой", "C104CC77"),
+    ]:
+        ClientFactory.create(name=name, surname=surname, car_number=car_number)
+    db.session.commit()
+
+
+def test_match_expression_quotes_user_input() -> None:
+    assert match_expression('  "  ') is None
+    expression = match_expression('o"neil а1')
+    assert expression is not None
+    assert '"o""neil"*' in expression
+    assert 'plate : "A1"*' in expression
+
+
+def test_prefix_search_over_names_and_plates(db: SQLAlchemy) -> None:
+    _add_clients(db)
+
+    by_prefix = {match.surname for match in search_clients("поиск", 10)}
+    assert by_prefix == {"Поисков", "Иван", "Поискова"}
+    assert [m.surname for m in search_clients("поиск ив", 10)] == ["Иван"]
+    # A Cyrillic plate prefix finds the Latin-normalized plate.
+    assert [m.car_number for m in search_clients("с104", 10)] == ["C104CC77"]
+
+
+def test_index_follows_client_changes(db: SQLAlchemy) -> None:
+    renamed = ClientFactory.create(name="Старое", surname="Имя")
+    db.session.commit()
+
+    renamed.surname = "Переименованный"
+    db.session.commit()
+    assert [m.id for m in search_clients("переим", 10)] == [renamed.id]
+    assert search_clients("имя", 10) == []
+
+    db.session.delete(renamed)
+    db.session.commit()
+    assert search_clients("переим", 10) == []
+
+
+def test_search_api_pages_results(client: FlaskClient) -> None:
+    first = client.get("/api/clients/search?q=поиск&limit=2").get_json()
+    second = client.get(
+        f"/api/clients/search?q=поиск&limit=2&offset={first['next_offset']}"
+    ).get_json()
+
+    assert len(first["items"]) == 2
+    assert len(second["items"]) == 1
+    assert second["next_offset"] is None
+    assert client.get("/api/clients/search?q=").status_code == 400
+    page = client.get("/clients/search?q=с101").get_data(as_text=True)
+    assert "С101СС77" in page
+
+
+def test_broad_queries_fall_back_to_id_order(
+    db: SQLAlchemy, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(search, "RANKED_MATCHES", 2)
+
+    matches = search_clients("поиск", 10)
+
+    assert [m.id for m in matches] == sorted(m.id for m in matches)
+    assert len(matches) == 3
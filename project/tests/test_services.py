@@ -0,0 +1,118 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import List
+
+import pytest
+from flask import Flask
+
+from project.app import create_app
+from project.app.models import ClientParking, Parking
+from project.app.services import (
+    ClientAlreadyParked,
+    ClientNotFound,
+    ParkingClosed,
+    ParkingError,
+    ParkingFull,
+    ParkingNotFound,
+    reserve_place,
+)
+from project.config import Config
+from project.database import db
+from project.tests.factories import ClientFactory, ParkingFactory
+
+PLACES = 5
+GATE_THREADS = 24
+
+
+@pytest.fixture()
+def file_app(tmp_path: Path) -> Flask:
+    class FileConfig(Config):
+        TESTING = True
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{tmp_path / 'parking.db'}"
+
+    return create_app(FileConfig())
+
+
+def _seed(app: Flask, clients: int, places: int, opened: bool = True) -> int:
+    with app.app_context():
+        parking = ParkingFactory.create(opened=opened, count_places=places)
+        ClientFactory.create_batch(clients, credit_card=None)
+        db.session.commit()
+        return int(parking.id)
+
+
+def test_concurrent_entries_never_oversell(file_app: Flask) -> None:
+    parking_id = _seed(file_app, clients=GATE_THREADS, places=PLACES)
+    barrier = threading.Barrier(GATE_THREADS)
+
+    def enter(client_id: int) -> str:
+        with file_app.app_context():
+            barrier.wait()
+            try:
+                reserve_place(client_id, parking_id)
+            except ParkingError as e:
+                return type(e).__name__
+            return "ok"
+
+    with ThreadPoolExecutor(max_workers=GATE_THREADS) as pool:
+        results: List[str] = list(pool.map(enter, range(1, GATE_THREADS + 1)))
+
+    assert results.count("ok") == PLACES
+    assert results.count("ParkingFull") == GATE_THREADS - PLACES
+
+    with file_app.app_context():
+        parking = db.session.get(Parking, parking_id)
+        assert parking is not None
+        assert parking.count_available_places == 0
+        active = ClientParking.query.filter_by(time_out=None).count()
+        assert active == PLACES
+
+
+def test_concurrent_double_entry_is_rejected(file_app: Flask) -> None:
+    parking_id = _seed(file_app, clients=1, places=PLACES)
+    barrier = threading.Barrier(8)
+
+    def enter(_: int) -> str:
+        with file_app.app_context():
+            barrier.wait()
+            try:
+                reserve_place(1, parking_id)
+            except ClientAlreadyParked:
+                return "duplicate"
+            return "ok"
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(enter, range(8)))
+
+    assert results.count("ok") == 1
+    with file_app.app_context():
+        parking = db.session.get(Parking, parking_id)
+        assert parking is not None
+        assert parking.count_available_places == PLACES - 1
+
+
+@pytest.mark.parametrize(
+    "opened,places,client_id,parking_id,error",
+    [
+        (False, PLACES, 1, 1, ParkingClosed),
+        (True, 0, 1, 1, ParkingFull),
+        (True, PLACES, 1, 42, ParkingNotFound),
+        (True, PLACES, 42, 1, ClientNotFound),
+    ],
+)
+def test_reservation_errors(
+    file_app: Flask,
+    opened: bool,
+    places: int,
+    client_id: int,
+    parking_id: int,
+    error: type[ParkingError],
+) -> None:
+    _seed(file_app, clients=1, places=places, opened=opened)
+    with file_app.app_context():
+        with pytest.raises(error):
+            reserve_place(client_id, parking_id)
+        parking = db.session.get(Parking, 1)
+        assert parking is not None
+        assert parking.count_available_places == places
@@ -0,0 +1,56 @@
+from flask import Flask
+from flask.testing import FlaskClient
+from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import text
+
+from project.app.cli import check_stats_command
+from project.app.models import ParkingStats
+from project.app.services import add_parking, release_place, reserve_place
+from project.app.stats import TOTAL, check_stats, expected_stats, stored_stats
+from project.tests.factories import ClientFactory, ParkingFactory
+
+
+def _stats(db: SQLAlchemy, parking_id: int) -> tuple[int, int]:
+    db.session.expire_all()
+    row = db.session.get(ParkingStats, parking_id)
+    assert row is not None
+    return row.places, row.active_sessions
+
+
+def test_writes_maintain_stats(db: SQLAlchemy, client: FlaskClient) -> None:
+    total_places, total_active = _stats(db, TOTAL)
+    parking = add_parking(ParkingFactory.build(count_places=4))
+    driver = ClientFactory.create(credit_card="4000")
+    db.session.commit()
+    assert _stats(db, parking.id) == (4, 0)
+    assert _stats(db, TOTAL) == (total_places + 4, total_active)
+
+    reserve_place(driver.id, parking.id)
+    assert _stats(db, parking.id) == (4, 1)
+    assert _stats(db, TOTAL) == (total_places + 4, total_active + 1)
+
+    release_place(driver.id, parking.id)
+    assert _stats(db, parking.id) == (4, 0)
+    assert _stats(db, TOTAL) == (total_places + 4, total_active)
+    assert stored_stats() == expected_stats()
+
+    html = client.get("/parkings").get_data(as_text=True)
+    assert "<td>0%</td>" in html
+
+
+def test_checker_detects_and_repairs_drift(app: Flask, db: SQLAlchemy) -> None:
+    db.session.execute(
+        text("UPDATE parking_stats SET active_sessions = 99 WHERE parking_id = 1")
+    )
+    db.session.commit()
+
+    mismatches = check_stats()
+    assert [m.parking_id for m in mismatches] == [1]
+    assert mismatches[0].stored is not None and mismatches[0].stored[2] == 99
+
+    result = app.test_cli_runner().invoke(check_stats_command)
+    assert result.exit_code == 1
+
+    result = app.test_cli_runner().invoke(check_stats_command, ["--repair"])
+    assert result.exit_code == 0
+    assert check_stats() == []
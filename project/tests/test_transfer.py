@@ -0,0 +1,129 @@
+import json
+from datetime import datetime
+from pathlib import Path
+
+from flask import Flask
+from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import create_engine, text
+
+from project.app import create_app
+from project.app.cli import export_data_command, import_data_command
+from project.app.models import Client, ClientParking, Parking
+from project.app.occupancy import occupancy
+from project.config import Config
+
+CLIENTS_CSV = """name,surname,car_number,credit_card
+Import,One,T001TT77,4444
+,Nameless,T002TT77,
+Import,Two,BAD,
+Import,Three,T003TT77,
+"""
+
+
+def test_import_reports_bad_rows_without_aborting(
+    app: Flask, db: SQLAlchemy, tmp_path: Path
+) -> None:
+    source = tmp_path / "clients.csv"
+    source.write_text(CLIENTS_CSV, encoding="utf-8")
+
+    result = app.test_cli_runner().invoke(
+        import_data_command, ["clients", str(source), "--chunk-size", "2"]
+    )
+
+    assert "Imported 2 clients, rejected 2" in result.output
+    assert "line 3: name is required" in result.output
+    assert "line 4: invalid car number 'BAD'" in result.output
+    imported = Client.query.filter(Client.surname.in_(["One", "Three"])).all()
+    assert sorted(c.car_number for c in imported) == ["T001TT77", "T003TT77"]
+
+
+def test_jsonl_parking_import_updates_occupancy(
+    app: Flask, db: SQLAlchemy, tmp_path: Path
+) -> None:
+    source = tmp_path / "parkings.jsonl"
+    source.write_text(
+        "\n".join(
+            [
+                json.dumps({"address": "Import", "count_places": 7}),
+                json.dumps(
+                    {"address": "Over", "count_places": 1, "count_available_places": 2}
+                ),
+                json.dumps({"address": "Empty", "count_places": 0}),
+                "{not json",
+            ]
+        ),
+        encoding="utf-8",
+    )
+
+    result = app.test_cli_runner().invoke(
+        import_data_command, ["parkings", str(source)]
+    )
+
+    assert "Imported 1 parkings, rejected 3" in result.output
+    assert "line 3: count_places must be positive" in result.output
+    parking = Parking.query.filter_by(address="Import").one()
+    assert (parking.opened, parking.count_available_places) == (True, 7)
+    cached = occupancy.peek(parking.id)
+    assert cached is not None and cached.count_places == 7
+
+
+def test_import_from_another_process_reaches_the_server(tmp_path: Path) -> None:
+    class PollingConfig(Config):
+        TESTING = True
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{tmp_path / 'parking.db'}"
+        SHARED_VERSIONS_POLL_SECONDS = 0
+
+    app = create_app(PollingConfig())
+    server = app.test_client()
+    assert server.get("/api/occupancy").get_json()["parkings_count"] == 0
+
+    # What import-data run as a separate CLI process commits.
+    other = create_engine(PollingConfig.SQLALCHEMY_DATABASE_URI)
+    with other.begin() as connection:
+        connection.execute(
+            text(
+                "INSERT INTO parking (address, opened, count_places,"
+                " count_available_places) VALUES ('Imported', 1, 5, 5)"
+            )
+        )
+        connection.execute(
+            text("INSERT INTO shared_version (name, version) VALUES ('parking', 1)")
+        )
+    other.dispose()
+
+    assert server.get("/api/occupancy").get_json()["parkings_count"] == 1
+
+
+def test_export_streams_full_history(
+    app: Flask, db: SQLAlchemy, tmp_path: Path
+) -> None:
+    session = ClientParking.query.first()
+    assert session is not None
+    target = tmp_path / "sessions.jsonl"
+
+    result = app.test_cli_runner().invoke(
+        export_data_command, ["sessions", str(target), "--batch-size", "1"]
+    )
+
+    rows = [
+        json.loads(line) for line in target.read_text(encoding="utf-8").splitlines()
+    ]
+    assert f"Exported {len(rows)} sessions" in result.output
+    assert len(rows) == ClientParking.query.count()
+    assert rows[0]["id"] == session.id
+    assert datetime.fromisoformat(rows[0]["time_in"]) == session.time_in
+    assert rows[0]["archived"] in (0, False)
+
+
+def test_csv_export_round_trips_through_import(
+    app: Flask, db: SQLAlchemy, tmp_path: Path
+) -> None:
+    target = tmp_path / "parkings.csv"
+    runner = app.test_cli_runner()
+    runner.invoke(export_data_command, ["parkings", str(target)])
+    before = Parking.query.count()
+
+    result = runner.invoke(import_data_command, ["parkings", str(target)])
+
+    assert f"Imported {before} parkings, rejected 0" in result.output
+    assert Parking.query.count() == 2 * before
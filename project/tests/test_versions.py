@@ -0,0 +1,93 @@
+from typing import Callable, List
+
+from flask import Flask
+from flask.testing import FlaskClient
+from flask_sqlalchemy import SQLAlchemy
+
+from project.app.occupancy import occupancy
+from project.database import db as _db
+from project.tests.factories import ClientFactory, ParkingFactory
+
+
+def test_unchanged_pages_answer_not_modified(
+    client: FlaskClient, statements: List[str]
+) -> None:
+    for url in ("/", "/parkings", "/clients", "/client_parkings/active"):
+        first = client.get(url)
+        assert first.status_code == 200
+        assert first.headers["ETag"]
+        assert first.headers["Last-Modified"]
+
+        statements.clear()
+        second = client.get(url, headers={"If-None-Match": first.headers["ETag"]})
+
+        assert second.status_code == 304
+        assert second.get_data() == b""
+        assert statements == []
+
+
+def test_query_string_is_part_of_the_tag(client: FlaskClient) -> None:
+    first = client.get("/clients")
+    second = client.get("/clients?limit=1")
+
+    assert first.headers["ETag"] != second.headers["ETag"]
+
+
+def test_writes_invalidate_dependent_pages(client: FlaskClient, db: SQLAlchemy) -> None:
+    parking = ParkingFactory.create(count_places=2)
+    gate_client = ClientFactory.create(credit_card="4444")
+    db.session.commit()
+    occupancy.rebuild()
+    clients_tag = client.get("/clients").headers["ETag"]
+    parkings_tag = client.get("/parkings").headers["ETag"]
+    active_tag = client.get("/client_parkings/active").headers["ETag"]
+
+    client.post(
+        "/client_parkings/enter",
+        data={"client_id": gate_client.id, "parking_id": parking.id},
+    )
+    client.get("/")
+
+    unchanged = client.get("/clients", headers={"If-None-Match": clients_tag})
+    assert unchanged.status_code == 304
+    for url, tag in (
+        ("/parkings", parkings_tag),
+        ("/client_parkings/active", active_tag),
+    ):
+        assert client.get(url, headers={"If-None-Match": tag}).status_code == 200
+
+
+def test_pending_flash_is_never_answered_from_cache(client: FlaskClient) -> None:
+    tag = client.get("/clients").headers["ETag"]
+    client.post(
+        "/clients/new",
+        data={"name": "Flash", "surname": "Client", "car_number": "K002KK77"},
+    )
+
+    response = client.get("/clients", headers={"If-None-Match": tag})
+
+    assert response.status_code == 200
+    assert "Клиент успешно создан" in response.get_data(as_text=True)
+
+
+def test_writes_of_other_processes_invalidate_pages(
+    polling_app: Flask, other_process: Callable[..., None]
+) -> None:
+    with polling_app.app_context():
+        ParkingFactory.create()
+        ClientFactory.create()
+        _db.session.commit()
+    server = polling_app.test_client()
+    tag = server.get("/client_parkings/active").headers["ETag"]
+    unchanged = server.get("/client_parkings/active", headers={"If-None-Match": tag})
+    assert unchanged.status_code == 304
+
+    other_process(
+        "INSERT INTO client_parking (client_id, parking_id, time_in)"
+        " VALUES (1, 1, CURRENT_TIMESTAMP)",
+        "INSERT INTO shared_version (name, version) VALUES ('client_parking', 1)"
+        " ON CONFLICT (name) DO UPDATE SET version = version + 1",
+    )
+
+    response = server.get("/client_parkings/active", headers={"If-None-Match": tag})
+    assert response.status_code == 200
@@ -0,0 +1,140 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Generator, List
+
+import pytest
+from flask import Flask
+
+from project.app import create_app
+from project.app.models import Client, ClientParking, Parking
+from project.app.services import ParkingError, release_place, reserve_place
+from project.app.writer import Write, WriteCoordinator, WriterUnavailable, run_write
+from project.config import Config
+from project.database import db
+from project.tests.factories import ClientFactory, ParkingFactory
+
+GATE_THREADS = 24
+PLACES = 10
+
+
+@pytest.fixture()
+def writer_app(tmp_path: Path) -> Generator[Flask, None, None]:
+    class WriterConfig(Config):
+        TESTING = True
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{tmp_path / 'parking.db'}"
+        WRITE_COORDINATOR = True
+        WRITER_GROUP_SIZE = 8
+
+    app = create_app(WriterConfig())
+    with app.app_context():
+        ParkingFactory.create(count_places=PLACES)
+        ClientFactory.create_batch(GATE_THREADS, credit_card=None)
+        db.session.commit()
+    yield app
+    app.extensions["writer"].stop()
+
+
+def _writer(app: Flask) -> WriteCoordinator:
+    coordinator: WriteCoordinator = app.extensions["writer"]
+    return coordinator
+
+
+def test_group_commit_never_oversells(writer_app: Flask) -> None:
+    barrier = threading.Barrier(GATE_THREADS)
+
+    def enter(client_id: int) -> str:
+        with writer_app.app_context():
+            barrier.wait()
+            try:
+                parking_session = reserve_place(client_id, 1)
+            except ParkingError as e:
+                return type(e).__name__
+            assert parking_session.client_id == client_id
+            return "ok"
+
+    with ThreadPoolExecutor(max_workers=GATE_THREADS) as pool:
+        results: List[str] = list(pool.map(enter, range(1, GATE_THREADS + 1)))
+
+    assert results.count("ok") == PLACES
+    assert results.count("ParkingFull") == GATE_THREADS - PLACES
+    coordinator = _writer(writer_app)
+    assert coordinator.committed == PLACES
+    assert coordinator.groups <= GATE_THREADS
+    with writer_app.app_context():
+        parking = db.session.get(Parking, 1)
+        assert parking is not None
+        assert parking.count_available_places == 0
+        assert ClientParking.query.filter_by(time_out=None).count() == PLACES
+
+
+def test_failed_write_does_not_roll_back_its_group(writer_app: Flask) -> None:
+    with writer_app.app_context():
+        reserve_place(1, 1)
+        with pytest.raises(ParkingError):
+            reserve_place(1, 1)
+        result = release_place(1, 1, "4000")
+
+        assert result.amount >= 0
+        parking = db.session.get(Parking, 1)
+        assert parking is not None
+        assert parking.count_available_places == PLACES
+
+
+def test_routes_go_through_the_writer(writer_app: Flask) -> None:
+    client = writer_app.test_client()
+    committed = _writer(writer_app).committed
+
+    client.post(
+        "/clients/new",
+        data={"name": "Queued", "surname": "Client", "car_number": "B999BB77"},
+    )
+    client.post("/client_parkings/enter", data={"client_id": 2, "parking_id": 1})
+    response = client.delete(
+        "/api/client_parkings/exit",
+        json={"client_id": 2, "parking_id": 1, "credit_card": "4000"},
+    )
+
+    assert response.status_code == 200
+    assert _writer(writer_app).committed == committed + 3
+    with writer_app.app_context():
+        assert Client.query.filter_by(car_number="B999BB77").count() == 1
+
+
+def test_writes_fail_instead_of_waiting_forever(writer_app: Flask) -> None:
+    idle = WriteCoordinator(writer_app, group_size=1, timeout=0.01)
+    with pytest.raises(WriterUnavailable):
+        idle.submit(lambda: 1, lambda _: None)
+    assert idle.writes.get_nowait().future.cancelled()  # type: ignore[union-attr]
+
+    # Writes still queued when the loop exits are failed, not left hanging.
+    stopping = WriteCoordinator(writer_app, group_size=1)
+    stopping.writes.put(None)
+    queued = Write(lambda: 1, lambda _: None)
+    stopping.writes.put(queued)
+    stopping.start()
+    stopping.join()
+    with pytest.raises(WriterUnavailable):
+        queued.future.result(timeout=1)
+    with pytest.raises(WriterUnavailable):
+        stopping.submit(lambda: 1, lambda _: None)
+
+
+def test_failed_hook_does_not_fail_a_committed_write(
+    app: Flask, caplog: pytest.LogCaptureFixture
+) -> None:
+    # Without a coordinator run_write commits on the caller's thread.
+    def add_parking() -> int:
+        parking = ParkingFactory.create(address="Hook")
+        db.session.flush()
+        return int(parking.id)
+
+    def broken(parking_id: int) -> None:
+        raise RuntimeError("hook failed")
+
+    with app.app_context():
+        parking_id = run_write(add_parking, broken)
+
+    with app.app_context():
+        assert db.session.get(Parking, parking_id) is not None
+    assert "After-commit hook failed" in caplog.text